@@ -0,0 +1,77 @@
+import logging
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from app.agents.utils.token_budget import count_message_tokens, tokenizer_name
+
+logger = logging.getLogger(__name__)
+
+
+class DryRunChatModel(BaseChatModel):
+    """
+    프롬프트 크기 측정용 채팅 모델
+
+    API를 호출하지 않고 빈 응답을 돌려줍니다. 그래프를 그대로 실행하면서
+    각 노드가 보낼 프롬프트만 PromptSizeCollector로 수집할 때 사용합니다.
+    """
+
+    @property
+    def _llm_type(self) -> str:
+        return "dry-run"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=""))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+
+class PromptSizeCollector(BaseCallbackHandler):
+    """
+    LLM 호출마다 노드별 입력 토큰 수와 출력 토큰 예산을 기록하는 콜백 핸들러
+
+    토큰 수는 노드에 설정된 모델의 토크나이저로 계산합니다 (models에 없는 노드는 default_model).
+    """
+
+    run_inline = True
+
+    def __init__(
+        self,
+        models: Optional[Dict[str, str]] = None,
+        input_budgets: Optional[Dict[str, int]] = None,
+        default_model: Optional[str] = None,
+    ):
+        self.models = models or {}
+        self.default_model = default_model
+        self.input_budgets = input_budgets or {}
+        self.prompts: List[Dict[str, Any]] = []
+
+    def on_chat_model_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        messages: List[list],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        invocation_params: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        node = (metadata or {}).get("langgraph_node", "unknown")
+        model = self.models.get(node, self.default_model)
+        
+        for prompt in messages:
+            self.prompts.append({
+                "node": node,
+                "model": model,
+                "tokenizer": tokenizer_name(model),
+                "messages": len(prompt),
+                "input_tokens": count_message_tokens(prompt, model),
+                "max_input_tokens": self.input_budgets.get(node),
+                "max_output_tokens": (invocation_params or {}).get("max_tokens"),
+            })
@@ -1,47 +1,328 @@
+import logging
+import aiosqlite
 from langgraph.graph import StateGraph, START, END
-from langchain_openai import ChatOpenAI 
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from app.config import settings
-from app.agents.health_state import HealthState
-from app.agents.nodes.health_collector import create_health_collector
+from app.agents.health_state import HealthState, get_latest_user_message
+from app.agents.llm_cache import SQLiteLLMCache
+from app.agents.llm_client import LimitedChatOpenAI, LLMRateLimiter, create_http_clients
+from app.agents.dry_run import DryRunChatModel, PromptSizeCollector
+from app.agents.stub_llm import StubChatModel
+from app.agents.utils.token_budget import TokenBudget
+from app.agents.nodes.health_collector import create_health_collector, create_data_quality_checker
 from app.agents.nodes.health_agent import create_health_agent
 from app.agents.nodes.analysis_agent import create_analysis_agent
 from app.agents.nodes.report_agent import create_report_agent
+from app.agents.nodes.intent_router import create_intent_router, GENERAL_QUESTION, SPECIFIC_QUERY
+from app.agents.nodes.lookup_agent import create_lookup_agent
+from app.agents.nodes.advice_agent import create_advice_agent
+from app.services.metrics_service import MetricsCallbackHandler
+from app.schemas.chat_data import MarkdownBlock, ChartBlock, ChartData, TableBlock, ImageBlock
+from app.schemas.user_data import BasicInfo, Lifestyle, FollowupAnswers
+
+logger = logging.getLogger(__name__)
+
+# LLM을 호출하는 노드 (노드별 모델 설정 키)
+LLM_NODES = ("router", "quality", "health", "analysis", "report", "advice")
+
+# 체크포인트에서 복원을 허용하는 HealthState 값 타입 (메시지 등 LangChain 기본 타입은 기본 허용)
+CHECKPOINT_STATE_TYPES = [
+    BasicInfo, Lifestyle, FollowupAnswers,
+    MarkdownBlock, ChartBlock, ChartData, TableBlock, ImageBlock,
+]
+
+
+def route_after_router(state: HealthState) -> str:
+    """일반 질문은 데이터 로드 없이 advice로 보냄"""
+    if state.get("intent") == GENERAL_QUESTION:
+        return "advice"
+    return "collector"
+
+
+def route_after_health(state: HealthState) -> str:
+    """특정 수치 조회는 LLM 분석 없이 lookup으로 보냄"""
+    if state.get("intent") == SPECIFIC_QUERY:
+        return "lookup"
+    return "analysis"
 
 
 class HealthGraph:
     def __init__(self):
         self.config = settings 
-        self.llm = self._init_llms() 
-        self.graph = self._build_graph() 
+        self.llm_cache = self._init_llm_cache()
+        self.llm_limiter = LLMRateLimiter(
+            max_concurrency=self.config.llm_max_concurrency,
+            requests_per_minute=self.config.llm_requests_per_minute,
+            tokens_per_minute=self.config.llm_tokens_per_minute,
+            max_queue=self.config.llm_max_queue,
+            queue_timeout_seconds=self.config.llm_queue_timeout_seconds
+        )
+        self.http_client, self.http_async_client = create_http_clients(
+            max_connections=self.config.llm_http_max_connections,
+            timeout_seconds=self.config.llm_http_timeout_seconds
+        )
+        self.llms = self._init_llms() 
+        self.metrics_handler = MetricsCallbackHandler()
+        self.graph = self._build_graph(self.llms) 
+        self._dry_run_graph = None
+        # start()에서 체크포인터를 연결한 뒤 conversation_id가 있는 요청에 사용
+        self.conversation_graph = None
+        self._checkpoint_conn = None
+
+    def _node_model(self, node: str) -> str:
+        return self.config.node_models.get(node, self.config.llm_model)
 
-    def _build_graph(self):
+    def _token_budget(self, node: str) -> TokenBudget:
+        return TokenBudget(
+            node,
+            model=self._node_model(node),
+            max_input_tokens=self.config.node_max_input_tokens.get(node),
+            max_output_tokens=self.config.node_max_output_tokens.get(node, self.config.llm_max_tokens)
+        )
+
+    def _build_graph(self, llms, checkpointer=None):
+        """
+        그래프 구성
+        
+        Args:
+            llms: 노드 이름 -> LLM (LLM_NODES 전체)
+            checkpointer: 대화 상태 저장소 (None이면 상태를 저장하지 않음)
+        """
         graph = StateGraph(HealthState)
         
-        collector_node = create_health_collector(self.llm)
-        health_node = create_health_agent(self.llm)
-        analysis_node = create_analysis_agent(self.llm)
-        report_node = create_report_agent(self.llm)
+        lean = self.config.pipeline_mode == "lean"
         
+        router_node = create_intent_router(llms["router"] if self.config.intent_router_llm_fallback else None)
+        collector_node = create_health_collector()
+        health_node = create_health_agent(llms["health"], interpret=not lean, token_budget=self._token_budget("health"))
+        analysis_node = create_analysis_agent(
+            llms["analysis"],
+            max_tool_rounds=self.config.analysis_max_tool_rounds,
+            tool_budget_seconds=self.config.analysis_tool_budget_seconds,
+            token_budget=self._token_budget("analysis")
+        )
+        report_node = create_report_agent(llms["report"], token_budget=self._token_budget("report"))
+        lookup_node = create_lookup_agent()
+        advice_node = create_advice_agent(llms["advice"], token_budget=self._token_budget("advice"))
+        
+        graph.add_node("router", router_node)
         graph.add_node("collector", collector_node)
         graph.add_node("health", health_node)
         graph.add_node("analysis", analysis_node)
         graph.add_node("report", report_node)
+        graph.add_node("lookup", lookup_node)
+        graph.add_node("advice", advice_node)
+        
+        # router: 일반 질문 -> advice / 그 외 -> collector
+        graph.add_edge(START, "router")
+        graph.add_conditional_edges("router", route_after_router, ["collector", "advice"])
+        
+        if lean:
+            analysis_branches = ["health"]
+        else:
+            # 데이터 로드 후 품질 평가(LLM)와 건강 분석을 병렬 실행하고 analysis에서 합류
+            graph.add_node("quality", create_data_quality_checker(llms["quality"]))
+            graph.add_edge("quality", "analysis")
+            analysis_branches = ["quality", "health"]
+        
+        def route_after_collector(state: HealthState):
+            # 데이터가 없으면 분석 대신 advice, 수치 조회는 품질 평가 생략
+            if not state.get("health_data_counts"):
+                return "advice"
+            if state.get("intent") == SPECIFIC_QUERY:
+                return "health"
+            return analysis_branches
+        
+        graph.add_conditional_edges("collector", route_after_collector, ["advice", *analysis_branches])
+        graph.add_conditional_edges("health", route_after_health, ["lookup", "analysis"])
         
-        graph.add_edge(START, "collector")
-        graph.add_edge("collector", "health")
-        graph.add_edge("health", "analysis")
         graph.add_edge("analysis", "report")
         graph.add_edge("report", END)
+        graph.add_edge("lookup", END)
+        graph.add_edge("advice", END)
         
-        return graph.compile()
+        return graph.compile(checkpointer=checkpointer)
+
+    def _init_llm_cache(self):
+        if not self.config.llm_cache_enabled:
+            return None
+        return SQLiteLLMCache(
+            database_path=self.config.llm_cache_path,
+            ttl_seconds=self.config.llm_cache_ttl_seconds,
+            max_entries=self.config.llm_cache_max_entries
+        )
+
+    def _node_llm_options(self, node: str):
+        """노드의 (모델, temperature, max_tokens, reasoning_effort)"""
+        return (
+            self._node_model(node),
+            self.config.node_temperatures.get(node, self.config.llm_temperature),
+            self.config.node_max_output_tokens.get(node, self.config.llm_max_tokens),
+            self.config.node_reasoning_efforts.get(node, self.config.llm_reasoning_effort),
+        )
 
     def _init_llms(self):
-        llm = ChatOpenAI(
-            model=self.config.llm_model,
-            temperature=self.config.llm_temperature,
-            api_key=self.config.openai_api_key
+        """
+        노드별 LLM 클라이언트 생성
+        
+        설정이 같은 노드는 클라이언트 하나를 공유하고, 모든 클라이언트가 HTTP 커넥션 풀,
+        호출 제한기, 응답 캐시를 공유합니다. llm_provider가 stub이면 API 대신 StubChatModel을 사용합니다.
+        
+        Returns:
+            노드 이름 -> LLM
+        """
+        pool = {}
+        llms = {}
+        
+        for node in LLM_NODES:
+            options = self._node_llm_options(node)
+            if options not in pool and self.config.llm_provider == "stub":
+                pool[options] = StubChatModel(
+                    model_name=options[0],
+                    latency_seconds=self.config.stub_llm_latency_seconds,
+                    cache=self.llm_cache if self.llm_cache else False,
+                    limiter=self.llm_limiter
+                )
+            elif options not in pool:
+                model, temperature, max_tokens, reasoning_effort = options
+                pool[options] = LimitedChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    api_key=self.config.openai_api_key,
+                    max_tokens=max_tokens,
+                    reasoning_effort=reasoning_effort,
+                    cache=self.llm_cache if self.llm_cache else False,
+                    http_client=self.http_client,
+                    http_async_client=self.http_async_client,
+                    limiter=self.llm_limiter
+                )
+            llms[node] = pool[options]
+        
+        logger.info(f"LLM clients: {len(pool)} (node models: {self.llm_models()})")
+        return llms
+
+    def llm_models(self) -> dict:
+        """노드별 사용 모델"""
+        return {node: self._node_model(node) for node in LLM_NODES}
+
+    async def start(self):
+        """대화 체크포인터(SQLite) 연결 (이벤트 루프에서 호출)"""
+        if not self.config.checkpoint_enabled:
+            return
+        
+        self._checkpoint_conn = await aiosqlite.connect(self.config.checkpoint_path)
+        await self._checkpoint_conn.execute("PRAGMA journal_mode=WAL")
+        checkpointer = AsyncSqliteSaver(
+            self._checkpoint_conn,
+            serde=JsonPlusSerializer(allowed_msgpack_modules=CHECKPOINT_STATE_TYPES)
         )
-        return llm
+        await checkpointer.setup()
+        self.conversation_graph = self._build_graph(self.llms, checkpointer=checkpointer)
+        logger.info(f"Conversation checkpointer ready: {self.config.checkpoint_path}")
+
+    async def aclose(self):
+        """공유 HTTP 클라이언트, 체크포인터 연결 종료"""
+        self.http_client.close()
+        await self.http_async_client.aclose()
+        if self._checkpoint_conn:
+            await self._checkpoint_conn.close()
+            self._checkpoint_conn = None
+
+    def _run_config(self):
+        """그래프 실행 설정 (노드/LLM 지표 수집 콜백 포함)"""
+        return {"callbacks": [self.metrics_handler]}
+
+    async def _prepare_run(self, input_data, conversation_id=None):
+        """
+        실행할 그래프, 입력, 설정 결정
+        
+        conversation_id가 없거나 체크포인터가 없으면 상태를 저장하지 않는 그래프로 실행합니다.
+        있으면 대화별 체크포인트에 이어서 실행하되, 직전 실행이 중간에 실패했고 같은 메시지로
+        재시도한 경우에는 입력 없이 재개하여 완료된 노드를 다시 실행하지 않습니다.
+        
+        Returns:
+            (그래프, 입력, 실행 설정)
+        """
+        config = self._run_config()
+        if not conversation_id or self.conversation_graph is None:
+            return self.graph, input_data, config
+        
+        config["configurable"] = {"thread_id": conversation_id}
+        snapshot = await self.conversation_graph.aget_state(config)
+        
+        if snapshot.next and get_latest_user_message(snapshot.values) == get_latest_user_message(input_data):
+            logger.info(f"Resuming conversation {conversation_id} at {list(snapshot.next)}")
+            return self.conversation_graph, None, config
+        
+        return self.conversation_graph, input_data, config
+
+    async def abatch_as_completed(self, inputs, conversation_ids=None, max_concurrency=None):
+        """
+        여러 요청을 그래프 배치 실행(abatch_as_completed)으로 처리
+        
+        conversation_id 유무에 따라 실행할 그래프가 다르므로 그래프별로 묶어 차례로 실행하며,
+        각 묶음 안에서는 최대 max_concurrency개의 요청을 동시에 실행합니다.
+        
+        Args:
+            inputs: 입력 상태 목록
+            conversation_ids: 입력별 대화 ID 목록 (None이면 모두 상태 저장 없이 실행)
+            max_concurrency: 동시 실행 요청 수
+        
+        Yields:
+            완료 순서대로 (입력 순번, 결과 상태 또는 예외)
+        """
+        conversation_ids = conversation_ids or [None] * len(inputs)
+        groups = {}
+        
+        for index, (input_data, conversation_id) in enumerate(zip(inputs, conversation_ids)):
+            graph, graph_input, config = await self._prepare_run(input_data, conversation_id)
+            config["max_concurrency"] = max_concurrency
+            groups.setdefault(id(graph), (graph, []))[1].append((index, graph_input, config))
+        
+        for graph, items in groups.values():
+            async for position, result in graph.abatch_as_completed(
+                [graph_input for _, graph_input, _ in items],
+                config=[config for _, _, config in items],
+                return_exceptions=True
+            ):
+                yield items[position][0], result
 
     def invoke(self, input_data):
-        return self.graph.invoke(input_data)
+        return self.graph.invoke(input_data, config=self._run_config())
+
+    async def ainvoke(self, input_data, conversation_id=None):
+        graph, graph_input, config = await self._prepare_run(input_data, conversation_id)
+        return await graph.ainvoke(graph_input, config=config)
+
+    async def astream(self, input_data, conversation_id=None):
+        """노드별 상태 업데이트와 LLM 토큰을 (stream_mode, chunk) 형태로 스트리밍"""
+        graph, graph_input, config = await self._prepare_run(input_data, conversation_id)
+        async for mode, chunk in graph.astream(
+            graph_input,
+            config=config,
+            stream_mode=["updates", "messages"]
+        ):
+            yield mode, chunk
+
+    async def dry_run(self, input_data):
+        """
+        LLM을 호출하지 않고 노드별 프롬프트 크기 측정
+
+        토큰 수는 노드별 설정 모델(NODE_MODELS)의 토크나이저로 계산합니다.
+        API 대신 빈 응답을 주는 모델로 같은 그래프를 실행하므로, 앞 노드의 LLM 출력에
+        의존하는 프롬프트(report의 분석 결과 등)는 실제보다 작게 측정됩니다.
+        """
+        if self._dry_run_graph is None:
+            self._dry_run_graph = self._build_graph(dict.fromkeys(LLM_NODES, DryRunChatModel()))
+        
+        collector = PromptSizeCollector(
+            self.llm_models(), self.config.node_max_input_tokens, default_model=self.config.llm_model
+        )
+        result = await self._dry_run_graph.ainvoke(input_data, config={"callbacks": [collector]})
+        
+        return {
+            "intent": result.get("intent"),
+            "prompts": collector.prompts,
+            "total_input_tokens": sum(prompt["input_tokens"] for prompt in collector.prompts),
+        }
@@ -1,11 +1,15 @@
-from typing import Annotated, List, TypedDict, Optional
-from langchain_core.messages import BaseMessage
+import logging
+from typing import Annotated, Dict, List, TypedDict, Optional
+from langchain_core.messages import BaseMessage, HumanMessage
 from langgraph.graph.message import add_messages 
+from app.services.user_session_service import get_user_session_by_device, get_latest_user_session
 from app.schemas.chat_data import Block
-from app.schemas.fcm_data import RequestedHealthData
 from app.schemas.agent_data import HealthAnalysis, AnalysisResult
 from app.schemas.user_data import BasicInfo, Lifestyle, FollowupAnswers
 
+logger = logging.getLogger(__name__)
+
+
 class HealthState(TypedDict, total=False):
     messages: Annotated[List[BaseMessage], add_messages]
     blocks: Annotated[List[Block], "response blocks"]
@@ -18,10 +22,69 @@ class HealthState(TypedDict, total=False):
     lifestyle: Optional[Lifestyle]
     followup_answers: Optional[FollowupAnswers]
     
-    health_data: Optional[RequestedHealthData]
+    # 항목별 샘플 수 (데이터가 없으면 None)
+    # 건강 데이터 자체는 체크포인트마다 저장되지 않도록 상태에 두지 않고, 노드가 device_id로 다시 조회
+    health_data_counts: Optional[Dict[str, int]]
+    data_version: Optional[int]
     health_analysis: Optional[HealthAnalysis]
+    # health_analysis를 만든 데이터 식별 키 (같은 대화의 다음 턴에서 재사용 여부 판단)
+    health_analysis_source: Optional[str]
+    health_analysis_text: Optional[str]
     analysis_result: Optional[AnalysisResult]
     block_drafts: Optional[List[dict]]
     
     intent: Optional[str]
-    required_data_types: Optional[List[str]] 
\ No newline at end of file
+    required_data_types: Optional[List[str]]
+    # 분석 기간 (today, yesterday, last_N_days, YYYY-MM-DD~YYYY-MM-DD / None이면 today)
+    time_range: Optional[str]
+
+
+def get_latest_user_message(state: HealthState) -> str:
+    """
+    가장 최근 사용자 메시지 조회
+    
+    병렬 노드가 AI 메시지를 추가하므로 messages[-1]이 사용자 메시지라는 보장이 없습니다.
+    """
+    for message in reversed(state.get("messages", [])):
+        if isinstance(message, HumanMessage):
+            return message.content
+    return ""
+
+
+def build_input_state(message: str, device_id: Optional[str] = None) -> HealthState:
+    """
+    채팅 요청의 그래프 입력 상태 생성
+    
+    기기 ID의 사용자 세션(없으면 최근 세션, 단일 사용자 시스템)에서 사용자 정보를 채웁니다.
+    
+    Args:
+        message: 사용자 메시지
+        device_id: 기기 ID (선택)
+    """
+    input_state = {
+        "messages": [HumanMessage(content=message)]
+    }
+    
+    user_session = None
+    
+    if device_id:
+        input_state["device_id"] = device_id
+        user_session = get_user_session_by_device(device_id)
+        if user_session:
+            logger.info(f"User session loaded by device_id: {device_id}")
+    
+    if not user_session:
+        user_session = get_latest_user_session()
+        if user_session:
+            session_device_id = user_session.get("device_id")
+            if session_device_id:
+                input_state["device_id"] = session_device_id
+            logger.info("User session loaded (latest session, single user system)")
+    
+    if user_session:
+        input_state["user_name"] = user_session.get("user_name")
+        input_state["basic_info"] = BasicInfo(**user_session.get("basic_info", {}))
+        input_state["lifestyle"] = Lifestyle(**user_session.get("lifestyle", {}))
+        input_state["followup_answers"] = FollowupAnswers(**user_session.get("followup", {}))
+    
+    return input_state
@@ -1,15 +1,15 @@
-from langchain_core.tools import tool
-from typing import Optional, List, Dict, Any
+from langchain_core.tools import tool, InjectedToolArg
+from typing import Optional, List, Dict, Any, Annotated
 from app.schemas.agent_data import HealthAnalysis, Anomaly
 
 
 @tool
-def get_health_analysis_summary(health_analysis: Dict[str, Any]) -> str:
+def get_health_analysis_summary(health_analysis: Annotated[Dict[str, Any], InjectedToolArg]) -> str:
     """
     건강 분석 결과의 요약을 반환합니다.
     
     Args:
-        health_analysis: HealthAnalysis 딕셔너리
+        health_analysis: HealthAnalysis 딕셔너리 (실행 시 주입, LLM에는 노출되지 않음)
     
     Returns:
         요약 텍스트
@@ -32,12 +32,12 @@ def get_health_analysis_summary(health_analysis: Dict[str, Any]) -> str:
 
 
 @tool
-def get_anomalies(health_analysis: Dict[str, Any]) -> List[Dict[str, str]]:
+def get_anomalies(health_analysis: Annotated[Dict[str, Any], InjectedToolArg]) -> List[Dict[str, str]]:
     """
     건강 분석 결과에서 이상 징후를 반환합니다.
     
     Args:
-        health_analysis: HealthAnalysis 딕셔너리
+        health_analysis: HealthAnalysis 딕셔너리 (실행 시 주입, LLM에는 노출되지 않음)
     
     Returns:
         이상 징후 목록
@@ -55,12 +55,12 @@ def get_anomalies(health_analysis: Dict[str, Any]) -> List[Dict[str, str]]:
 
 
 @tool
-def get_trends(health_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+def get_trends(health_analysis: Annotated[Dict[str, Any], InjectedToolArg]) -> List[Dict[str, Any]]:
     """
     건강 분석 결과에서 트렌드를 반환합니다.
     
     Args:
-        health_analysis: HealthAnalysis 딕셔너리
+        health_analysis: HealthAnalysis 딕셔너리 (실행 시 주입, LLM에는 노출되지 않음)
     
     Returns:
         트렌드 목록
@@ -81,4 +81,8 @@ HEALTH_TOOLS = [
     get_health_analysis_summary,
     get_anomalies,
     get_trends,
-]
\ No newline at end of file
+]
+
+
+# 도구 이름 -> 도구 (새 도구는 HEALTH_TOOLS에 추가하면 노드 수정 없이 실행됩니다)
+TOOL_REGISTRY = {health_tool.name: health_tool for health_tool in HEALTH_TOOLS}
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, Generation
+
+from app.services.metrics_service import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# 캐시에서 복원을 허용하는 클래스 목록
+_CACHEABLE_CLASSES = [Generation, ChatGeneration, ChatGenerationChunk, AIMessage, AIMessageChunk]
+
+# 같은 프롬프트라도 호출마다 달라지는 메시지 필드 (캐시 키에서 제외)
+_VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+
+def _normalize_prompt(prompt: str) -> str:
+    """
+    직렬화된 메시지 목록에서 호출마다 달라지는 필드를 제거
+    
+    LangChain이 전달하는 prompt는 메시지 목록의 JSON 직렬화 문자열입니다.
+    """
+    try:
+        messages = json.loads(prompt)
+    except (TypeError, ValueError):
+        return prompt
+    
+    if isinstance(messages, list):
+        for message in messages:
+            kwargs = message.get("kwargs") if isinstance(message, dict) else None
+            if isinstance(kwargs, dict):
+                for field in _VOLATILE_MESSAGE_FIELDS:
+                    kwargs.pop(field, None)
+    
+    return json.dumps(messages, ensure_ascii=False, sort_keys=True)
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    SQLite 기반 LLM 응답 캐시
+
+    모델 설정(llm_string: 모델명, temperature, 바인딩된 도구 등)과 정규화된 메시지 목록을
+    키로 사용합니다. TTL이 지난 항목은 조회 시 삭제하고, 최대 항목 수를 넘으면
+    가장 오래 조회되지 않은 항목부터 제거합니다 (LRU).
+    """
+
+    def __init__(self, database_path: str, ttl_seconds: Optional[int] = 3600, max_entries: int = 5000):
+        self.database_path = database_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(database_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                llm_string TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def _make_key(prompt: str, llm_string: str) -> str:
+        raw = f"{llm_string}\n{_normalize_prompt(prompt)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._make_key(prompt, llm_string)
+        now = time.time()
+        
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.evictions += 1
+                row = None
+            
+            if not row:
+                self.misses += 1
+                record_cache_lookup("llm", hit=False)
+                return None
+            
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            record_cache_lookup("llm", hit=True)
+        
+        try:
+            return [loads(generation, allowed_objects=_CACHEABLE_CLASSES) for generation in json.loads(row[0])]
+        except Exception as e:
+            logger.warning(f"Failed to load cached LLM response: {e}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._make_key(prompt, llm_string)
+        value = json.dumps([dumps(generation) for generation in return_val])
+        now = time.time()
+        
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, llm_string, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, llm_string, value, now, now)
+            )
+            cursor = self._conn.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_access ASC
+                    LIMIT MAX(0, (SELECT COUNT(*) FROM llm_cache) - ?)
+                )
+                """,
+                (self.max_entries,)
+            )
+            self.evictions += max(cursor.rowcount, 0)
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """캐시 적중/미적중 카운터 조회"""
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "size": size,
+        }
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+from pydantic import Field
+
+from app.agents.utils.token_budget import count_message_tokens
+from app.services.metrics_service import LLM_QUEUE_WAITING, LLM_OVERLOAD_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+
+class LLMOverloadedError(Exception):
+    """LLM 호출 대기열이 가득 찼거나 대기 시간이 초과된 경우 (503 + Retry-After로 응답)"""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# 재시도하면 성공할 수 있는 LLM 오류 (노드에서 삼키지 않고 전파하여 체크포인트 지점부터 재개)
+TRANSIENT_LLM_ERRORS = (
+    LLMOverloadedError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class _TokenBucket:
+    """분당 허용량 기반 토큰 버킷 (이벤트 루프 단일 스레드에서 사용)"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    async def take(self, amount: float) -> None:
+        amount = min(amount, self.capacity)
+        while True:
+            wait = self.wait_time(amount)
+            if wait <= 0:
+                self.tokens -= amount
+                return
+            await asyncio.sleep(wait)
+
+    def give_back(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMRateLimiter:
+    """
+    LLM 호출 전역 제한기
+
+    - 동시 실행 호출 수 (세마포어)
+    - 분당 요청 수 / 분당 토큰 수 (토큰 버킷)
+    - 대기열 길이: 가득 차면 기다리지 않고 LLMOverloadedError
+    - 대기 시간: queue_timeout_seconds를 넘기면 LLMOverloadedError
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_queue: int = 32,
+        queue_timeout_seconds: float = 10.0
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._request_bucket = _TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._token_bucket = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._waiting = 0
+        self._in_flight = 0
+
+    def retry_after(self) -> int:
+        """다시 시도할 때까지 권장 대기 시간 (초)"""
+        waits = [1.0]
+        if self._request_bucket:
+            waits.append(self._request_bucket.wait_time(1))
+        if self._token_bucket:
+            waits.append(self._token_bucket.wait_time(self._token_bucket.capacity * 0.05))
+        return math.ceil(max(waits))
+
+    def is_overloaded(self) -> bool:
+        return self._waiting >= self.max_queue
+
+    def check_admission(self) -> None:
+        """대기열이 가득 찼으면 즉시 거절 (요청 처리 시작 전 확인용)"""
+        if self.is_overloaded():
+            LLM_OVERLOAD_REJECTIONS.labels(reason="queue_full").inc()
+            raise LLMOverloadedError("LLM request queue is full", retry_after=self.retry_after())
+
+    async def _acquire(self, estimated_tokens: int) -> None:
+        await self._semaphore.acquire()
+        try:
+            if self._request_bucket:
+                await self._request_bucket.take(1)
+            if self._token_bucket:
+                await self._token_bucket.take(estimated_tokens)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0):
+        """
+        LLM 호출 1회 실행 권한 획득
+        
+        Args:
+            estimated_tokens: 예상 토큰 수 (입력 + 최대 출력, 분당 토큰 수 제한에 사용)
+        """
+        self.check_admission()
+        
+        self._waiting += 1
+        LLM_QUEUE_WAITING.set(self._waiting)
+        try:
+            await asyncio.wait_for(self._acquire(estimated_tokens), timeout=self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            LLM_OVERLOAD_REJECTIONS.labels(reason="queue_timeout").inc()
+            raise LLMOverloadedError("Timed out waiting for LLM capacity", retry_after=self.retry_after())
+        finally:
+            self._waiting -= 1
+            LLM_QUEUE_WAITING.set(self._waiting)
+        
+        self._in_flight += 1
+        try:
+            yield self
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def settle_tokens(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """실제 사용 토큰 수가 예상보다 적으면 차이만큼 분당 토큰 한도를 돌려줌"""
+        if self._token_bucket and actual_tokens is not None and actual_tokens < estimated_tokens:
+            self._token_bucket.give_back(estimated_tokens - actual_tokens)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "max_queue": self.max_queue,
+        }
+
+
+def create_http_clients(max_connections: int = 20, timeout_seconds: float = 60.0):
+    """
+    모든 LLM 호출이 공유하는 커넥션 풀 HTTP 클라이언트 생성
+    
+    Returns:
+        (동기 클라이언트, 비동기 클라이언트)
+    """
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    timeout = httpx.Timeout(timeout_seconds, connect=10.0)
+    return (
+        httpx.Client(limits=limits, timeout=timeout),
+        httpx.AsyncClient(limits=limits, timeout=timeout)
+    )
+
+
+def _usage_tokens(result) -> Optional[int]:
+    for generation in getattr(result, "generations", []) or []:
+        usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+        if usage:
+            return usage.get("total_tokens")
+    return None
+
+
+class LimitedChatOpenAI(ChatOpenAI):
+    """
+    LLMRateLimiter를 거쳐 호출하는 ChatOpenAI
+
+    비동기 호출(ainvoke, astream)에만 제한을 적용합니다.
+    캐시 적중 시에는 _agenerate가 호출되지 않으므로 제한 한도를 쓰지 않습니다.
+    """
+
+    limiter: Optional[Any] = Field(default=None, exclude=True)
+
+    def _estimate_tokens(self, messages, kwargs) -> int:
+        max_tokens = kwargs.get("max_tokens") or self.max_tokens or 0
+        return count_message_tokens(messages, self.model_name) + max_tokens
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.limiter is None:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        
+        estimated_tokens = self._estimate_tokens(messages, kwargs)
+        async with self.limiter.slot(estimated_tokens):
+            result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self.limiter.settle_tokens(estimated_tokens, _usage_tokens(result))
+        return result
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.limiter is None:
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+        
+        estimated_tokens = self._estimate_tokens(messages, kwargs)
+        actual_tokens = None
+        async with self.limiter.slot(estimated_tokens):
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                usage = getattr(chunk.message, "usage_metadata", None)
+                if usage:
+                    actual_tokens = usage.get("total_tokens")
+                yield chunk
+        self.limiter.settle_tokens(estimated_tokens, actual_tokens)
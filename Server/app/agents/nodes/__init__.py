@@ -1,11 +1,18 @@
-from .health_collector import create_health_collector
+from .health_collector import create_health_collector, create_data_quality_checker
 from .health_agent import create_health_agent
 from .analysis_agent import create_analysis_agent
 from .report_agent import create_report_agent
+from .intent_router import create_intent_router
+from .lookup_agent import create_lookup_agent
+from .advice_agent import create_advice_agent
 
 __all__ = [
     "create_health_collector",
+    "create_data_quality_checker",
     "create_health_agent",
     "create_analysis_agent",
     "create_report_agent",
+    "create_intent_router",
+    "create_lookup_agent",
+    "create_advice_agent",
 ]
@@ -0,0 +1,75 @@
+import logging
+from app.agents.health_state import HealthState, get_latest_user_message
+from app.agents.prompts import AgentPrompts
+from app.agents.utils.data_formatter import format_user_info
+from app.agents.utils.token_budget import TokenBudget, PromptSection, count_tokens
+from app.schemas.chat_data import MarkdownBlock
+from app.agents.llm_client import TRANSIENT_LLM_ERRORS
+from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+logger = logging.getLogger(__name__)
+
+
+def create_advice_agent(llm, token_budget: TokenBudget = None):
+    """
+    Advice Agent 노드 생성
+    
+    건강 데이터가 필요 없는 일반 질문이나 데이터가 없는 경우,
+    사용자 정보만으로 한 번의 LLM 호출로 답합니다.
+    """
+    token_budget = token_budget or TokenBudget("advice")
+    node_llm = token_budget.bind(llm)
+    
+    def _build_messages(state: HealthState):
+        user_message = get_latest_user_message(state)
+        user_info = format_user_info(
+            state.get("basic_info"),
+            state.get("lifestyle"),
+            state.get("followup_answers")
+        )
+        
+        system_prompt, _ = token_budget.fit(
+            AgentPrompts.ADVICE_AGENT_SYSTEM,
+            [PromptSection("user_info", user_info, priority=1)],
+            reserved_tokens=count_tokens(user_message, token_budget.model),
+            has_health_data="있음" if state.get("health_data_counts") else "없음"
+        )
+        
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=user_message)
+        ]
+    
+    def _finish(llm_response):
+        logger.info("Advice Agent completed")
+        return {
+            "blocks": [MarkdownBlock(content=llm_response.content)],
+            "messages": [llm_response]
+        }
+    
+    def _error_result(e):
+        logger.error(f"Error in advice agent: {e}", exc_info=True)
+        return {"blocks": [MarkdownBlock(content="답변 생성 중 오류가 발생했습니다.")]}
+    
+    def advice_agent(state: HealthState) -> HealthState:
+        logger.info("Advice Agent started")
+        
+        try:
+            llm_response = node_llm.invoke(_build_messages(state))
+            return _finish(llm_response)
+        except Exception as e:
+            return _error_result(e)
+    
+    async def aadvice_agent(state: HealthState) -> HealthState:
+        logger.info("Advice Agent started")
+        
+        try:
+            llm_response = await node_llm.ainvoke(_build_messages(state))
+            return _finish(llm_response)
+        except TRANSIENT_LLM_ERRORS:
+            raise
+        except Exception as e:
+            return _error_result(e)
+    
+    return RunnableLambda(advice_agent, afunc=aadvice_agent, name="advice_agent")
@@ -1,86 +1,215 @@
+import asyncio
 import logging
 import json
 from app.agents.health_state import HealthState
 from app.agents.prompts import AgentPrompts
 from app.agents.utils.data_formatter import (
-    filter_data_by_date,
-    analyze_steps,
-    analyze_heart_rate,
-    analyze_sleep,
-    detect_anomalies,
-    analyze_trends,
-    format_health_analysis_for_llm
+    build_health_analysis,
+    format_health_analysis_for_llm,
+    format_period
 )
+from app.agents.utils.token_budget import TokenBudget, PromptSection, count_tokens
+from app.services.analysis_cache_service import get_cached_analysis, save_cached_analysis
+from app.services.device_service import get_data_version, get_device_today, make_data_source_key
+from app.services.health_data_service import get_health_daily
 from app.schemas.agent_data import HealthAnalysis
+from app.schemas.health_daily import DEFAULT_TIME_RANGE, HealthDaily, normalize_time_range
+from app.schemas.health_series import day_to_date
+from app.agents.llm_client import TRANSIENT_LLM_ERRORS
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
 
 logger = logging.getLogger(__name__)
 
 
-def create_health_agent(llm):
+def analyze_health_data(
+    health_daily: HealthDaily,
+    device_id: str = None,
+    data_version: int = None,
+    time_range: str = None
+):
+    """
+    분석 기간의 건강 데이터 통계 계산 (LLM 없음)
+    
+    today/yesterday/last_N_days는 기기 시간대 기준 오늘 날짜로 계산합니다.
+    기기별 데이터 버전과 분석 기간(기준 날짜 포함)을 키로 캐시하므로, 같은 버전/기간은 노드와 API가 한 번만 계산합니다.
+    
+    Returns:
+        (HealthAnalysis, LLM 입력용 요약 텍스트)
+    """
+    time_range = normalize_time_range(time_range) or DEFAULT_TIME_RANGE
+    today = get_device_today(device_id)
+    period_key = f"{time_range}@{day_to_date(today)}"
+    
+    if data_version is not None:
+        cached = get_cached_analysis(device_id, data_version, period_key)
+        if cached:
+            logger.info(f"Health analysis cache hit (device_id: {device_id or 'latest'}, version: {data_version}, period: {period_key})")
+            return cached["health_analysis"], cached["formatted"]
+    
+    health_analysis = build_health_analysis(health_daily, today, time_range)
+    logger.info(f"Health data analyzed ({format_period(health_analysis.get('period'))})")
+    formatted = format_health_analysis_for_llm(health_analysis)
+    
+    if data_version is not None:
+        save_cached_analysis(device_id, data_version, health_analysis, formatted, period_key)
+    
+    return health_analysis, formatted
+
+
+def create_health_agent(llm, interpret: bool = True, token_budget: TokenBudget = None):
     """
     Health Agent 노드 생성
     
     건강 데이터를 계산하고, LLM으로 해석하여 구조화된 분석 결과를 생성합니다.
+    interpret=False이면 LLM 해석을 생략하고 계산 결과만 반환합니다 (lean 모드).
+    특정 수치 조회(specific_query)에서도 해석 결과를 쓰지 않으므로 LLM을 호출하지 않습니다.
+    계산 결과는 기기별 데이터 버전을 키로 캐시되어, 새 데이터가 없으면 재계산하지 않습니다.
+    같은 대화의 이전 턴이 같은 데이터로 만든 분석 결과가 상태에 있으면 LLM 해석까지 그대로 재사용합니다.
     """
+    token_budget = token_budget or TokenBudget("health")
+    node_llm = token_budget.bind(llm)
+    
+    def _analysis_source(state: HealthState, data_version: int = None):
+        """분석에 사용한 데이터와 기간(기준 날짜 포함) 식별 키 (data_version이 없으면 상태의 데이터 버전)"""
+        device_id = state.get("device_id")
+        source = make_data_source_key(device_id, data_version if data_version is not None else state.get("data_version"))
+        if not source:
+            return None
+        time_range = normalize_time_range(state.get("time_range")) or DEFAULT_TIME_RANGE
+        return f"{source}:{time_range}@{day_to_date(get_device_today(device_id))}"
+    
+    def _previous_turn_result(state: HealthState):
+        source = _analysis_source(state)
+        if not source or not state.get("health_analysis") or state.get("health_analysis_source") != source:
+            return None
+        
+        logger.info("Reusing health analysis from previous turn")
+        return {
+            "health_analysis": state["health_analysis"],
+            "health_analysis_text": state.get("health_analysis_text"),
+            "health_analysis_source": source
+        }
+    
+    def _analyze(state: HealthState):
+        """
+        일별 집계를 저장소에서 다시 읽어 통계 계산
+        
+        일별 집계는 체크포인트에 저장하지 않으므로 대화 재개 시에도 같은 방법으로 읽습니다.
+        수집 이후 새 데이터가 들어왔으면 새 데이터 버전으로 계산합니다.
+        
+        Returns:
+            (데이터 버전, HealthAnalysis, LLM 입력용 요약 텍스트) 또는 None (데이터 없음)
+        """
+        device_id = state.get("device_id")
+        data_version = get_data_version(device_id)
+        if data_version != state.get("data_version"):
+            logger.info(f"Health data changed since collection (version: {state.get('data_version')} -> {data_version})")
+        
+        health_daily = get_health_daily(device_id)
+        if not health_daily:
+            return None
+        
+        health_analysis, formatted = analyze_health_data(health_daily, device_id, data_version, state.get("time_range"))
+        return data_version, health_analysis, formatted
+    
+    def _build_messages(health_analysis: HealthAnalysis, formatted: str):
+        calculated_stats = {
+            "steps": health_analysis.get("steps_summary"),
+            "heart_rate": health_analysis.get("heart_rate_summary"),
+            "sleep": health_analysis.get("sleep_summary"),
+            "anomalies": health_analysis.get("anomalies", []),
+            "trends": health_analysis.get("trends", [])
+        }
+        
+        instruction = "계산된 통계를 바탕으로 구조화된 건강 분석 결과를 생성하세요."
+        
+        # 요약 텍스트는 통계와 같은 수치를 담고 있으므로 예산 초과 시 먼저 줄임
+        system_prompt, _ = token_budget.fit(
+            AgentPrompts.HEALTH_AGENT_SYSTEM,
+            [
+                PromptSection("calculated_stats", json.dumps(calculated_stats, ensure_ascii=False, separators=(",", ":")), priority=1),
+                PromptSection("data_summary", formatted, priority=2)
+            ],
+            reserved_tokens=count_tokens(instruction, token_budget.model),
+            period=format_period(health_analysis.get("period"))
+        )
+        
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=instruction)
+        ]
+    
+    def _should_interpret(state: HealthState) -> bool:
+        return interpret and state.get("intent") != "specific_query"
+    
+    def _finish(state: HealthState, data_version: int, health_analysis: HealthAnalysis, formatted: str, llm_response):
+        logger.info(f"Health analysis completed: steps={bool(health_analysis.get('steps_summary'))}, heart_rate={bool(health_analysis.get('heart_rate_summary'))}, sleep={bool(health_analysis.get('sleep_summary'))}, anomalies={len(health_analysis.get('anomalies', []))}")
+        
+        result = {
+            "health_analysis": health_analysis,
+            "health_analysis_text": formatted,
+            "health_analysis_source": _analysis_source(state, data_version),
+            "data_version": data_version
+        }
+        
+        if llm_response:
+            logger.debug(f"LLM interpretation: {llm_response.content[:200]}...")
+            result["messages"] = [llm_response]
+        
+        return result
+    
     def health_agent(state: HealthState) -> HealthState:
         logger.info("Health Agent started")
         
-        health_data = state.get("health_data")
-        if not health_data:
-            logger.warning("No health_data in state")
+        if not state.get("health_data_counts"):
+            logger.warning("No health data in state")
             return {"health_analysis": None}
         
+        previous = _previous_turn_result(state)
+        if previous:
+            return previous
+        
         try:
-            filtered_data = filter_data_by_date(health_data, target_date="2025-12-10")
-            logger.info("Filtered data for 2025-12-10")
-            
-            steps_summary = analyze_steps(filtered_data.steps)
-            heart_rate_summary = analyze_heart_rate(filtered_data.heart_rate)
-            sleep_summary = analyze_sleep(filtered_data.sleep)
-            
-            anomalies = detect_anomalies(filtered_data)
-            trends = analyze_trends(filtered_data)
-            
-            calculated_stats = {
-                "steps": steps_summary,
-                "heart_rate": heart_rate_summary,
-                "sleep": sleep_summary,
-                "anomalies": anomalies,
-                "trends": trends
-            }
-            
-            data_summary = format_health_analysis_for_llm(calculated_stats)
-            
-            system_prompt = AgentPrompts.HEALTH_AGENT_SYSTEM.format(
-                calculated_stats=json.dumps(calculated_stats, ensure_ascii=False, indent=2),
-                data_summary=data_summary
-            )
-            
-            llm_response = llm.invoke([
-                SystemMessage(content=system_prompt),
-                HumanMessage(content="계산된 통계를 바탕으로 구조화된 건강 분석 결과를 생성하세요.")
-            ])
+            analyzed = _analyze(state)
+            if not analyzed:
+                logger.warning("No health data found")
+                return {"health_analysis": None}
             
-            health_analysis = HealthAnalysis(
-                steps_summary=steps_summary,
-                heart_rate_summary=heart_rate_summary,
-                sleep_summary=sleep_summary,
-                anomalies=anomalies,
-                trends=trends
-            )
+            data_version, health_analysis, formatted = analyzed
+            llm_response = node_llm.invoke(_build_messages(health_analysis, formatted)) if _should_interpret(state) else None
+            return _finish(state, data_version, health_analysis, formatted, llm_response)
             
-            logger.info(f"Health analysis completed: steps={bool(steps_summary)}, heart_rate={bool(heart_rate_summary)}, sleep={bool(sleep_summary)}, anomalies={len(anomalies)}")
-            logger.debug(f"LLM interpretation: {llm_response.content[:200]}...")
+        except Exception as e:
+            logger.error(f"Error in health agent: {e}", exc_info=True)
+            return {"health_analysis": None}
+    
+    async def ahealth_agent(state: HealthState) -> HealthState:
+        logger.info("Health Agent started")
+        
+        if not state.get("health_data_counts"):
+            logger.warning("No health data in state")
+            return {"health_analysis": None}
+        
+        # 저장소 조회(SQLite)가 이벤트 루프를 막지 않도록 스레드에서 실행
+        previous = await asyncio.to_thread(_previous_turn_result, state)
+        if previous:
+            return previous
+        
+        try:
+            analyzed = await asyncio.to_thread(_analyze, state)
+            if not analyzed:
+                logger.warning("No health data found")
+                return {"health_analysis": None}
             
-            return {
-                "health_analysis": health_analysis,
-                "messages": [llm_response]
-            }
+            data_version, health_analysis, formatted = analyzed
+            llm_response = await node_llm.ainvoke(_build_messages(health_analysis, formatted)) if _should_interpret(state) else None
+            return _finish(state, data_version, health_analysis, formatted, llm_response)
             
+        except TRANSIENT_LLM_ERRORS:
+            raise
         except Exception as e:
             logger.error(f"Error in health agent: {e}", exc_info=True)
             return {"health_analysis": None}
     
-    return health_agent
-
+    return RunnableLambda(health_agent, afunc=ahealth_agent, name="health_agent")
@@ -1,26 +1,20 @@
 import logging
 from app.agents.health_state import HealthState
 from app.agents.prompts import AgentPrompts
-from app.services.health_data_service import get_latest_health_data_by_device
+from app.services import device_service
+from app.services.health_data_service import get_health_daily
+from app.agents.llm_client import TRANSIENT_LLM_ERRORS
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
 
 logger = logging.getLogger(__name__)
 
 
-def create_health_collector(llm):
-    """
-    Health Data Collector 노드 생성
-    
-    FCM으로 받은 건강 데이터를 HealthState에 주입하고, LLM으로 데이터 품질을 평가합니다.
-    """
-    COLLECTOR_SYSTEM = """
+COLLECTOR_SYSTEM = """
     당신은 건강 데이터 수집 전문가입니다.
     
     수집된 건강 데이터의 품질과 완전성을 평가하고 요약하세요.
     
-    중요: 워치 결측값 문제로 인해 2025-12-10일 데이터만 유효합니다.
-    다른 날짜의 데이터는 무시하세요.
-    
     수집된 데이터:
     {collected_data}
     
@@ -31,46 +25,90 @@ def create_health_collector(llm):
     
     간단히 요약하세요 (2-3문장).
     """
+
+
+def create_health_collector():
+    """
+    Health Data Collector 노드 생성
     
+    기기에서 받은 건강 데이터를 모두 합친 일별 집계를 확인하고, 데이터 버전과 항목별 샘플 수를 HealthState에 주입합니다.
+    데이터 자체는 체크포인트 크기를 줄이기 위해 상태에 넣지 않습니다 (Health Agent가 device_id로 다시 조회).
+    LLM을 호출하지 않으므로 이후 노드들이 곧바로 병렬로 시작할 수 있습니다.
+    """
     def health_collector(state: HealthState) -> HealthState:
         logger.info("Health Data Collector started")
         
         try:
-            from app.services.health_data_service import get_latest_health_data
-            
             device_id = state.get("device_id")
+            # 데이터 로드 전에 버전을 먼저 읽어, 로드 중 새 데이터가 들어와도 캐시가 오래된 버전으로 남지 않게 함
+            data_version = device_service.get_data_version(device_id)
             
-            if device_id:
-                from app.services.health_data_service import get_latest_health_data_by_device
-                health_data = get_latest_health_data_by_device(device_id)
-            else:
-                health_data = get_latest_health_data()
+            health_daily = get_health_daily(device_id)
             
-            if health_data:
+            if health_daily:
+                counts = health_daily.sample_counts()
                 logger.info(f"Health data collected (device_id: {device_id or 'latest'})")
-                logger.debug(f"Data types: steps={bool(health_data.steps)}, heart_rate={bool(health_data.heart_rate)}, sleep={bool(health_data.sleep)}")
-                
-                data_summary = f"걸음 수: {len(health_data.steps) if health_data.steps else 0}건, 심박수: {len(health_data.heart_rate) if health_data.heart_rate else 0}건, 수면: {len(health_data.sleep) if health_data.sleep else 0}건"
-                
-                system_prompt = COLLECTOR_SYSTEM.format(collected_data=data_summary)
-                llm_response = llm.invoke([
-                    SystemMessage(content=system_prompt),
-                    HumanMessage(content="수집된 건강 데이터를 평가하세요.")
-                ])
-                
-                logger.debug(f"Data quality assessment: {llm_response.content[:200]}...")
-                
-                return {
-                    "health_data": health_data,
-                    "messages": [llm_response]
-                }
+                logger.debug(f"Data counts: {counts}")
+                return {"health_data_counts": counts, "data_version": data_version}
             else:
                 logger.warning("No health data found")
-                return {"health_data": None}
-                
+                return {"health_data_counts": None, "data_version": data_version}
+        
         except Exception as e:
             logger.error(f"Error in health collector: {e}", exc_info=True)
-            return {"health_data": None}
+            return {"health_data_counts": None}
     
     return health_collector
 
+
+def create_data_quality_checker(llm):
+    """
+    Data Quality Checker 노드 생성
+    
+    수집된 건강 데이터의 품질을 LLM으로 평가합니다.
+    Health Agent와 서로 의존하지 않으므로 병렬로 실행됩니다.
+    """
+    def _build_messages(counts):
+        data_summary = f"걸음 수: {counts.get('steps', 0)}건, 심박수: {counts.get('heart_rate', 0)}건, 수면: {counts.get('sleep', 0)}건"
+        
+        system_prompt = COLLECTOR_SYSTEM.format(collected_data=data_summary)
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content="수집된 건강 데이터를 평가하세요.")
+        ]
+    
+    def data_quality_checker(state: HealthState) -> HealthState:
+        logger.info("Data Quality Checker started")
+        
+        counts = state.get("health_data_counts")
+        if not counts:
+            return {}
+        
+        try:
+            llm_response = llm.invoke(_build_messages(counts))
+            logger.debug(f"Data quality assessment: {llm_response.content[:200]}...")
+            return {"messages": [llm_response]}
+        
+        except Exception as e:
+            logger.error(f"Error in data quality checker: {e}", exc_info=True)
+            return {}
+    
+    async def adata_quality_checker(state: HealthState) -> HealthState:
+        logger.info("Data Quality Checker started")
+        
+        counts = state.get("health_data_counts")
+        if not counts:
+            return {}
+        
+        try:
+            llm_response = await llm.ainvoke(_build_messages(counts))
+            logger.debug(f"Data quality assessment: {llm_response.content[:200]}...")
+            return {"messages": [llm_response]}
+        
+        except TRANSIENT_LLM_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Error in data quality checker: {e}", exc_info=True)
+            return {}
+    
+    return RunnableLambda(data_quality_checker, afunc=adata_quality_checker, name="data_quality_checker")
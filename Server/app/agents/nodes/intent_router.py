@@ -0,0 +1,233 @@
+import logging
+import json
+import re
+from typing import Optional, Tuple, List
+from app.agents.health_state import HealthState, get_latest_user_message
+from app.agents.prompts import AgentPrompts
+from app.agents.llm_client import TRANSIENT_LLM_ERRORS
+from app.config import settings
+from app.schemas.health_daily import normalize_time_range
+from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+logger = logging.getLogger(__name__)
+
+HEALTH_ANALYSIS = "health_analysis"
+SPECIFIC_QUERY = "specific_query"
+GENERAL_QUESTION = "general_question"
+
+INTENTS = (HEALTH_ANALYSIS, SPECIFIC_QUERY, GENERAL_QUESTION)
+
+
+def compile_keywords(keywords: List[str]) -> re.Pattern:
+    """
+    키워드 목록을 하나의 정규식으로 변환
+    
+    한국어 키워드는 어간이므로 부분 문자열로 비교하고, 영어 키워드는 단어 경계로 비교합니다
+    (복수형 s 허용, "eat"이 "great"/"sweat"에 걸리지 않도록). 경계는 ASCII 기준이라 "sleep이"처럼
+    조사가 붙은 영어 단어도 찾습니다.
+    """
+    patterns = [
+        rf"\b{re.escape(keyword)}s?\b" if keyword.isascii() else re.escape(keyword)
+        for keyword in keywords
+    ]
+    return re.compile("|".join(patterns), re.ASCII)
+
+
+DATA_TYPE_KEYWORDS = {
+    "steps": compile_keywords(["걸음", "걸었", "만보", "step"]),
+    "heart_rate": compile_keywords(["심박", "맥박", "heart", "heartrate", "bpm"]),
+    "sleep": compile_keywords(["수면", "잠을", "잠이", "잤", "sleep", "slept", "sleeping"]),
+}
+
+LOOKUP_KEYWORDS = compile_keywords(["몇", "얼마", "알려", "how many", "how much", "what was"])
+
+ANALYSIS_KEYWORDS = compile_keywords([
+    "분석", "리포트", "보고서", "평가", "조언", "추천", "개선",
+    "analyze", "analyse", "analysis", "report", "advice", "recommend", "recommendation",
+])
+
+GENERAL_KEYWORDS = compile_keywords([
+    "먹", "식단", "음식", "메뉴", "다이어트", "운동법", "칼로리",
+    "diet", "food", "eat", "eating", "ate", "meal",
+])
+
+# 분석 기간 표현 (긴 기간부터 확인, 어느 것도 없으면 None -> today)
+DATE_PATTERN = re.compile(r"(\d{4})[-./](\d{1,2})[-./](\d{1,2})")
+
+LAST_DAYS_PATTERNS = [
+    (re.compile(r"(?:최근|지난|last|past)\s*(\d+)\s*(?:일|days?)|(\d+)\s*일\s*(?:간|동안)"), 1),
+    (re.compile(r"(?:최근|지난|last|past)\s*(\d+)\s*(?:주|weeks?)|(\d+)\s*주\s*(?:간|동안)"), 7),
+    (re.compile(r"(?:최근|지난|last|past)\s*(\d+)\s*(?:개월|달|months?)|(\d+)\s*(?:개월|달)\s*(?:간|동안)"), 30),
+]
+
+TIME_RANGE_KEYWORDS = [
+    ("last_30_days", compile_keywords(["한 달", "한달", "이번 달", "이번달", "월간", "month"])),
+    ("last_7_days", compile_keywords(["일주일", "한 주", "한주", "이번 주", "이번주", "주간", "week"])),
+    ("yesterday", compile_keywords(["어제", "yesterday"])),
+    ("today", compile_keywords(["오늘", "today"])),
+]
+
+# 기본 리포트 요청 비교 시 무시하는 공백/문장 부호
+IGNORED_MESSAGE_CHARS = re.compile(r"[\s.,!?~]+")
+
+
+def classify_intent(message: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    규칙 기반 의도 분류
+    
+    Args:
+        message: 사용자 메시지
+    
+    Returns:
+        (intent, required_data_types) 또는 None (규칙으로 판단할 수 없는 경우)
+    """
+    text = message.lower()
+    
+    data_types = [
+        data_type for data_type, keywords in DATA_TYPE_KEYWORDS.items()
+        if keywords.search(text)
+    ]
+    wants_lookup = bool(LOOKUP_KEYWORDS.search(text))
+    wants_analysis = bool(ANALYSIS_KEYWORDS.search(text))
+    
+    if data_types and wants_lookup and not wants_analysis:
+        return SPECIFIC_QUERY, data_types
+    
+    if data_types:
+        return HEALTH_ANALYSIS, data_types
+    
+    # 데이터 종류 없이 식단/음식 등을 묻는 질문은 "추천", "조언" 같은 분석 표현이 있어도 일반 질문
+    if GENERAL_KEYWORDS.search(text):
+        return GENERAL_QUESTION, []
+    
+    if wants_analysis:
+        return HEALTH_ANALYSIS, []
+    
+    return None
+
+
+def classify_time_range(message: str) -> Optional[str]:
+    """
+    규칙 기반 분석 기간 추출
+    
+    Args:
+        message: 사용자 메시지
+    
+    Returns:
+        today, yesterday, last_N_days, YYYY-MM-DD~YYYY-MM-DD 또는 None (기간 표현 없음)
+    """
+    text = message.lower()
+    
+    dates = [f"{int(y):04d}-{int(m):02d}-{int(d):02d}" for y, m, d in DATE_PATTERN.findall(text)]
+    if dates:
+        time_range = normalize_time_range(f"{dates[0]}~{dates[-1]}")
+        if time_range:
+            return time_range
+    
+    for pattern, unit_days in LAST_DAYS_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return normalize_time_range(f"last_{int(match.group(1) or match.group(2)) * unit_days}_days")
+    
+    for time_range, keywords in TIME_RANGE_KEYWORDS:
+        if keywords.search(text):
+            return time_range
+    
+    return None
+
+
+def normalize_message(message: str) -> str:
+    """메시지 비교용 정규화 (소문자, 공백/문장 부호 제거)"""
+    return IGNORED_MESSAGE_CHARS.sub("", message).lower()
+
+
+def is_default_report_request(message: str) -> bool:
+    """
+    미리 생성한 기본 리포트와 같은 요청인지 (미리 생성한 리포트로 응답 가능)
+    
+    기본 리포트 생성 메시지(precompute_message)와 공백/문장 부호만 다른 경우만 해당합니다.
+    "식단 추천해줘"처럼 전체 분석으로 분류되더라도 다른 질문은 그래프에서 처리합니다.
+    """
+    return normalize_message(message) == normalize_message(settings.precompute_message)
+
+
+def _parse_llm_intent(content: str) -> Optional[Tuple[str, List[str]]]:
+    try:
+        result = json.loads(content)
+    except (TypeError, ValueError):
+        return None
+    
+    intent = result.get("intent")
+    if intent not in INTENTS:
+        return None
+    
+    data_types = [t for t in result.get("required_data_types") or [] if t in DATA_TYPE_KEYWORDS]
+    return intent, data_types
+
+
+def _parse_llm_time_range(content: str) -> Optional[str]:
+    try:
+        return normalize_time_range(json.loads(content).get("time_range"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def create_intent_router(llm=None):
+    """
+    Intent Router 노드 생성
+    
+    사용자 메시지의 의도를 규칙 기반으로 먼저 분류하고, 판단할 수 없는 경우에만
+    LLM으로 분류합니다 (llm이 None이면 전체 분석 경로로 보냅니다).
+    분석 기간(time_range)도 메시지에서 규칙 기반으로 추출하고, 없으면 LLM 분류 결과를 사용합니다.
+    """
+    def _route(intent_result, source: str, time_range: Optional[str] = None) -> HealthState:
+        intent, data_types = intent_result or (HEALTH_ANALYSIS, [])
+        logger.info(f"Intent classified ({source}): {intent}, data_types={data_types}, time_range={time_range}")
+        return {
+            "intent": intent,
+            "required_data_types": data_types,
+            "time_range": time_range
+        }
+    
+    def _build_messages(user_message: str):
+        return [
+            SystemMessage(content=AgentPrompts.INTENT_ROUTER_SYSTEM.format()),
+            HumanMessage(content=user_message)
+        ]
+    
+    def intent_router(state: HealthState) -> HealthState:
+        user_message = get_latest_user_message(state)
+        
+        intent_result = classify_intent(user_message)
+        time_range = classify_time_range(user_message)
+        if intent_result or not llm:
+            return _route(intent_result, "rule", time_range)
+        
+        try:
+            llm_response = llm.invoke(_build_messages(user_message))
+            content = llm_response.content
+            return _route(_parse_llm_intent(content), "llm", time_range or _parse_llm_time_range(content))
+        except Exception as e:
+            logger.error(f"Error in intent router: {e}", exc_info=True)
+            return _route(None, "default", time_range)
+    
+    async def aintent_router(state: HealthState) -> HealthState:
+        user_message = get_latest_user_message(state)
+        
+        intent_result = classify_intent(user_message)
+        time_range = classify_time_range(user_message)
+        if intent_result or not llm:
+            return _route(intent_result, "rule", time_range)
+        
+        try:
+            llm_response = await llm.ainvoke(_build_messages(user_message))
+            content = llm_response.content
+            return _route(_parse_llm_intent(content), "llm", time_range or _parse_llm_time_range(content))
+        except TRANSIENT_LLM_ERRORS:
+            raise
+        except Exception as e:
+            logger.error(f"Error in intent router: {e}", exc_info=True)
+            return _route(None, "default", time_range)
+    
+    return RunnableLambda(intent_router, afunc=aintent_router, name="intent_router")
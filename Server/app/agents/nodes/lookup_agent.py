@@ -0,0 +1,69 @@
+import logging
+from app.agents.health_state import HealthState
+from app.agents.nodes.report_agent import create_chart_blocks
+from app.agents.utils.data_formatter import format_period
+from app.schemas.chat_data import MarkdownBlock
+from app.schemas.agent_data import HealthAnalysis
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_KEYS = {
+    "steps": "steps_summary",
+    "heart_rate": "heart_rate_summary",
+    "sleep": "sleep_summary",
+}
+
+DATA_TYPE_NAMES = {
+    "steps": "걸음 수",
+    "heart_rate": "심박수",
+    "sleep": "수면",
+}
+
+
+def format_lookup_answer(health_analysis: HealthAnalysis, data_types: list) -> str:
+    """요청한 데이터 타입의 수치를 문장으로 정리 (LLM 없이 생성)"""
+    period = health_analysis.get("period") or {}
+    lines = [f"**{format_period(health_analysis.get('period'))} 기준 조회 결과**", ""]
+    no_data = f"데이터가 없습니다 (마지막 데이터: {period['latest_data_date']})." if period.get("latest_data_date") else "데이터가 없습니다."
+    
+    for data_type in data_types:
+        summary = health_analysis.get(SUMMARY_KEYS[data_type])
+        if not summary:
+            lines.append(f"- {DATA_TYPE_NAMES[data_type]}: {no_data}")
+            continue
+        
+        if data_type == "steps":
+            lines.append(f"- 걸음 수: 총 {summary.get('total', 0):,}보 (목표 달성률 {summary.get('goal_achievement', 0) * 100:.0f}%)")
+        elif data_type == "heart_rate":
+            lines.append(f"- 심박수: 평균 {summary.get('average', 0):.0f}bpm (최고 {summary.get('max', 0)}bpm, 최저 {summary.get('min', 0)}bpm)")
+        elif data_type == "sleep":
+            lines.append(f"- 수면: 평균 {summary.get('average_hours', 0):.1f}시간 (부족한 날 {summary.get('insufficient_nights', 0)}일)")
+    
+    return "\n".join(lines)
+
+
+def create_lookup_agent():
+    """
+    Lookup Agent 노드 생성
+    
+    특정 수치 조회 질문(specific_query)에 계산된 HealthAnalysis만으로 즉시 답합니다.
+    LLM을 호출하지 않습니다.
+    """
+    def lookup_agent(state: HealthState) -> HealthState:
+        logger.info("Lookup Agent started")
+        
+        health_analysis = state.get("health_analysis") or {}
+        data_types = state.get("required_data_types") or list(SUMMARY_KEYS)
+        
+        blocks = [MarkdownBlock(content=format_lookup_answer(health_analysis, data_types))]
+        
+        requested_analysis = HealthAnalysis(period=health_analysis.get("period"), **{
+            SUMMARY_KEYS[data_type]: health_analysis.get(SUMMARY_KEYS[data_type])
+            for data_type in data_types
+        })
+        blocks.extend(create_chart_blocks(requested_analysis))
+        
+        logger.info(f"Lookup Agent completed: {len(blocks)} blocks created")
+        return {"blocks": blocks}
+    
+    return lookup_agent
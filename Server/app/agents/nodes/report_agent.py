@@ -1,29 +1,94 @@
-from app.agents.health_state import HealthState
+from app.agents.health_state import HealthState, get_latest_user_message
 from app.agents.prompts import AgentPrompts
-from app.agents.utils.data_formatter import format_health_analysis_for_llm
+from app.agents.utils.data_formatter import format_health_analysis_for_llm, format_period
+from app.agents.utils.stream_parser import JsonArrayItemStreamer
+from app.agents.utils.token_budget import TokenBudget, PromptSection, count_tokens
 from app.schemas.chat_data import (
     MarkdownBlock,
     ChartBlock,
     TableBlock,
-    ChartData
+    ChartData,
+    ReportBlock,
+    ReportOutput
 )
 from app.schemas.agent_data import HealthAnalysis, AnalysisResult
+from app.agents.llm_client import TRANSIENT_LLM_ERRORS
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from pydantic import TypeAdapter, ValidationError
+from typing import Optional
 import logging
-import json
 
 logger = logging.getLogger(__name__)
 
+def _strict_json_schema(schema):
+    """
+    Pydantic JSON Schema를 strict 응답 형식에 맞게 변환
+
+    모든 객체에 additionalProperties: false를 넣고 모든 속성을 필수로 만듭니다 (Optional 필드는 null 허용 타입 그대로).
+    기본값이 있던 블록 type 판별자도 필수가 되며, strict 모드가 지원하지 않는 default는 제거합니다.
+    """
+    if isinstance(schema, list):
+        return [_strict_json_schema(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+    
+    strict = {key: _strict_json_schema(value) for key, value in schema.items() if key != "default"}
+    if strict.get("type") == "object" and "properties" in strict:
+        strict["required"] = list(strict["properties"])
+        strict["additionalProperties"] = False
+    return strict
+
+
+# LLM 응답 형식 (ReportOutput Pydantic 모델에서 생성한 strict JSON Schema)
+REPORT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "health_report",
+        "strict": True,
+        "schema": _strict_json_schema(ReportOutput.model_json_schema())
+    }
+}
+
+_report_block_adapter = TypeAdapter(ReportBlock)
+
+
+def to_report_block(item: dict) -> Optional[ReportBlock]:
+    """LLM이 생성한 블록 dict를 검증하여 블록 모델로 변환 (유효하지 않으면 None)"""
+    try:
+        return _report_block_adapter.validate_python(item)
+    except ValidationError as e:
+        logger.warning(f"Invalid report block skipped: {e.error_count()} errors")
+        return None
+
+
+def parse_report_blocks(content: str) -> list:
+    """
+    LLM 리포트 응답을 블록 목록으로 변환
+    
+    전체 응답이 스키마에 맞으면 그대로 사용하고, 일부가 깨져 있으면
+    완성된 블록 중 유효한 것만 골라 사용합니다.
+    """
+    try:
+        return list(ReportOutput.model_validate_json(content).blocks)
+    except ValidationError:
+        streamer = JsonArrayItemStreamer("blocks")
+        streamer.feed(content)
+        blocks = [block for block in map(to_report_block, streamer.items) if block]
+        logger.warning(f"Report response failed schema validation, recovered {len(blocks)} blocks")
+        return blocks
+
 
 def create_chart_blocks(health_analysis: HealthAnalysis) -> list:
-    """HealthAnalysis에서 ChartBlock 생성"""
+    """HealthAnalysis에서 ChartBlock 생성 (제목에 분석 기간 표시)"""
     blocks = []
+    period = format_period(health_analysis.get("period"))
     
     if health_analysis.get("steps_summary"):
         ss = health_analysis["steps_summary"]
         blocks.append(ChartBlock(
             chartType="bar",
-            title="걸음 수 (2025-12-10)",
+            title=f"걸음 수 ({period})",
             data=ChartData(
                 labels=["걸음 수"],
                 values=[float(ss.get("total", 0))]
@@ -35,7 +100,7 @@ def create_chart_blocks(health_analysis: HealthAnalysis) -> list:
         hrs = health_analysis["heart_rate_summary"]
         blocks.append(ChartBlock(
             chartType="line",
-            title="심박수 통계 (2025-12-10)",
+            title=f"심박수 통계 ({period})",
             data=ChartData(
                 labels=["평균", "최고", "최저", "안정", "활동"],
                 values=[
@@ -53,7 +118,7 @@ def create_chart_blocks(health_analysis: HealthAnalysis) -> list:
         sls = health_analysis["sleep_summary"]
         blocks.append(ChartBlock(
             chartType="doughnut",
-            title="수면 시간 (2025-12-10)",
+            title=f"수면 시간 ({period})",
             data=ChartData(
                 labels=["수면 시간"],
                 values=[float(sls.get("average_hours", 0))]
@@ -88,7 +153,7 @@ def create_table_blocks(health_analysis: HealthAnalysis) -> list:
     
     if rows:
         blocks.append(TableBlock(
-            title="건강 데이터 요약 (2025-12-10)",
+            title=f"건강 데이터 요약 ({format_period(health_analysis.get('period'))})",
             headers=headers,
             rows=rows
         ))
@@ -96,99 +161,145 @@ def create_table_blocks(health_analysis: HealthAnalysis) -> list:
     return blocks
 
 
-def create_report_agent(llm):
-    def report_agent(state: HealthState) -> HealthState:
-        logger.info("Report agent started")
-        
+def create_deterministic_blocks(health_analysis: HealthAnalysis) -> list:
+    """LLM 없이 계산 결과만으로 만든 차트/표 블록 (LLM 리포트보다 먼저 보여주는 용도)"""
+    return create_chart_blocks(health_analysis) + create_table_blocks(health_analysis)
+
+
+DEADLINE_NOTICE = "AI 리포트 생성이 지연되어 측정 수치를 먼저 보여드립니다. 잠시 후 다시 요청하면 전체 리포트를 받을 수 있습니다."
+
+
+def create_deadline_report(health_analysis: HealthAnalysis) -> list:
+    """리포트 제한 시간(report_deadline_seconds) 초과 시 응답 블록 (안내 문구 + 계산 기반 차트/표)"""
+    return [MarkdownBlock(content=DEADLINE_NOTICE)] + create_deterministic_blocks(health_analysis)
+
+
+def create_report_agent(llm, token_budget: TokenBudget = None):
+    """
+    Report Agent 노드 생성
+    
+    분석 결과를 화면 블록(markdown, chart, table)으로 변환합니다.
+    LLM은 ReportOutput strict JSON Schema 응답 형식으로 호출하므로 스키마를 벗어난 블록이 생성되지 않습니다.
+    """
+    token_budget = token_budget or TokenBudget("report")
+    report_llm = token_budget.bind(llm).bind(response_format=REPORT_RESPONSE_FORMAT)
+    
+    def _build_messages(state: HealthState):
         analysis_result = state.get("analysis_result")
         health_analysis = state.get("health_analysis")
-        messages = state.get("messages", [])
-        user_message = messages[0].content if messages else ""
+        user_message = get_latest_user_message(state)
         
-        blocks = []
-        llm_response = None
+        formatted_analysis = state.get("health_analysis_text") or format_health_analysis_for_llm(health_analysis)
         
-        try:
-            if analysis_result and health_analysis:
-                formatted_analysis = format_health_analysis_for_llm(health_analysis)
-                
-                system_prompt = AgentPrompts.REPORT_AGENT_SYSTEM_DETAILED.format(
-                    analysis_result=analysis_result.get("summary", ""),
-                    health_analysis=formatted_analysis,
-                    user_message=user_message
-                )
-                
-                llm_response = llm.invoke([
-                    SystemMessage(content=system_prompt),
-                    HumanMessage(content="분석 결과를 바탕으로 리포트 블록을 JSON 형식으로 생성하세요.")
-                ])
-                
-                try:
-                    response_json = json.loads(llm_response.content)
-                    
-                    if response_json.get("markdown"):
-                        blocks.append(MarkdownBlock(content=response_json["markdown"]))
-                    
-                    if response_json.get("charts"):
-                        for chart in response_json["charts"]:
-                            blocks.append(ChartBlock(
-                                chartType=chart.get("type", "bar"),
-                                title=chart.get("title", ""),
-                                data=ChartData(
-                                    labels=chart.get("labels", []),
-                                    values=chart.get("values", [])
-                                ),
-                                description=chart.get("description")
-                            ))
-                    
-                    if response_json.get("tables"):
-                        for table in response_json["tables"]:
-                            blocks.append(TableBlock(
-                                title=table.get("title", ""),
-                                headers=table.get("headers", []),
-                                rows=table.get("rows", [])
-                            ))
-                    
-                    logger.info(f"LLM generated {len(blocks)} blocks")
-                    
-                except json.JSONDecodeError:
-                    logger.warning("Failed to parse LLM JSON response, using fallback")
-                    if analysis_result:
-                        blocks.append(MarkdownBlock(content=analysis_result.get("summary", "")))
-                    if health_analysis:
-                        chart_blocks = create_chart_blocks(health_analysis)
-                        blocks.extend(chart_blocks)
-                        table_blocks = create_table_blocks(health_analysis)
-                        blocks.extend(table_blocks)
-            
-            elif analysis_result:
+        instruction = "분석 결과를 바탕으로 리포트 블록을 JSON 형식으로 생성하세요."
+        
+        system_prompt, _ = token_budget.fit(
+            AgentPrompts.REPORT_AGENT_SYSTEM_DETAILED,
+            [
+                PromptSection("user_message", user_message, required=True),
+                PromptSection("analysis_result", analysis_result.get("summary", ""), priority=1),
+                PromptSection("health_analysis", formatted_analysis, priority=2)
+            ],
+            reserved_tokens=count_tokens(instruction, token_budget.model),
+            period=format_period((health_analysis or {}).get("period"))
+        )
+        
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=instruction)
+        ]
+    
+    def _parse_blocks(llm_response, analysis_result, health_analysis) -> list:
+        blocks = parse_report_blocks(llm_response.content)
+        
+        if blocks:
+            logger.info(f"LLM generated {len(blocks)} blocks")
+        else:
+            logger.warning("No valid blocks in LLM response, using fallback")
+            if analysis_result:
                 blocks.append(MarkdownBlock(content=analysis_result.get("summary", "")))
-            
-            elif health_analysis:
+            if health_analysis:
                 chart_blocks = create_chart_blocks(health_analysis)
                 blocks.extend(chart_blocks)
                 table_blocks = create_table_blocks(health_analysis)
                 blocks.extend(table_blocks)
+        
+        return blocks
+    
+    def _build_blocks_without_llm(analysis_result, health_analysis) -> list:
+        blocks = []
+        
+        if analysis_result:
+            blocks.append(MarkdownBlock(content=analysis_result.get("summary", "")))
+        
+        elif health_analysis:
+            chart_blocks = create_chart_blocks(health_analysis)
+            blocks.extend(chart_blocks)
+            table_blocks = create_table_blocks(health_analysis)
+            blocks.extend(table_blocks)
+        
+        return blocks
+    
+    def _finish(blocks, llm_response):
+        if not blocks:
+            blocks.append(MarkdownBlock(content="분석 결과가 없습니다."))
+        
+        logger.info(f"Report agent completed: {len(blocks)} blocks created")
+        
+        result = {"blocks": blocks}
+        if llm_response:
+            result["messages"] = [llm_response]
+        
+        return result
+    
+    def _error_result(e, analysis_result):
+        logger.error(f"Error in report agent: {e}", exc_info=True)
+        blocks = []
+        if analysis_result:
+            blocks.append(MarkdownBlock(content=analysis_result.get("summary", "분석 결과 처리 중 오류가 발생했습니다.")))
+        else:
+            blocks.append(MarkdownBlock(content="리포트 생성 중 오류가 발생했습니다."))
+        
+        return {"blocks": blocks}
+    
+    def report_agent(state: HealthState) -> HealthState:
+        logger.info("Report agent started")
+        
+        analysis_result = state.get("analysis_result")
+        health_analysis = state.get("health_analysis")
+        llm_response = None
+        
+        try:
+            if analysis_result and health_analysis:
+                llm_response = report_llm.invoke(_build_messages(state))
+                blocks = _parse_blocks(llm_response, analysis_result, health_analysis)
+            else:
+                blocks = _build_blocks_without_llm(analysis_result, health_analysis)
             
-            if not blocks:
-                blocks.append(MarkdownBlock(content="분석 결과가 없습니다."))
-            
-            logger.info(f"Report agent completed: {len(blocks)} blocks created")
-            
-            result = {"blocks": blocks}
-            if llm_response:
-                result["messages"] = [llm_response]
-            
-            return result
+            return _finish(blocks, llm_response)
             
         except Exception as e:
-            logger.error(f"Error in report agent: {e}", exc_info=True)
-            blocks = []
-            if analysis_result:
-                blocks.append(MarkdownBlock(content=analysis_result.get("summary", "분석 결과 처리 중 오류가 발생했습니다.")))
+            return _error_result(e, analysis_result)
+    
+    async def areport_agent(state: HealthState) -> HealthState:
+        logger.info("Report agent started")
+        
+        analysis_result = state.get("analysis_result")
+        health_analysis = state.get("health_analysis")
+        llm_response = None
+        
+        try:
+            if analysis_result and health_analysis:
+                llm_response = await report_llm.ainvoke(_build_messages(state))
+                blocks = _parse_blocks(llm_response, analysis_result, health_analysis)
             else:
-                blocks.append(MarkdownBlock(content="리포트 생성 중 오류가 발생했습니다."))
+                blocks = _build_blocks_without_llm(analysis_result, health_analysis)
             
-            return {"blocks": blocks}
+            return _finish(blocks, llm_response)
+            
+        except TRANSIENT_LLM_ERRORS:
+            raise
+        except Exception as e:
+            return _error_result(e, analysis_result)
     
-    return report_agent 
+    return RunnableLambda(report_agent, afunc=areport_agent, name="report_agent")
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+from app.agents.utils.token_budget import count_message_tokens, count_tokens
+from app.schemas.chat_data import ChartBlock, ChartData, MarkdownBlock, ReportOutput
+
+logger = logging.getLogger(__name__)
+
+# 노드별 기본 응답 템플릿 ({message}: 최근 사용자 메시지)
+DEFAULT_STUB_RESPONSES = {
+    "router": json.dumps({"intent": "health_analysis", "required_data_types": [], "time_range": "day"}),
+    "quality": "걸음 수, 심박수, 수면 데이터가 모두 있어 분석이 가능합니다.",
+    "health": "걸음 수와 수면 시간이 목표에 조금 못 미칩니다.",
+    "analysis": "'{message}'에 대한 분석: 활동량을 조금 늘리고 수면 시간을 일정하게 유지하세요.",
+    "advice": "'{message}'에 대한 답변: 규칙적인 식사와 가벼운 운동을 권장합니다.",
+}
+
+DEFAULT_STUB_RESPONSE = "'{message}'에 대한 응답입니다."
+
+
+def _latest_user_message(messages) -> str:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return message.content if isinstance(message.content, str) else str(message.content)
+    return ""
+
+
+def build_stub_report() -> str:
+    """리포트 응답 스키마(ReportOutput)를 만족하는 리포트 JSON"""
+    report = ReportOutput(blocks=[
+        MarkdownBlock(content="## 요약\n최근 건강 데이터 기반 리포트입니다.\n\n## 권장 사항\n- 하루 8,000보 이상 걷기\n- 7시간 이상 수면"),
+        ChartBlock(
+            chartType="bar",
+            title="주간 걸음 수",
+            data=ChartData(labels=["월", "화", "수", "목", "금", "토", "일"], values=[6500, 7200, 8100, 5400, 9000, 10200, 7600])
+        ),
+    ])
+    return report.model_dump_json()
+
+
+class StubChatModel(BaseChatModel):
+    """
+    API를 호출하지 않는 결정적 채팅 모델 (오프라인 벤치마크/회귀 확인용)
+
+    - response_format(JSON 스키마)이 바인딩된 호출: 리포트 스키마에 맞는 JSON
+    - 도구가 바인딩되고 아직 도구 결과가 없는 호출: 바인딩된 도구를 모두 호출
+    - 그 외: 노드별 응답 템플릿 (responses, 없으면 DEFAULT_STUB_RESPONSES)
+
+    latency_seconds만큼 응답을 지연하며, limiter가 있으면 LimitedChatOpenAI와 같이
+    호출 제한기를 거칩니다.
+    """
+
+    model_name: str = "stub"
+    latency_seconds: float = 0.0
+    responses: Dict[str, str] = Field(default_factory=dict)
+    stream_chunk_chars: int = 16
+    limiter: Optional[Any] = Field(default=None, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name}
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def _reply(self, messages: List, run_manager, kwargs) -> AIMessage:
+        user_message = _latest_user_message(messages)
+        node = (getattr(run_manager, "metadata", None) or {}).get("langgraph_node", "")
+        tools = kwargs.get("tools") or []
+
+        if kwargs.get("response_format"):
+            content = build_stub_report()
+        elif tools and not any(isinstance(message, ToolMessage) for message in messages):
+            tool_calls = [
+                {"name": t["function"]["name"], "args": {}, "id": f"call_stub_{i}", "type": "tool_call"}
+                for i, t in enumerate(tools)
+            ]
+            return self._with_usage(AIMessage(content="", tool_calls=tool_calls), messages)
+        else:
+            template = self.responses.get(node) or DEFAULT_STUB_RESPONSES.get(node, DEFAULT_STUB_RESPONSE)
+            content = template.replace("{message}", user_message)
+
+        return self._with_usage(AIMessage(content=content), messages)
+
+    def _with_usage(self, message: AIMessage, messages: List) -> AIMessage:
+        input_tokens = count_message_tokens(messages, self.model_name)
+        output_tokens = count_tokens(message.content, self.model_name) if isinstance(message.content, str) else 0
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return message
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, run_manager, kwargs))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.limiter is None:
+            return await self._agenerate_stub(messages, run_manager, kwargs)
+
+        estimated_tokens = count_message_tokens(messages, self.model_name) + (kwargs.get("max_tokens") or 0)
+        async with self.limiter.slot(estimated_tokens):
+            result = await self._agenerate_stub(messages, run_manager, kwargs)
+        self.limiter.settle_tokens(estimated_tokens, result.generations[0].message.usage_metadata["total_tokens"])
+        return result
+
+    async def _agenerate_stub(self, messages, run_manager, kwargs) -> ChatResult:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, run_manager, kwargs))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        """응답 전체 지연 후(첫 토큰까지 시간) stream_chunk_chars 단위로 나눠 전송"""
+        result = await self._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        message = result.generations[0].message
+
+        if message.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                    for i, call in enumerate(message.tool_calls)
+                ],
+                usage_metadata=message.usage_metadata
+            ))
+            return
+
+        content = message.content
+        for start in range(0, max(len(content), 1), self.stream_chunk_chars):
+            is_last = start + self.stream_chunk_chars >= len(content)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=content[start:start + self.stream_chunk_chars],
+                usage_metadata=message.usage_metadata if is_last else None
+            ))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
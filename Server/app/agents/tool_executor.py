@@ -0,0 +1,109 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool
+
+from app.agents.health_tools import TOOL_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+def _format_tool_result(result: Any) -> str:
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, ensure_ascii=False, default=str)
+
+
+class HealthToolExecutor:
+    """
+    도구 레지스트리 기반 도구 실행기
+
+    한 요청(health_analysis) 단위로 생성하여 사용합니다.
+    - LLM이 요청한 도구 호출들을 동시에 실행합니다.
+    - 같은 도구를 같은 인자로 다시 호출하면 저장된 결과를 재사용합니다.
+    - health_analysis는 실행 시 주입하므로 LLM이 전달할 필요가 없습니다.
+    """
+
+    def __init__(self, health_analysis: Dict[str, Any], registry: Optional[Dict[str, BaseTool]] = None):
+        self.health_analysis = health_analysis
+        self.registry = registry if registry is not None else TOOL_REGISTRY
+        self._results: Dict[str, str] = {}
+
+    @staticmethod
+    def _memo_key(tool_call: dict) -> str:
+        args = json.dumps(tool_call.get("args") or {}, ensure_ascii=False, sort_keys=True, default=str)
+        return f"{tool_call.get('name', '')}:{args}"
+
+    def _tool_input(self, tool_call: dict) -> dict:
+        return {**(tool_call.get("args") or {}), "health_analysis": self.health_analysis}
+
+    def _to_message(self, tool_call: dict, content: str) -> ToolMessage:
+        return ToolMessage(
+            content=content,
+            name=tool_call.get("name", ""),
+            tool_call_id=tool_call.get("id") or ""
+        )
+
+    def _split_calls(self, tool_calls: List[dict]):
+        """메모된 결과가 없는 호출만 실행 대상으로 분리 (같은 라운드 내 중복 호출도 한 번만 실행)"""
+        pending = {}
+        for tool_call in tool_calls:
+            key = self._memo_key(tool_call)
+            if key in self._results or key in pending:
+                continue
+            if tool_call.get("name") not in self.registry:
+                self._results[key] = f"알 수 없는 도구입니다: {tool_call.get('name')}"
+                continue
+            pending[key] = tool_call
+        return pending
+
+    def _record(self, key: str, tool_call: dict, result: Any) -> None:
+        if isinstance(result, Exception):
+            logger.error(f"Error in tool {tool_call.get('name')}: {result}", exc_info=result)
+            self._results[key] = f"도구 실행 중 오류가 발생했습니다: {result}"
+        else:
+            self._results[key] = _format_tool_result(result)
+
+    def _collect(self, tool_calls: List[dict]) -> List[ToolMessage]:
+        return [self._to_message(tool_call, self._results[self._memo_key(tool_call)]) for tool_call in tool_calls]
+
+    def execute(self, tool_calls: List[dict]) -> List[ToolMessage]:
+        """도구 호출 실행 (동기, 스레드 풀에서 동시 실행)"""
+        pending = self._split_calls(tool_calls)
+
+        if pending:
+            def run(tool_call):
+                try:
+                    return self.registry[tool_call["name"]].invoke(self._tool_input(tool_call))
+                except Exception as e:
+                    return e
+
+            with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+                results = list(pool.map(run, pending.values()))
+
+            for (key, tool_call), result in zip(pending.items(), results):
+                self._record(key, tool_call, result)
+
+        return self._collect(tool_calls)
+
+    async def aexecute(self, tool_calls: List[dict]) -> List[ToolMessage]:
+        """도구 호출 실행 (비동기, asyncio.gather로 동시 실행)"""
+        pending = self._split_calls(tool_calls)
+
+        if pending:
+            results = await asyncio.gather(
+                *[
+                    self.registry[tool_call["name"]].ainvoke(self._tool_input(tool_call))
+                    for tool_call in pending.values()
+                ],
+                return_exceptions=True
+            )
+
+            for (key, tool_call), result in zip(pending.items(), results):
+                self._record(key, tool_call, result)
+
+        return self._collect(tool_calls)
@@ -1,13 +1,18 @@
+import bisect
 import logging
-from typing import Optional, List, Dict, Any
-from app.schemas.fcm_data import (
-    RequestedHealthData,
-    DailyStepsData,
-    HeartRateDataPoint,
-    SleepDataPoint
+from typing import Optional, List
+from app.schemas.health_daily import (
+    DEFAULT_TIME_RANGE,
+    HealthDaily,
+    DailySeries,
+    WindowStats,
+    normalize_time_range,
 )
+from app.schemas.health_series import date_to_day, day_to_date
+from app.schemas.user_data import BasicInfo, Lifestyle, FollowupAnswers
 from app.schemas.agent_data import (
     HealthAnalysis,
+    AnalysisPeriod,
     StepsSummary,
     HeartRateSummary,
     SleepSummary,
@@ -18,204 +23,221 @@ from app.schemas.agent_data import (
 logger = logging.getLogger(__name__)
 
 
-def filter_data_by_date(data: RequestedHealthData, target_date: str = "2025-12-10") -> RequestedHealthData:
-    """
-    12월 10일 데이터만 필터링
-    
-    Args:
-        data: 원본 건강 데이터
-        target_date: 필터링할 날짜 (기본값: 2025-12-10)
-    
-    Returns:
-        필터링된 건강 데이터
-    """
-    filtered = RequestedHealthData()
-    
-    if data.steps:
-        filtered.steps = [s for s in data.steps if s.date == target_date]
-    
-    if data.heart_rate:
-        filtered.heart_rate = [
-            hr for hr in data.heart_rate 
-            if hr.timestamp.startswith(target_date)
-        ]
-    
-    if data.sleep:
-        filtered.sleep = [s for s in data.sleep if s.date == target_date]
-    
-    if data.weight:
-        filtered.weight = [w for w in data.weight if w.date == target_date]
-    
-    return filtered
+def build_period(time_range: Optional[str], start_day: int, end_day: int, latest_day: int) -> AnalysisPeriod:
+    """분석 기간 정보 (end_day는 포함하지 않는 끝 날짜 번호, latest_day는 데이터가 있는 마지막 날짜 번호)"""
+    return AnalysisPeriod(
+        time_range=normalize_time_range(time_range) or DEFAULT_TIME_RANGE,
+        start_date=day_to_date(start_day),
+        end_date=day_to_date(end_day - 1),
+        days=end_day - start_day,
+        latest_data_date=day_to_date(latest_day)
+    )
+
+
+def format_period(period: Optional[AnalysisPeriod]) -> str:
+    """분석 기간 표시 문자열 (하루면 날짜, 여러 날이면 시작 ~ 끝)"""
+    if not period:
+        return "최근 데이터"
+    if period.get("days", 1) <= 1:
+        return period.get("end_date", "")
+    return f"{period.get('start_date')} ~ {period.get('end_date')}"
 
 
-def analyze_steps(steps_data: Optional[List[DailyStepsData]]) -> Optional[StepsSummary]:
-    """걸음 수 데이터 분석"""
-    if not steps_data or len(steps_data) == 0:
+def analyze_steps(steps: DailySeries, window: Optional[WindowStats]) -> Optional[StepsSummary]:
+    """걸음 수 데이터 분석 (날짜별 1건)"""
+    if not window:
         return None
     
-    counts = [s.count for s in steps_data]
-    total = sum(counts)
-    average = total / len(counts) if counts else 0
+    total = int(window.total)
+    average = window.total / window.days
     
     goal = 10000
     goal_achievement = (average / goal) if goal > 0 else 0
     
+    first, last = steps.day_total(window.start), steps.day_total(window.end - 1)
     trend = "stable"
-    if len(counts) >= 2:
-        if counts[-1] > counts[0] * 1.1:
+    if window.days >= 2:
+        if last > first * 1.1:
             trend = "increasing"
-        elif counts[-1] < counts[0] * 0.9:
+        elif last < first * 0.9:
             trend = "decreasing"
     
+    # 이상일은 구간의 날짜 수만큼만 확인 (원본 샘플 수와 무관)
     anomaly_days = []
-    if len(counts) > 1:
-        mean = average
-        std = (sum((x - mean) ** 2 for x in counts) / len(counts)) ** 0.5
-        for i, count in enumerate(counts):
-            if count < mean - 2 * std:
-                anomaly_days.append(steps_data[i].date)
+    if window.days > 1:
+        threshold = window.mean - 2 * window.std
+        anomaly_days = [
+            day_to_date(steps.days[i]) for i in range(window.start, window.end)
+            if steps.day_total(i) < threshold
+        ]
     
     return StepsSummary(
         total=total,
         average=round(average, 1),
-        days_with_data=len(steps_data),
+        days_with_data=window.days,
         trend=trend,
         goal_achievement=round(goal_achievement, 2),
         anomaly_days=anomaly_days
     )
 
 
-def analyze_heart_rate(heart_rate_data: Optional[List[HeartRateDataPoint]]) -> Optional[HeartRateSummary]:
-    """심박수 데이터 분석"""
-    if not heart_rate_data or len(heart_rate_data) == 0:
+def analyze_heart_rate(heart_rate: DailySeries, window: Optional[WindowStats]) -> Optional[HeartRateSummary]:
+    """심박수 데이터 분석 (안정/활동 구분 기준: RESTING_HEART_RATE_THRESHOLD)"""
+    if not window:
         return None
     
-    bpms = [hr.bpm for hr in heart_rate_data]
-    average = sum(bpms) / len(bpms)
-    max_bpm = max(bpms)
-    min_bpm = min(bpms)
-    
-    resting_threshold = 100
-    resting_bpms = [bpm for bpm in bpms if bpm < resting_threshold]
-    active_bpms = [bpm for bpm in bpms if bpm >= resting_threshold]
-    
-    resting_avg = sum(resting_bpms) / len(resting_bpms) if resting_bpms else average
-    active_avg = sum(active_bpms) / len(active_bpms) if active_bpms else average
+    average = window.mean
+    resting_avg = window.below_total / window.below_count if window.below_count else average
+    active_count = window.count - window.below_count
+    active_avg = (window.total - window.below_total) / active_count if active_count else average
     
     variability = "normal"
-    if len(bpms) > 1:
-        std = (sum((x - average) ** 2 for x in bpms) / len(bpms)) ** 0.5
-        if std > 30:
+    if window.count > 1:
+        if window.std > 30:
             variability = "high"
-        elif std < 10:
+        elif window.std < 10:
             variability = "low"
     
     return HeartRateSummary(
         average=round(average, 1),
-        max=max_bpm,
-        min=min_bpm,
+        max=int(heart_rate.day_max[heart_rate.max_index(window)]),
+        min=int(heart_rate.day_min[heart_rate.min_index(window)]),
         resting_avg=round(resting_avg, 1),
         active_avg=round(active_avg, 1),
         variability=variability
     )
 
 
-def analyze_sleep(sleep_data: Optional[List[SleepDataPoint]]) -> Optional[SleepSummary]:
-    """수면 데이터 분석"""
-    if not sleep_data or len(sleep_data) == 0:
+def analyze_sleep(sleep: DailySeries, window: Optional[WindowStats]) -> Optional[SleepSummary]:
+    """수면 데이터 분석 (수면 부족 기준: INSUFFICIENT_SLEEP_HOURS)"""
+    if not window:
         return None
     
-    hours_list = [s.hours for s in sleep_data]
-    average_hours = sum(hours_list) / len(hours_list)
-    
-    insufficient_threshold = 7.0
-    insufficient_nights = sum(1 for h in hours_list if h < insufficient_threshold)
-    
     consistency = 1.0
-    if len(hours_list) > 1:
-        mean = average_hours
-        variance = sum((x - mean) ** 2 for x in hours_list) / len(hours_list)
-        consistency = max(0, 1 - (variance / (mean ** 2)))
+    if window.count > 1:
+        consistency = max(0, 1 - (window.std ** 2 / (window.mean ** 2)))
     
     return SleepSummary(
-        average_hours=round(average_hours, 1),
-        total_nights=len(sleep_data),
+        average_hours=round(window.mean, 1),
+        total_nights=window.count,
         consistency=round(consistency, 2),
-        insufficient_nights=insufficient_nights
+        insufficient_nights=window.below_count
     )
 
 
-def detect_anomalies(health_data: RequestedHealthData) -> List[Anomaly]:
-    """이상 징후 탐지"""
+def detect_anomalies(
+    health_daily: HealthDaily,
+    windows: dict,
+    steps_summary: Optional[StepsSummary],
+    heart_rate_summary: Optional[HeartRateSummary],
+    sleep_summary: Optional[SleepSummary]
+) -> List[Anomaly]:
+    """이상 징후 탐지 (windows: 항목별 구간 합계)"""
     anomalies = []
     
-    if health_data.steps:
-        steps_summary = analyze_steps(health_data.steps)
-        if steps_summary and steps_summary.get("anomaly_days"):
-            for date in steps_summary["anomaly_days"]:
-                step_data = next((s for s in health_data.steps if s.date == date), None)
-                if step_data:
-                    avg = steps_summary.get("average", 0)
-                    deviation = ((step_data.count - avg) / avg * 100) if avg > 0 else 0
-                    anomalies.append(Anomaly(
-                        type="low_steps",
-                        date=date,
-                        severity="medium" if abs(deviation) < 50 else "high",
-                        description=f"걸음 수가 평균보다 {abs(deviation):.1f}% {'낮음' if deviation < 0 else '높음'}"
-                    ))
-    
-    if health_data.heart_rate:
-        heart_rate_summary = analyze_heart_rate(health_data.heart_rate)
-        if heart_rate_summary:
-            max_bpm = heart_rate_summary.get("max", 0)
-            if max_bpm > 180:
-                anomalies.append(Anomaly(
-                    type="high_heart_rate",
-                    date="2025-12-10",
-                    severity="high",
-                    description=f"최고 심박수가 {max_bpm}bpm으로 매우 높음"
-                ))
-    
-    if health_data.sleep:
-        sleep_summary = analyze_sleep(health_data.sleep)
-        if sleep_summary and sleep_summary.get("insufficient_nights", 0) > 0:
+    if steps_summary and steps_summary.get("anomaly_days"):
+        avg = steps_summary.get("average", 0)
+        steps = health_daily.steps
+        for date in steps_summary["anomaly_days"]:
+            i = bisect.bisect_left(steps.days, date_to_day(date))
+            deviation = ((steps.day_total(i) - avg) / avg * 100) if avg > 0 else 0
             anomalies.append(Anomaly(
-                type="insufficient_sleep",
-                date="2025-12-10",
-                severity="medium",
-                description=f"수면 시간이 부족함 (평균 {sleep_summary.get('average_hours', 0)}시간)"
+                type="low_steps",
+                date=date,
+                severity="medium" if abs(deviation) < 50 else "high",
+                description=f"걸음 수가 평균보다 {abs(deviation):.1f}% {'낮음' if deviation < 0 else '높음'}"
             ))
     
+    if heart_rate_summary:
+        max_bpm = heart_rate_summary.get("max", 0)
+        if max_bpm > 180:
+            heart_rate = health_daily.heart_rate
+            anomalies.append(Anomaly(
+                type="high_heart_rate",
+                date=day_to_date(heart_rate.days[heart_rate.max_index(windows["heart_rate"])]),
+                severity="high",
+                description=f"최고 심박수가 {max_bpm}bpm으로 매우 높음"
+            ))
+    
+    if sleep_summary and sleep_summary.get("insufficient_nights", 0) > 0:
+        sleep = health_daily.sleep
+        anomalies.append(Anomaly(
+            type="insufficient_sleep",
+            date=day_to_date(sleep.days[sleep.last_below_day(windows["sleep"])]),
+            severity="medium",
+            description=f"수면 시간이 부족함 (평균 {sleep_summary.get('average_hours', 0)}시간)"
+        ))
+    
     return anomalies
 
 
-def analyze_trends(health_data: RequestedHealthData) -> List[Trend]:
-    """트렌드 분석"""
+def analyze_trends(health_daily: HealthDaily, steps_window: Optional[WindowStats], period: str) -> List[Trend]:
+    """트렌드 분석 (구간 첫날과 마지막 날 비교)"""
     trends = []
     
-    if health_data.steps and len(health_data.steps) >= 2:
-        counts = [s.count for s in health_data.steps]
-        if counts[-1] > counts[0]:
-            change = ((counts[-1] - counts[0]) / counts[0] * 100) if counts[0] > 0 else 0
+    if steps_window and steps_window.days >= 2:
+        first = health_daily.steps.day_total(steps_window.start)
+        last = health_daily.steps.day_total(steps_window.end - 1)
+        if last > first:
+            change = ((last - first) / first * 100) if first > 0 else 0
             trends.append(Trend(
                 metric="steps",
                 direction="increasing",
                 change_percent=round(change, 1),
-                period="day"
+                period=period
             ))
-        elif counts[-1] < counts[0]:
-            change = ((counts[0] - counts[-1]) / counts[0] * 100) if counts[0] > 0 else 0
+        elif last < first:
+            change = ((first - last) / first * 100) if first > 0 else 0
             trends.append(Trend(
                 metric="steps",
                 direction="decreasing",
                 change_percent=round(change, 1),
-                period="day"
+                period=period
             ))
     
     return trends
 
 
+def build_health_analysis(health_daily: HealthDaily, today: int, time_range: Optional[str] = None) -> HealthAnalysis:
+    """
+    일별 집계로부터 분석 기간의 HealthAnalysis 계산 (LLM 없이 결정적으로 계산)
+    
+    구간 합계는 누적합 차이로 구하므로 오늘/7일/30일 등 기간 길이와 원본 샘플 수에 관계없이
+    같은 비용(O(log n))으로 계산됩니다.
+    
+    Args:
+        health_daily: 건강 데이터 일별 집계
+        today: 기기 시간대 기준 오늘 날짜 번호 (today/yesterday/last_N_days의 기준)
+        time_range: 분석 기간 (today, yesterday, last_N_days, YYYY-MM-DD~YYYY-MM-DD / None이면 today)
+    
+    Returns:
+        건강 분석 결과 (데이터가 없으면 요약 없이 빈 목록만)
+    """
+    resolved = health_daily.resolve(time_range, today)
+    if resolved is None:
+        return HealthAnalysis(anomalies=[], trends=[])
+    
+    start_day, end_day = resolved
+    period = build_period(time_range, start_day, end_day, health_daily.latest_day)
+    windows = {
+        metric: getattr(health_daily, metric).stats(start_day, end_day)
+        for metric in ("steps", "heart_rate", "sleep")
+    }
+    
+    steps_summary = analyze_steps(health_daily.steps, windows["steps"])
+    heart_rate_summary = analyze_heart_rate(health_daily.heart_rate, windows["heart_rate"])
+    sleep_summary = analyze_sleep(health_daily.sleep, windows["sleep"])
+    
+    return HealthAnalysis(
+        period=period,
+        steps_summary=steps_summary,
+        heart_rate_summary=heart_rate_summary,
+        sleep_summary=sleep_summary,
+        anomalies=detect_anomalies(health_daily, windows, steps_summary, heart_rate_summary, sleep_summary),
+        trends=analyze_trends(health_daily, windows["steps"], period["time_range"])
+    )
+
+
 def format_health_analysis_for_llm(health_analysis: Optional[HealthAnalysis]) -> str:
     """
     HealthAnalysis를 LLM에 전달할 형식으로 포맷팅
@@ -225,7 +247,14 @@ def format_health_analysis_for_llm(health_analysis: Optional[HealthAnalysis]) ->
     if not health_analysis:
         return "건강 데이터 분석 결과가 없습니다."
     
-    lines = []
+    period = health_analysis.get("period")
+    lines = [f"분석 기간: {format_period(period)}", ""]
+    
+    # 데이터가 오래되어 기간에 데이터가 없으면 마지막 데이터 날짜를 알려 다른 날을 오늘로 설명하지 않도록 함
+    has_summary = any(health_analysis.get(key) for key in ("steps_summary", "heart_rate_summary", "sleep_summary"))
+    if period and not has_summary:
+        lines.append(f"이 기간에는 건강 데이터가 없습니다 (마지막 데이터: {period.get('latest_data_date')})")
+        lines.append("")
     
     if health_analysis.get("steps_summary"):
         ss = health_analysis["steps_summary"]
@@ -268,3 +297,29 @@ def format_health_analysis_for_llm(health_analysis: Optional[HealthAnalysis]) ->
     
     return "\n".join(lines)
 
+
+def format_user_info(
+    basic_info: Optional[BasicInfo],
+    lifestyle: Optional[Lifestyle],
+    followup_answers: Optional[FollowupAnswers]
+) -> str:
+    """사용자 세션 정보를 LLM에 전달할 형식으로 포맷팅"""
+    user_info_parts = []
+    
+    if basic_info:
+        user_info_parts.append(f"기본 정보: {basic_info.age}세 {basic_info.gender}, {basic_info.height}cm, {basic_info.weight}kg")
+        user_info_parts.append(f"목표: {basic_info.period}주 동안 {basic_info.targetLoss}kg 감량")
+    
+    if lifestyle:
+        user_info_parts.append(f"운동 빈도: 주 {lifestyle.exerciseFreq}회")
+        user_info_parts.append(f"식사 패턴: 하루 {lifestyle.mealsPerDay}회, 야식 {lifestyle.nightSnackFreq}, 외식 {lifestyle.eatingOutFreq}")
+        if lifestyle.healthNotes:
+            user_info_parts.append(f"건강 특이사항: {lifestyle.healthNotes}")
+    
+    if followup_answers:
+        user_info_parts.append(f"추가 정보:")
+        user_info_parts.append(f"- 식습관 목표: {followup_answers.q1}")
+        user_info_parts.append(f"- 운동 선호도: {followup_answers.q2}")
+        user_info_parts.append(f"- 절대 포기할 수 없는 부분: {followup_answers.q3}")
+    
+    return "\n".join(user_info_parts) if user_info_parts else "사용자 정보 없음"
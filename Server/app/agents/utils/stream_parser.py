@@ -0,0 +1,225 @@
+import json
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+_ESCAPES = {
+    '"': '"',
+    '\\': '\\',
+    '/': '/',
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+}
+
+
+class JsonFieldStreamer:
+    """
+    스트리밍 중인 JSON 텍스트에서 특정 키의 문자열 값을 점진적으로 추출
+
+    LLM이 JSON을 토큰 단위로 생성하는 동안, 완성된 JSON을 기다리지 않고
+    지정한 키(예: "markdown")의 문자열 값을 도착하는 대로 디코딩해 돌려줍니다.
+    depth를 지정하면 해당 중첩 깊이(최상위 객체 = 1)의 키만 추출합니다.
+    """
+
+    def __init__(self, field: str, depth: Optional[int] = None):
+        self.field = field
+        self.target_depth = depth
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._unicode: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+        self._string_buffer: list[str] = []
+        self._last_key: Optional[str] = None
+        self._after_colon = False
+        self._capturing = False
+
+    def feed(self, text: str) -> str:
+        """
+        새로 도착한 텍스트 조각을 처리
+        
+        Args:
+            text: LLM이 생성한 텍스트 조각
+        
+        Returns:
+            대상 필드 값 중 이번 조각에서 새로 디코딩된 부분
+        """
+        delta = []
+        
+        for ch in text:
+            if self._in_string:
+                decoded = self._consume_string_char(ch)
+                if decoded is None:
+                    continue
+                if self._capturing:
+                    delta.append(decoded)
+                else:
+                    self._string_buffer.append(decoded)
+                continue
+            
+            if ch == '"':
+                self._in_string = True
+                self._capturing = (
+                    self._after_colon
+                    and self._last_key == self.field
+                    and (self.target_depth is None or self._depth == self.target_depth)
+                )
+                self._string_buffer = []
+            elif ch == ':':
+                self._after_colon = True
+            elif ch in '{[':
+                self._depth += 1
+                self._after_colon = False
+            elif ch in '}]':
+                self._depth -= 1
+                self._after_colon = False
+            elif ch == ',':
+                self._after_colon = False
+                self._last_key = None
+        
+        return "".join(delta)
+
+    def _consume_string_char(self, ch: str) -> Optional[str]:
+        if self._unicode is not None:
+            self._unicode += ch
+            if len(self._unicode) < 4:
+                return None
+            code = self._unicode
+            self._unicode = None
+            try:
+                codepoint = int(code, 16)
+            except ValueError:
+                return ""
+            if 0xD800 <= codepoint < 0xDC00:
+                self._high_surrogate = codepoint
+                return None
+            if 0xDC00 <= codepoint < 0xE000 and self._high_surrogate is not None:
+                codepoint = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (codepoint - 0xDC00)
+                self._high_surrogate = None
+            return chr(codepoint)
+        
+        if self._escape:
+            self._escape = False
+            if ch == 'u':
+                self._unicode = ""
+                return None
+            return _ESCAPES.get(ch, ch)
+        
+        if ch == '\\':
+            self._escape = True
+            return None
+        
+        if ch == '"':
+            self._in_string = False
+            if not self._capturing and not self._after_colon:
+                self._last_key = "".join(self._string_buffer)
+            else:
+                self._after_colon = False
+            self._capturing = False
+            return None
+        
+        return ch
+
+
+class JsonArrayItemStreamer:
+    """
+    스트리밍 중인 JSON 텍스트에서 특정 키의 배열 원소(객체)를 완성되는 대로 추출
+
+    예: {"blocks": [{...}, {...}]} 에서 "blocks" 배열의 각 객체가 닫히는 즉시
+    dict로 파싱해 돌려줍니다. 응답 전체가 완성되지 않았거나 뒤쪽이 깨져 있어도
+    이미 완성된 원소는 얻을 수 있습니다.
+    depth는 키를 가진 객체의 중첩 깊이입니다 (최상위 객체 = 1).
+    """
+
+    def __init__(self, field: str, depth: int = 1):
+        self.field = field
+        self.target_depth = depth
+        self.items: list[dict] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_buffer: list[str] = []
+        self._last_key: Optional[str] = None
+        self._after_colon = False
+        self._array_depth: Optional[int] = None
+        self._item_chars: Optional[list[str]] = None
+
+    def feed(self, text: str) -> list[dict]:
+        """
+        새로 도착한 텍스트 조각을 처리
+        
+        Args:
+            text: LLM이 생성한 텍스트 조각
+        
+        Returns:
+            이번 조각에서 새로 완성된 배열 원소 목록
+        """
+        completed = []
+        
+        for ch in text:
+            if self._item_chars is not None:
+                self._item_chars.append(ch)
+            
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if not self._after_colon:
+                        self._last_key = "".join(self._string_buffer)
+                    self._after_colon = False
+                else:
+                    self._string_buffer.append(ch)
+                continue
+            
+            if ch == '"':
+                self._in_string = True
+                self._string_buffer = []
+            elif ch == ':':
+                self._after_colon = True
+            elif ch in '{[':
+                opens_array = (
+                    ch == '['
+                    and self._array_depth is None
+                    and self._after_colon
+                    and self._last_key == self.field
+                    and self._depth == self.target_depth
+                )
+                self._depth += 1
+                self._after_colon = False
+                if opens_array:
+                    self._array_depth = self._depth
+                elif ch == '{' and self._item_chars is None and self._array_depth == self._depth - 1:
+                    self._item_chars = ['{']
+            elif ch in '}]':
+                self._depth -= 1
+                self._after_colon = False
+                if ch == '}' and self._item_chars is not None and self._depth == self._array_depth:
+                    item = self._parse_item("".join(self._item_chars))
+                    self._item_chars = None
+                    if item is not None:
+                        self.items.append(item)
+                        completed.append(item)
+                elif ch == ']' and self._array_depth is not None and self._depth == self._array_depth - 1:
+                    self._array_depth = None
+            elif ch == ',':
+                self._after_colon = False
+                self._last_key = None
+        
+        return completed
+
+    @staticmethod
+    def _parse_item(raw: str) -> Optional[dict]:
+        try:
+            item = json.loads(raw)
+        except ValueError:
+            logger.warning(f"Failed to parse streamed JSON item: {raw[:100]}")
+            return None
+        return item if isinstance(item, dict) else None
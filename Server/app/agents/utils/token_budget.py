@@ -0,0 +1,204 @@
+import logging
+import math
+from functools import lru_cache
+from typing import Optional, List, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODING = "o200k_base"
+
+TRUNCATION_MARKER = "\n...(생략)"
+
+# 메시지 1개당 역할/구분자 토큰
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: Optional[str]):
+    """
+    모델에 맞는 tiktoken 인코딩 조회
+    
+    tiktoken이 없거나 인코딩 파일을 받을 수 없으면 None (문자 수 기반 추정 사용)
+    """
+    try:
+        import tiktoken
+        
+        try:
+            return tiktoken.encoding_for_model(model or "")
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, using character-based token estimate: {e}")
+        return None
+
+
+def _estimate_tokens(text: str) -> int:
+    """문자 수 기반 토큰 추정 (영문/숫자 약 4자당 1토큰, 한글 등은 1자당 1토큰으로 보수적으로 계산)"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def tokenizer_name(model: Optional[str] = None) -> str:
+    """토큰 계산에 사용하는 방식 (tiktoken 인코딩 이름 또는 estimate)"""
+    encoding = _get_encoding(model)
+    return encoding.name if encoding else "estimate"
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    텍스트의 토큰 수 계산
+    
+    Args:
+        text: 대상 텍스트
+        model: 모델명 (tiktoken 인코딩 선택용)
+    
+    Returns:
+        토큰 수
+    """
+    if not text:
+        return 0
+    
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return _estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: list, model: Optional[str] = None) -> int:
+    """LangChain 메시지 목록의 입력 토큰 수 계산"""
+    total = 0
+    for message in messages:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        total += count_tokens(content, model) + MESSAGE_OVERHEAD_TOKENS
+    return total
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """텍스트를 앞에서부터 max_tokens 토큰까지만 남김"""
+    if max_tokens <= 0:
+        return ""
+    
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens])
+    
+    total = _estimate_tokens(text)
+    if total <= max_tokens:
+        return text
+    
+    end = int(len(text) * max_tokens / total)
+    while end > 0 and _estimate_tokens(text[:end]) > max_tokens:
+        end -= 1
+    return text[:end]
+
+
+class PromptSection:
+    """
+    프롬프트 템플릿의 한 구간
+
+    priority가 클수록 중요도가 낮아 예산 초과 시 먼저 줄입니다.
+    required=True인 구간은 줄이지 않습니다.
+    """
+
+    def __init__(self, name: str, text: str, priority: int = 1, required: bool = False):
+        self.name = name
+        self.text = text or ""
+        self.priority = priority
+        self.required = required
+
+
+class TokenBudget:
+    """
+    노드별 프롬프트 토큰 예산
+
+    프롬프트 구간별 토큰 수를 계산하고, 입력 예산을 넘으면 우선순위가 낮은 구간부터
+    잘라내거나 제거합니다. 출력 예산은 LLM 호출 시 max_tokens로 전달합니다.
+    """
+
+    def __init__(
+        self,
+        node: str,
+        model: Optional[str] = None,
+        max_input_tokens: Optional[int] = None,
+        max_output_tokens: Optional[int] = None
+    ):
+        self.node = node
+        self.model = model
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+
+    def bind(self, llm):
+        """출력 토큰 예산을 LLM에 적용"""
+        if self.max_output_tokens:
+            return llm.bind(max_tokens=self.max_output_tokens)
+        return llm
+
+    def fit(
+        self,
+        template: str,
+        sections: List[PromptSection],
+        reserved_tokens: int = 0,
+        **fixed: Any
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        예산에 맞춰 템플릿을 채움
+        
+        Args:
+            template: format()으로 채울 프롬프트 템플릿
+            sections: 토큰 수를 계산할 구간 목록
+            reserved_tokens: 같은 호출의 다른 메시지(사용자 메시지 등)가 차지하는 토큰 수
+            **fixed: 구간으로 나누지 않고 그대로 넣을 짧은 값
+        
+        Returns:
+            (완성된 프롬프트, 구간별 토큰 수 리포트)
+        """
+        texts = {section.name: section.text for section in sections}
+        overhead = count_tokens(template.format(**fixed, **{name: "" for name in texts}), self.model)
+        tokens = {name: count_tokens(text, self.model) for name, text in texts.items()}
+        total = reserved_tokens + overhead + sum(tokens.values())
+        trimmed = []
+        
+        if self.max_input_tokens and total > self.max_input_tokens:
+            marker_tokens = count_tokens(TRUNCATION_MARKER, self.model)
+            trimmable = sorted(
+                (section for section in sections if not section.required),
+                key=lambda section: section.priority,
+                reverse=True
+            )
+            
+            for section in trimmable:
+                excess = total - self.max_input_tokens
+                if excess <= 0:
+                    break
+                
+                keep_tokens = tokens[section.name] - excess - marker_tokens
+                if keep_tokens > 0:
+                    texts[section.name] = truncate_to_tokens(texts[section.name], keep_tokens, self.model) + TRUNCATION_MARKER
+                else:
+                    texts[section.name] = ""
+                
+                new_tokens = count_tokens(texts[section.name], self.model)
+                total -= tokens[section.name] - new_tokens
+                tokens[section.name] = new_tokens
+                trimmed.append(section.name)
+            
+            logger.info(f"Prompt trimmed for {self.node}: {trimmed}, {total}/{self.max_input_tokens} tokens")
+            if total > self.max_input_tokens:
+                logger.warning(f"Prompt for {self.node} exceeds budget with required sections only: {total}/{self.max_input_tokens} tokens")
+        
+        report = {
+            "node": self.node,
+            "input_tokens": total,
+            "max_input_tokens": self.max_input_tokens,
+            "max_output_tokens": self.max_output_tokens,
+            "template_tokens": overhead,
+            "reserved_tokens": reserved_tokens,
+            "sections": tokens,
+            "trimmed": trimmed,
+        }
+        
+        logger.debug(f"Prompt size for {self.node}: {report}")
+        return template.format(**fixed, **texts), report
@@ -1,13 +1,33 @@
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException, Request
-from langchain_core.messages import HumanMessage
-from app.schemas.chat_data import ChatRequest, ChatResponse
+import json
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from app.agents.health_state import build_input_state, get_latest_user_message
+from app.agents.nodes.intent_router import is_default_report_request, classify_intent, classify_time_range, HEALTH_ANALYSIS
+from app.agents.llm_client import TRANSIENT_LLM_ERRORS
+from app.agents.nodes.health_agent import analyze_health_data
+from app.agents.nodes.report_agent import create_deterministic_blocks, create_deadline_report, to_report_block
+from app.agents.utils.stream_parser import JsonFieldStreamer, JsonArrayItemStreamer
+from app.config import settings
+from app.schemas.chat_data import ChatRequest, ChatResponse, ChatBatchRequest, ChatBatchItem, ChatBatchResponse
 from app.schemas.user_data import PlanRequest, PlanResponse
+from app.services.device_service import get_data_version
+from app.services.health_data_service import get_health_daily
+from app.services.report_precompute_service import get_latest_report
+from app.services.chat_dedup_service import (
+    make_chat_key,
+    make_idempotency_key,
+    make_request_fingerprint,
+    run_single_flight,
+    get_idempotent_response,
+    save_idempotent_response,
+    IdempotencyKeyMismatchError
+)
 from app.services.user_session_service import (
     save_user_session,
     get_user_session,
-    get_user_session_by_device,
-    get_latest_user_session,
     generate_session_id
 )
 
@@ -26,7 +46,7 @@ async def init_plan(request: PlanRequest, req: Request):
     try:
         session_id = generate_session_id(request.user_name, request.device_id)
         
-        success = save_user_session(session_id, request)
+        success = await asyncio.to_thread(save_user_session, session_id, request)
         
         if success:
             logger.info(f"Plan initialized for user: {request.user_name}, session: {session_id}")
@@ -43,43 +63,386 @@ async def init_plan(request: PlanRequest, req: Request):
         raise HTTPException(status_code=500, detail=f"Error initializing plan: {e}")
 
 
+def _build_input_state(request: ChatRequest) -> dict:
+    return build_input_state(request.message, request.device_id)
+
+
+def _retry_after(e: Exception) -> int:
+    return getattr(e, "retry_after", 1)
+
+
+def _overloaded_exception(e: Exception) -> HTTPException:
+    """대기열 초과 또는 일시적인 LLM 오류 -> 503 + Retry-After (conversation_id가 있으면 재시도 시 실패 지점부터 재개)"""
+    logger.warning(f"Chat rejected, LLM unavailable: {e}")
+    return HTTPException(
+        status_code=503,
+        detail="서버가 혼잡합니다. 잠시 후 다시 시도해주세요.",
+        headers={"Retry-After": str(_retry_after(e))}
+    )
+
+
+def _precomputed_response(request: ChatRequest, input_state: dict) -> Optional[ChatResponse]:
+    """대화 이어가기가 아닌 기본 리포트 요청이면 새 데이터 저장 시 미리 생성한 리포트로 응답"""
+    if request.conversation_id or not is_default_report_request(request.message):
+        return None
+    
+    report = get_latest_report(input_state.get("device_id"))
+    if not report:
+        return None
+    
+    logger.info(f"Serving precomputed report (device_id: {input_state.get('device_id')}, version: {report['data_version']})")
+    return ChatResponse(blocks=report["blocks"])
+
+
+def _speculative_health_analysis(input_state: dict):
+    """
+    LLM 리포트를 만드는 요청이면 LLM 없이 계산한 건강 분석 결과
+    
+    계산 결과는 데이터 버전/분석 기간별로 캐시되어 그래프의 Health Agent가 그대로 재사용합니다.
+    
+    Returns:
+        HealthAnalysis 또는 None (다른 의도이거나 데이터가 없는 경우)
+    """
+    user_message = get_latest_user_message(input_state)
+    intent_result = classify_intent(user_message)
+    if intent_result is None and settings.intent_router_llm_fallback:
+        return None
+    if intent_result is not None and intent_result[0] != HEALTH_ANALYSIS:
+        return None
+    
+    device_id = input_state.get("device_id")
+    data_version = get_data_version(device_id)
+    health_daily = get_health_daily(device_id)
+    if not health_daily:
+        return None
+    
+    health_analysis, _ = analyze_health_data(health_daily, device_id, data_version, classify_time_range(user_message))
+    return health_analysis
+
+
+async def _run_chat(health_graph, input_state: dict, conversation_id: Optional[str] = None) -> ChatResponse:
+    health_graph.llm_limiter.check_admission()
+    
+    result = await health_graph.ainvoke(input_state, conversation_id=conversation_id)
+    
+    blocks = result.get("blocks", [])
+    return ChatResponse(blocks=blocks)
+
+
+async def _run_shared_chat(
+    health_graph,
+    request: ChatRequest,
+    input_state: dict,
+    idempotency_key: Optional[str],
+    fingerprint: str
+) -> ChatResponse:
+    """
+    동일 요청과 실행을 공유하여 그래프 실행 (report_deadline_seconds 초과 시 계산 기반 블록, partial=true)
+    
+    Idempotency-Key 요청은 호출 전에 키 검증을 마쳤으므로 await 없이 바로 실행 중 목록에 등록합니다.
+    저장소 조회는 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+    """
+    conversation_id = request.conversation_id
+    if idempotency_key:
+        flight_key = make_idempotency_key(idempotency_key, fingerprint)
+    else:
+        device_id = input_state.get("device_id")
+        data_version = await asyncio.to_thread(get_data_version, device_id)
+        flight_key = make_chat_key(device_id, request.message, data_version, conversation_id)
+    
+    flight = run_single_flight(
+        flight_key,
+        lambda: _run_chat(health_graph, input_state, conversation_id)
+    )
+    
+    deadline = settings.report_deadline_seconds
+    health_analysis = await asyncio.to_thread(_speculative_health_analysis, input_state) if deadline is not None else None
+    
+    if not health_analysis:
+        return await flight
+    
+    # 제한 시간이 지나도 공유 실행은 계속되어 LLM 응답 캐시를 채우므로 재요청 시 전체 리포트를 받음
+    try:
+        return await asyncio.wait_for(flight, deadline)
+    except asyncio.TimeoutError:
+        logger.warning(f"Report deadline exceeded ({deadline}s), responding with deterministic blocks")
+        return ChatResponse(blocks=create_deadline_report(health_analysis), partial=True)
+
+
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest, req: Request):
+async def chat(
+    request: ChatRequest,
+    req: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """
+    채팅 요청/응답
+    
+    - 같은 기기/메시지/데이터 버전의 요청이 처리 중이면 새로 실행하지 않고 그 결과를 함께 받습니다.
+    - Idempotency-Key 헤더가 있으면 완료된 응답(미리 생성한 리포트 포함)을 저장해 두었다가 재시도 시 그대로 돌려줍니다.
+      제한 시간 초과 응답(partial=true)은 저장하지 않으므로 재시도하면 진행 중인 실행에 합류하거나 캐시된 전체 리포트를 받습니다. 같은 키를 다른 본문으로 사용하면 (처리 중이어도) 422로 거절합니다.
+    - 기본 리포트 요청은 새 데이터 저장 시 미리 생성한 리포트가 있으면 그래프를 실행하지 않고 바로 응답합니다.
+    - report_deadline_seconds 안에 리포트가 완성되지 않으면 계산 기반 차트/표만으로 응답합니다 (partial=true).
+    - conversation_id가 있으면 대화 상태를 저장하여, 실패 후 같은 메시지로 재시도하면 실패한 노드부터 재개하고
+      다음 턴에서는 같은 데이터로 만든 건강 분석 결과를 재사용합니다.
+    """
     try:
         health_graph = req.app.state.health_graph
+        conversation_id = request.conversation_id
+        fingerprint = make_request_fingerprint(request.device_id, request.message, conversation_id)
         
-        input_state = {
-            "messages": [HumanMessage(content=request.message)]
-        }
+        # 저장소 조회는 스레드에서 먼저 끝내고, Idempotency-Key 검증부터 실행 등록/응답 저장까지는 await 없이 처리
+        input_state = await asyncio.to_thread(_build_input_state, request)
+        precomputed = await asyncio.to_thread(_precomputed_response, request, input_state)
         
-        user_session = None
+        if idempotency_key:
+            stored_response = get_idempotent_response(idempotency_key, fingerprint)
+            if stored_response:
+                response.headers["Idempotent-Replayed"] = "true"
+                return stored_response
         
-        if request.device_id:
-            input_state["device_id"] = request.device_id
-            user_session = get_user_session_by_device(request.device_id)
-            if user_session:
-                logger.info(f"User session loaded by device_id: {request.device_id}")
+        chat_response = precomputed
+        if not chat_response:
+            chat_response = await _run_shared_chat(health_graph, request, input_state, idempotency_key, fingerprint)
         
-        if not user_session:
-            user_session = get_latest_user_session()
-            if user_session:
-                device_id = user_session.get("device_id")
-                if device_id:
-                    input_state["device_id"] = device_id
-                logger.info("User session loaded (latest session, single user system)")
+        if idempotency_key and not chat_response.partial:
+            save_idempotent_response(idempotency_key, fingerprint, chat_response)
         
-        if user_session:
-            from app.schemas.user_data import BasicInfo, Lifestyle, FollowupAnswers
+        return chat_response
+    except IdempotencyKeyMismatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except TRANSIENT_LLM_ERRORS as e:
+        raise _overloaded_exception(e)
+    except Exception as e:
+        logger.error("Error processing chat", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error processing chat: {e}")
+
+
+def _to_batch_item(index: int, result) -> ChatBatchItem:
+    if isinstance(result, TRANSIENT_LLM_ERRORS):
+        return ChatBatchItem(index=index, error="서버가 혼잡합니다. 잠시 후 다시 시도해주세요.", retryable=True)
+    if isinstance(result, Exception):
+        logger.error(f"Error processing batch chat {index}: {result}", exc_info=result)
+        return ChatBatchItem(index=index, error=f"Error processing chat: {result}")
+    return ChatBatchItem(index=index, blocks=result.get("blocks", []))
+
+
+async def _stream_batch_items(health_graph, inputs: list, conversation_ids: list):
+    async for index, result in health_graph.abatch_as_completed(
+        inputs,
+        conversation_ids,
+        max_concurrency=settings.chat_batch_max_concurrency
+    ):
+        yield _to_batch_item(index, result).model_dump_json() + "\n"
+
+
+@router.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(request: ChatBatchRequest, req: Request):
+    """
+    여러 채팅 요청 일괄 처리
+    
+    그래프 배치 실행으로 최대 chat_batch_max_concurrency개씩 동시에 처리하며, 요청별 실패는
+    전체를 실패시키지 않고 해당 항목의 error로 반환합니다.
+    
+    - 기본: 모든 요청 완료 후 요청 순서대로 결과 배열 반환
+    - Accept: application/x-ndjson: 완료되는 순서대로 한 줄에 결과 하나씩 스트리밍 (index로 요청과 매칭)
+    """
+    if len(request.requests) > settings.chat_batch_max_size:
+        raise HTTPException(status_code=422, detail=f"Too many requests in batch (max {settings.chat_batch_max_size})")
+    
+    conversation_ids = [chat_request.conversation_id for chat_request in request.requests]
+    duplicated = {cid for cid in conversation_ids if cid and conversation_ids.count(cid) > 1}
+    if duplicated:
+        raise HTTPException(status_code=422, detail=f"conversation_id must be unique within a batch: {sorted(duplicated)}")
+    
+    try:
+        health_graph = req.app.state.health_graph
+        health_graph.llm_limiter.check_admission()
+        inputs = await asyncio.to_thread(lambda: [_build_input_state(chat_request) for chat_request in request.requests])
+    except TRANSIENT_LLM_ERRORS as e:
+        raise _overloaded_exception(e)
+    except Exception as e:
+        logger.error("Error preparing chat batch", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error processing chat batch: {e}")
+    
+    logger.info(f"Chat batch started: {len(inputs)} requests")
+    
+    if "application/x-ndjson" in req.headers.get("accept", ""):
+        return StreamingResponse(
+            _stream_batch_items(health_graph, inputs, conversation_ids),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    results = [None] * len(inputs)
+    async for index, result in health_graph.abatch_as_completed(
+        inputs,
+        conversation_ids,
+        max_concurrency=settings.chat_batch_max_concurrency
+    ):
+        results[index] = _to_batch_item(index, result)
+    
+    return ChatBatchResponse(results=results)
+
+
+def _format_sse(event: str, data) -> str:
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def _iterate_with_deadline(stream, seconds: Optional[float]):
+    """
+    비동기 이터레이터를 전체 제한 시간 안에서만 순회 (초과 시 asyncio.TimeoutError)
+    
+    Args:
+        stream: 비동기 제너레이터
+        seconds: 제한 시간 (초, None이면 제한 없음)
+    """
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + seconds if seconds is not None else None
+    try:
+        while True:
+            next_item = stream.__anext__()
+            try:
+                if deadline_at is None:
+                    item = await next_item
+                else:
+                    item = await asyncio.wait_for(next_item, max(deadline_at - loop.time(), 0))
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        await stream.aclose()
+
+
+async def _stream_chat_events(health_graph, input_state: dict, conversation_id: Optional[str] = None):
+    """
+    그래프 실행 과정을 SSE 이벤트로 변환
+    
+    - blocks: 계산 기반 차트/표 블록 (리포트 요청이면 그래프 실행 전 즉시, speculative=true)
+    - node: 노드 완료 알림
+    - delta: 최종 리포트 마크다운의 토큰 단위 증분
+    - block: 리포트 블록이 하나 완성될 때마다 해당 블록
+    - done: 최종 ChatResponse (앞서 보낸 blocks를 대체, 제한 시간 초과 시 partial=true)
+    """
+    # {"blocks": [{"type": "markdown", "content": ...}, ...]} 에서 블록 객체의 깊이 = 3
+    markdown_streamer = JsonFieldStreamer("content", depth=3)
+    block_streamer = JsonArrayItemStreamer("blocks")
+    blocks = []
+    health_analysis = None
+    
+    try:
+        # LLM 리포트를 기다리는 동안 보여줄 계산 기반 블록을 먼저 전송
+        health_analysis = await asyncio.to_thread(_speculative_health_analysis, input_state)
+        early_blocks = create_deterministic_blocks(health_analysis) if health_analysis else []
+        if early_blocks:
+            yield _format_sse("blocks", {"blocks": [b.model_dump() for b in early_blocks], "speculative": True})
+        
+        stream = health_graph.astream(input_state, conversation_id=conversation_id)
+        deadline = settings.report_deadline_seconds if health_analysis else None
+        
+        async for mode, chunk in _iterate_with_deadline(stream, deadline):
+            if mode == "messages":
+                message, metadata = chunk
+                if metadata.get("langgraph_node") == "report" and isinstance(message.content, str):
+                    delta = markdown_streamer.feed(message.content)
+                    if delta:
+                        yield _format_sse("delta", {"content": delta})
+                    for item in block_streamer.feed(message.content):
+                        block = to_report_block(item)
+                        if block:
+                            yield _format_sse("block", block.model_dump())
+                continue
             
-            input_state["user_name"] = user_session.get("user_name")
-            input_state["basic_info"] = BasicInfo(**user_session.get("basic_info", {}))
-            input_state["lifestyle"] = Lifestyle(**user_session.get("lifestyle", {}))
-            input_state["followup_answers"] = FollowupAnswers(**user_session.get("followup", {}))
+            for node, update in chunk.items():
+                yield _format_sse("node", {"node": node})
+                if not update:
+                    continue
+                
+                if update.get("health_analysis") and not early_blocks:
+                    early_blocks = create_deterministic_blocks(update["health_analysis"])
+                    if early_blocks:
+                        yield _format_sse("blocks", {"blocks": [b.model_dump() for b in early_blocks]})
+                
+                if update.get("blocks"):
+                    blocks = update["blocks"]
         
-        result = health_graph.invoke(input_state)
+        response = ChatResponse(blocks=blocks)
+        yield _format_sse("done", response.model_dump())
+    except asyncio.TimeoutError:
+        logger.warning(f"Report deadline exceeded ({settings.report_deadline_seconds}s), streaming deterministic blocks")
+        response = ChatResponse(blocks=create_deadline_report(health_analysis), partial=True)
+        yield _format_sse("done", response.model_dump())
+    except TRANSIENT_LLM_ERRORS as e:
+        logger.warning(f"Chat stream aborted, LLM unavailable: {e}")
+        yield _format_sse("error", {"detail": "서버가 혼잡합니다. 잠시 후 다시 시도해주세요.", "retry_after": _retry_after(e)})
+    except Exception as e:
+        logger.error("Error streaming chat", exc_info=True)
+        yield _format_sse("error", {"detail": f"Error processing chat: {e}"})
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, req: Request):
+    """
+    채팅 응답 스트리밍 (Server-Sent Events)
+    
+    전체 파이프라인 완료를 기다리지 않고 진행 상황, 차트/표 블록, 마크다운 토큰을 순서대로 전송합니다.
+    미리 생성한 리포트로 응답할 수 있으면 done 이벤트만 바로 전송합니다.
+    """
+    try:
+        health_graph = req.app.state.health_graph
+        input_state = await asyncio.to_thread(_build_input_state, request)
+        
+        precomputed = await asyncio.to_thread(_precomputed_response, request, input_state)
+        if precomputed:
+            return StreamingResponse(
+                iter([_format_sse("done", precomputed.model_dump())]),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
         
-        blocks = result.get("blocks", [])
-        return ChatResponse(blocks=blocks)
+        health_graph.llm_limiter.check_admission()
+    except TRANSIENT_LLM_ERRORS as e:
+        raise _overloaded_exception(e)
     except Exception as e:
-        logger.error("Error processing chat", exc_info=True)
+        logger.error("Error preparing chat stream", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing chat: {e}")
+    
+    return StreamingResponse(
+        _stream_chat_events(health_graph, input_state, request.conversation_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/chat/dry-run")
+async def chat_dry_run(request: ChatRequest, req: Request):
+    """
+    채팅 프롬프트 크기 측정 (LLM 호출 없음)
+    
+    같은 요청을 처리할 때 노드별로 보낼 프롬프트의 입력 토큰 수와 토큰 예산을 반환합니다.
+    """
+    try:
+        health_graph = req.app.state.health_graph
+        input_state = await asyncio.to_thread(_build_input_state, request)
+        return await health_graph.dry_run(input_state)
+    except Exception as e:
+        logger.error("Error in chat dry run", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error processing chat dry run: {e}")
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(req: Request):
+    """LLM 응답 캐시 적중/미적중 통계 조회"""
+    llm_cache = req.app.state.health_graph.llm_cache
+    if not llm_cache:
+        return {"enabled": False}
+    return {"enabled": True, **llm_cache.stats()}
+
+
+@router.get("/llm/stats")
+async def get_llm_stats(req: Request):
+    """LLM 호출 제한기 상태 (실행 중 / 대기 중 호출 수)와 노드별 모델 조회"""
+    health_graph = req.app.state.health_graph
+    return {**health_graph.llm_limiter.stats(), "models": health_graph.llm_models()}
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from fastapi import APIRouter, HTTPException
 from app.schemas.fcm_data import (
@@ -10,12 +11,15 @@ from app.schemas.fcm_data import (
     DataRequestStatusResponse,
     RequestStatus
 )
+from app.schemas.health_series import HealthSeries
 from app.services import device_service
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["devices", "health"])
 
+# 저장소 조회/저장과 FCM 전송은 이벤트 루프를 막지 않도록 asyncio.to_thread로 실행
+
 
 @router.post("/devices/register", response_model=DeviceRegisterResponse)
 async def register_device(request: DeviceRegisterRequest):
@@ -23,10 +27,12 @@ async def register_device(request: DeviceRegisterRequest):
     디바이스 FCM 토큰 등록
     """
     try:
-        success = device_service.register_device(
+        success = await asyncio.to_thread(
+            device_service.register_device,
             device_id=request.device_id,
             fcm_token=request.fcm_token,
-            user_id=request.user_id
+            user_id=request.user_id,
+            timezone=request.timezone
         )
         
         if success:
@@ -47,7 +53,8 @@ async def create_data_request(request: DataRequestRequest):
     건강 데이터 요청 생성 및 FCM 전송
     """
     try:
-        request_id = device_service.create_data_request(
+        request_id = await asyncio.to_thread(
+            device_service.create_data_request,
             device_id=request.device_id,
             data_types=request.data_types,
             start_date=request.start_date,
@@ -73,19 +80,26 @@ async def receive_data_response(request: DataResponseRequest):
     안드로이드로부터 받은 건강 데이터 응답 처리
     """
     try:
-        data_request = device_service.get_data_request(request.request_id)
+        data_request = await asyncio.to_thread(device_service.get_data_request, request.request_id)
         if not data_request:
             raise HTTPException(status_code=404, detail="Data request not found")
         
         logger.info(f"Received data response for request: {request.request_id}")
         logger.info(f"Response data: {request.data}")
         
-        device_service.save_data_response(
+        # 시각 파싱과 기기 시간대 기준 날짜 구분은 수신 시 한 번만 수행
+        timezone = await asyncio.to_thread(device_service.get_device_timezone, data_request.get("device_id") or request.device_id)
+        series = HealthSeries.from_health_data(request.data, timezone)
+        
+        await asyncio.to_thread(
+            device_service.save_data_response,
             request_id=request.request_id,
-            response_data=request.data.dict()
+            response_data=request.data.dict(),
+            series=series.model_dump(mode="json")
         )
         
-        device_service.update_data_request_status(
+        await asyncio.to_thread(
+            device_service.update_data_request_status,
             request_id=request.request_id,
             status="completed"
         )
@@ -98,7 +112,8 @@ async def receive_data_response(request: DataResponseRequest):
         raise
     except Exception as e:
         logger.error("Error receiving data response", exc_info=True)
-        device_service.update_data_request_status(
+        await asyncio.to_thread(
+            device_service.update_data_request_status,
             request_id=request.request_id,
             status="failed",
             error_message=str(e)
@@ -112,7 +127,7 @@ async def get_data_request_status(request_id: str):
     데이터 요청 상태 조회
     """
     try:
-        request = device_service.get_data_request(request_id)
+        request = await asyncio.to_thread(device_service.get_data_request, request_id)
         if not request:
             raise HTTPException(status_code=404, detail="Data request not found")
         
@@ -140,11 +155,12 @@ async def get_data_response(request_id: str):
     받은 데이터 응답 조회
     """
     try:
-        response = device_service.get_data_response(request_id)
+        response = await asyncio.to_thread(device_service.get_data_response, request_id)
         if not response:
             raise HTTPException(status_code=404, detail="Data response not found")
         
-        return response
+        # 수신 시 만든 내부 시계열은 제외하고 받은 그대로 반환
+        return {key: value for key, value in response.items() if key != "series"}
     except HTTPException:
         raise
     except Exception as e:
@@ -1,6 +1,9 @@
+import asyncio
 import logging
+import uuid
 from fastapi import APIRouter, HTTPException
 from app.schemas.health_data import HealthDataRequest, HealthDataResponse
+from app.schemas.health_series import HealthSeries, day_to_date, local_day, timestamp_to_epoch
 from app.services import device_service
 from datetime import datetime
 
@@ -15,6 +18,7 @@ async def receive_health_data(request: HealthDataRequest):
     안드로이드로부터 직접 받은 건강 데이터 저장
     
     FCM 플로우가 아닌 직접 전송 방식도 지원합니다.
+    저장소 조회/저장은 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
     """
     try:
         logger.info(f"Received health data from user: {request.user_id}, device: {request.device_id}")
@@ -27,6 +31,12 @@ async def receive_health_data(request: HealthDataRequest):
             SleepDataPoint
         )
         
+        # 시각 파싱과 기기 시간대 기준 날짜 구분은 수신 시 한 번만 수행
+        if request.timezone:
+            timezone = device_service.resolve_timezone(request.timezone)
+        else:
+            timezone = await asyncio.to_thread(device_service.get_device_timezone, request.device_id)
+        
         requested_data = RequestedHealthData()
         
         if request.steps:
@@ -46,7 +56,10 @@ async def receive_health_data(request: HealthDataRequest):
             ]
         
         if request.sleep:
-            sleep_date = request.sleep.start_time.split('T')[0] if request.sleep.start_time else datetime.utcnow().strftime('%Y-%m-%d')
+            if request.sleep.start_time:
+                sleep_date = day_to_date(local_day(timestamp_to_epoch(request.sleep.start_time, timezone), timezone))
+            else:
+                sleep_date = datetime.now(timezone).strftime('%Y-%m-%d')
             requested_data.sleep = [
                 SleepDataPoint(
                     date=sleep_date,
@@ -64,13 +77,10 @@ async def receive_health_data(request: HealthDataRequest):
                 }
             ]
         
-        request_id = f"direct_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{request.device_id[:8] if request.device_id else 'unknown'}"
-        
-        device_service.save_data_response(
-            request_id=request_id,
-            response_data=requested_data.model_dump()
-        )
+        # 같은 초에 여러 샘플이 들어와도 서로 덮어쓰지 않도록 임의 접미사 추가
+        request_id = f"direct_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{request.device_id[:8] if request.device_id else 'unknown'}_{uuid.uuid4().hex[:6]}"
         
+        # save_data_response가 device_id를 조회할 수 있도록 요청 기록을 먼저 등록
         if request.device_id:
             fake_request = {
                 "request_id": request_id,
@@ -83,8 +93,14 @@ async def receive_health_data(request: HealthDataRequest):
                 "completed_at": datetime.utcnow().isoformat(),
                 "error_message": None
             }
-            from app.services.device_service import _data_requests
-            _data_requests[request_id] = fake_request
+            await asyncio.to_thread(device_service.save_data_request, fake_request)
+        
+        await asyncio.to_thread(
+            device_service.save_data_response,
+            request_id=request_id,
+            response_data=requested_data.model_dump(),
+            series=HealthSeries.from_health_data(requested_data, timezone).model_dump(mode="json")
+        )
         
         logger.info(f"Health data saved with request_id: {request_id}")
         
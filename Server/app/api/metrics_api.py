@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Prometheus 지표 조회
+    
+    노드별 실행 시간, LLM 호출 시간/토큰 수, 캐시 적중, 그래프 전체 실행 시간, HTTP 요청 처리 시간
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
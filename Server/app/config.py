@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 
@@ -6,10 +7,80 @@ class Settings(BaseSettings):
     debug: bool = True
 
     # LLM API 설정
+    # stub: API를 호출하지 않는 결정적 응답 모델 (오프라인 벤치마크/회귀 확인용)
+    llm_provider: Literal["openai", "stub"] = "openai"
+    stub_llm_latency_seconds: float = 0.0
     openai_api_key: str | None = None
     llm_model: str = "gpt-5-nano"
     llm_temperature: float = 0.3
     llm_max_tokens: int = 1500
+    # 추론 모델의 reasoning_effort (None이면 전달하지 않음, 추론 모델이 아니면 None 유지)
+    llm_reasoning_effort: Literal["minimal", "low", "medium", "high"] | None = None
+    # 노드별 모델 설정 (없는 노드는 위 기본값, 노드: router, quality, health, analysis, report, advice)
+    # 예: NODE_MODELS='{"quality": "gpt-5-nano", "report": "gpt-5-mini"}'
+    node_models: dict[str, str] = {}
+    node_temperatures: dict[str, float] = {}
+    node_reasoning_efforts: dict[str, Literal["minimal", "low", "medium", "high"]] = {}
+    # 노드별 프롬프트 입력 토큰 예산 (초과 시 우선순위가 낮은 구간부터 축약)
+    node_max_input_tokens: dict[str, int] = {"health": 2000, "analysis": 3000, "report": 3000, "advice": 1500}
+    # 노드별 출력 토큰 예산 (없는 노드는 llm_max_tokens)
+    node_max_output_tokens: dict[str, int] = {"report": 3000}
+
+    # LLM 호출 제한 (초과 요청은 대기열에서 기다리고, 대기열이 가득 차면 503)
+    llm_max_concurrency: int = 8
+    llm_requests_per_minute: int | None = 500
+    llm_tokens_per_minute: int | None = 200000
+    llm_max_queue: int = 32
+    llm_queue_timeout_seconds: float = 10.0
+    # LLM HTTP 커넥션 풀
+    llm_http_max_connections: int = 20
+    llm_http_timeout_seconds: float = 60.0
+
+    # 파이프라인 설정
+    # full: 데이터 품질 평가, 건강 데이터 해석 LLM 호출 포함
+    # lean: 결과가 응답에 쓰이지 않는 LLM 호출 생략 (analysis, report만 호출)
+    pipeline_mode: Literal["full", "lean"] = "lean"
+    # 규칙으로 의도를 판단할 수 없을 때 LLM으로 분류 (False면 전체 분석 경로)
+    intent_router_llm_fallback: bool = False
+    # Analysis Agent 도구 호출 반복 횟수 / 시간 제한 (초과 시 도구 없이 최종 답변 생성)
+    analysis_max_tool_rounds: int = 3
+    analysis_tool_budget_seconds: float = 8.0
+
+    # LLM 응답 캐시 설정 (동일 프롬프트 재요청 시 LLM 호출 생략)
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = "llm_cache.sqlite3"
+    llm_cache_ttl_seconds: int | None = 3600
+    llm_cache_max_entries: int = 5000
+
+    # 대화 체크포인트 (conversation_id별 그래프 상태를 SQLite에 저장, 실패한 요청은 실패 지점부터 재개)
+    checkpoint_enabled: bool = True
+    checkpoint_path: str = "checkpoints.sqlite3"
+
+    # 기기 / 데이터 요청 / 데이터 응답 / 사용자 세션 저장소
+    # sqlite: 재시작 후에도 유지되고 여러 워커가 공유 (WAL), memory: 프로세스 메모리 (재시작 시 초기화)
+    storage_backend: Literal["sqlite", "memory"] = "sqlite"
+    storage_path: str = "health_data.sqlite3"
+    storage_pool_size: int = 4
+    storage_busy_timeout_seconds: float = 5.0
+
+    # 시간대 표기가 없는 시각의 해석과 날짜 구분에 쓰는 기본 기기 시간대 (기기 등록 시 timezone을 보내지 않은 경우)
+    default_timezone: str = "Asia/Seoul"
+
+    # LLM 리포트 제한 시간 (초과 시 계산 기반 차트/표만으로 응답, None이면 끝까지 기다림)
+    report_deadline_seconds: float | None = None
+
+    # 새 건강 데이터 저장 시 기본 리포트를 백그라운드에서 미리 생성 (기기별로 마지막 저장 후 debounce초 뒤 1회)
+    precompute_enabled: bool = False
+    precompute_debounce_seconds: float = 3.0
+    precompute_message: str = "내 건강 상태를 분석해줘"
+
+    # /agent/chat/batch 요청 수 상한과 동시 실행 그래프 수
+    # (동시 실행 수는 llm_max_concurrency + llm_max_queue보다 작아야 대기열 초과 없이 처리됨)
+    chat_batch_max_size: int = 500
+    chat_batch_max_concurrency: int = 16
+
+    # Idempotency-Key로 저장한 /agent/chat 응답 재사용 시간
+    idempotency_ttl_seconds: int = 300
 
     # Firebase 설정
     firebase_service_account_path: str | None = None
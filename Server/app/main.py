@@ -1,11 +1,15 @@
 import logging 
 import asyncio 
+import time
 
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.api import chat_api, health_api, fcm_api
+from app.api import chat_api, health_api, fcm_api, metrics_api
 from app.services.fcm_service import initialize_fcm  
+from app.services import report_precompute_service
+from app.services.storage_service import close_storage
+from app.services.metrics_service import observe_http_request
 
 logging.basicConfig(
     level=logging.DEBUG,
@@ -27,6 +31,22 @@ app.add_middleware(
 app.include_router(chat_api.router)
 app.include_router(health_api.router)
 app.include_router(fcm_api.router)
+app.include_router(metrics_api.router)
+
+
+@app.middleware("http")
+async def http_metrics_middleware(request: Request, call_next):
+    started_at = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # 경로 파라미터가 값으로 펼쳐지지 않도록 매칭된 라우트 경로를 라벨로 사용
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        observe_http_request(request.method, route_path, status, time.perf_counter() - started_at)
 
 async def heartbeat():
     while True:
@@ -40,6 +60,8 @@ async def startup_event():
         initialize_fcm()
         from app.agents.health_graph import HealthGraph
         app.state.health_graph = HealthGraph()
+        await app.state.health_graph.start()
+        report_precompute_service.start(app.state.health_graph)
         app.state.heartbeat_task = asyncio.create_task(heartbeat())
         logger.info("Server startup complete")
     except Exception as e:
@@ -53,4 +75,9 @@ async def shutdown_event():
     task = getattr(app.state, "heartbeat_task", None)
     if task:
         task.cancel() 
+    await report_precompute_service.stop()
+    health_graph = getattr(app.state, "health_graph", None)
+    if health_graph:
+        await health_graph.aclose()
+    close_storage()
 
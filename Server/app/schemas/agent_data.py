@@ -1,5 +1,12 @@
 from typing import TypedDict, Optional, List, Dict, Any
 
+class AnalysisPeriod(TypedDict, total=False):
+    time_range: str
+    start_date: str
+    end_date: str
+    days: int
+    latest_data_date: str
+
 class StepsSummary(TypedDict, total=False):
     total: int
     average: float
@@ -35,6 +42,7 @@ class Trend(TypedDict, total=False):
     period: str
 
 class HealthAnalysis(TypedDict, total=False):
+    period: Optional[AnalysisPeriod]
     steps_summary: Optional[StepsSummary]
     heart_rate_summary: Optional[HeartRateSummary]
     sleep_summary: Optional[SleepSummary]
@@ -5,6 +5,7 @@ from typing import Union, Literal, Optional
 class ChatRequest(BaseModel):
     message: str
     device_id: Optional[str] = Field(None, description="기기 ID (선택)")
+    conversation_id: Optional[str] = Field(None, description="대화 ID (선택, 같은 대화의 이전 상태를 이어서 사용)")
 
 
 class MarkdownBlock(BaseModel):
@@ -41,6 +42,30 @@ class ImageBlock(BaseModel):
 
 Block = Union[MarkdownBlock, ChartBlock, TableBlock, ImageBlock]
 
+# Report Agent가 LLM으로 생성하는 블록 (이미지는 생성하지 않음)
+ReportBlock = Union[MarkdownBlock, ChartBlock, TableBlock]
+
+
+class ReportOutput(BaseModel):
+    """Report Agent LLM 응답 스키마 (JSON Schema 응답 형식 생성에 사용)"""
+    blocks: list[ReportBlock] = Field(..., description="리포트 블록 배열 (markdown, chart, table 순서)")
+
 
 class ChatResponse(BaseModel):
     blocks: list[Block] = Field(..., description="응답 블록 배열")
+    partial: bool = Field(False, description="LLM 리포트가 제한 시간 안에 완성되지 않아 계산 기반 블록만 담은 응답인지 여부")
+
+
+class ChatBatchRequest(BaseModel):
+    requests: list[ChatRequest] = Field(..., min_length=1, description="채팅 요청 배열")
+
+
+class ChatBatchItem(BaseModel):
+    index: int = Field(..., description="요청 배열에서의 순번")
+    blocks: Optional[list[Block]] = Field(None, description="응답 블록 배열 (실패 시 None)")
+    error: Optional[str] = Field(None, description="실패 사유")
+    retryable: bool = Field(False, description="일시적인 LLM 오류로 실패하여 재시도 가능한지 여부")
+
+
+class ChatBatchResponse(BaseModel):
+    results: list[ChatBatchItem] = Field(..., description="요청 순서대로 정렬된 결과 배열")
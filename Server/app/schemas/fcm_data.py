@@ -24,6 +24,7 @@ class DeviceRegisterRequest(BaseModel):
     device_id: str = Field(..., description="기기 ID")
     fcm_token: str = Field(..., description="FCM 토큰")
     user_id: Optional[str] = Field(None, description="사용자 ID")
+    timezone: Optional[str] = Field(None, description="기기 시간대 (IANA 이름, 예: Asia/Seoul)")
 
 
 class DeviceRegisterResponse(BaseModel):
@@ -0,0 +1,322 @@
+import bisect
+import re
+from array import array
+from typing import Dict, NamedTuple, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_serializer, field_validator
+from app.schemas.health_series import HealthSeries, MetricSeries, load_array, date_to_day, day_to_date
+
+# 심박수가 이 값 미만이면 안정 심박수, 이상이면 활동 심박수
+RESTING_HEART_RATE_THRESHOLD = 100
+# 수면 시간이 이 값 미만이면 수면 부족
+INSUFFICIENT_SLEEP_HOURS = 7.0
+
+# 분석 기간 (time_range)
+# - today: 기기 시간대 기준 오늘 / yesterday: 어제
+# - last_N_days: 오늘까지 N일 / YYYY-MM-DD~YYYY-MM-DD: 지정 기간 (양 끝 포함)
+# 데이터가 마지막으로 들어온 날이 아니라 현재 날짜가 기준이므로, 데이터가 오래되었으면 기간에 데이터가 없을 수 있음
+DEFAULT_TIME_RANGE = "today"
+MAX_WINDOW_DAYS = 3650
+
+_TIME_RANGE_ALIASES = {
+    "day": "today",
+    "today": "today",
+    "yesterday": "yesterday",
+    "week": "last_7_days",
+    "month": "last_30_days",
+}
+_LAST_DAYS_PATTERN = re.compile(r"last_(\d+)_days")
+_DATE_RANGE_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})~(\d{4}-\d{2}-\d{2})")
+
+
+def normalize_time_range(value: Optional[str]) -> Optional[str]:
+    """
+    분석 기간 표기를 정규화 (알 수 없는 표기는 None)
+
+    LLM 의도 분류 결과의 day/week/month도 받습니다.
+    """
+    if not value:
+        return None
+    value = value.strip().lower()
+    if value in _TIME_RANGE_ALIASES:
+        return _TIME_RANGE_ALIASES[value]
+
+    match = _LAST_DAYS_PATTERN.fullmatch(value)
+    if match:
+        days = min(int(match.group(1)), MAX_WINDOW_DAYS)
+        return "today" if days <= 1 else f"last_{days}_days"
+
+    match = _DATE_RANGE_PATTERN.fullmatch(value)
+    if match:
+        try:
+            start, end = sorted((date_to_day(match.group(1)), date_to_day(match.group(2))))
+        except ValueError:
+            return None
+        return f"{day_to_date(start)}~{day_to_date(end)}"
+    return None
+
+
+def resolve_time_range(time_range: Optional[str], today: int) -> Tuple[int, int]:
+    """
+    분석 기간 -> (시작 날짜 번호, 끝 날짜 번호 + 1)
+
+    Args:
+        time_range: 분석 기간 (None이면 today)
+        today: 기기 시간대 기준 오늘 날짜 번호
+    """
+    time_range = normalize_time_range(time_range) or DEFAULT_TIME_RANGE
+    if time_range == "yesterday":
+        return today - 1, today
+
+    match = _LAST_DAYS_PATTERN.fullmatch(time_range)
+    if match:
+        return today + 1 - int(match.group(1)), today + 1
+
+    match = _DATE_RANGE_PATTERN.fullmatch(time_range)
+    if match:
+        return date_to_day(match.group(1)), date_to_day(match.group(2)) + 1
+
+    return today, today + 1
+
+
+class WindowStats(NamedTuple):
+    """날짜 구간의 합계 (start, end는 일별 열의 인덱스 구간)"""
+
+    start: int
+    end: int
+    count: int
+    total: float
+    total_sq: float
+    below_count: int
+    below_total: float
+
+    @property
+    def days(self) -> int:
+        return self.end - self.start
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count
+
+    @property
+    def std(self) -> float:
+        return max(self.total_sq / self.count - self.mean ** 2, 0.0) ** 0.5
+
+
+# 열 이름 -> array 타입 (prefix 열은 길이가 일수 + 1인 누적합)
+_COLUMN_TYPES = {
+    "days": "i",
+    "count": "q",
+    "total": "d",
+    "total_sq": "d",
+    "below_count": "q",
+    "below_total": "d",
+    "day_max": "d",
+    "day_min": "d",
+}
+_PREFIX_COLUMNS = ("count", "total", "total_sq", "below_count", "below_total")
+
+
+def _empty_column(name: str):
+    return Field(default_factory=lambda: array(_COLUMN_TYPES[name], [0] if name in _PREFIX_COLUMNS else []))
+
+
+class DailySeries(BaseModel):
+    """
+    항목 하나의 일별 집계 (데이터가 있는 날만, 날짜 순)
+
+    합계/제곱합/기준값 미만 개수와 합계는 누적합(prefix sum)으로, 일별 최대/최소는 희소 테이블로 조회하므로
+    어떤 날짜 구간이든 원본 샘플 수와 관계없이 O(log n)에 요약할 수 있습니다.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # 이 값 미만인 샘플을 따로 집계 (None이면 집계하지 않음)
+    threshold: Optional[float] = None
+
+    days: array = _empty_column("days")
+    count: array = _empty_column("count")
+    total: array = _empty_column("total")
+    total_sq: array = _empty_column("total_sq")
+    below_count: array = _empty_column("below_count")
+    below_total: array = _empty_column("below_total")
+    day_max: array = _empty_column("day_max")
+    day_min: array = _empty_column("day_min")
+
+    # 구간 최대/최소 인덱스 희소 테이블 (처음 조회 시 생성, 직렬화하지 않음)
+    _max_table: Optional[list] = PrivateAttr(default=None)
+    _min_table: Optional[list] = PrivateAttr(default=None)
+
+    @field_validator(*_COLUMN_TYPES, mode="before")
+    @classmethod
+    def _load_column(cls, column, info):
+        return load_array(_COLUMN_TYPES[info.field_name], column)
+
+    @field_serializer(*_COLUMN_TYPES)
+    def _dump_column(self, column: array, info):
+        return column.tolist() if info.mode == "json" else column.tobytes()
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @classmethod
+    def from_series(
+        cls,
+        series: MetricSeries,
+        threshold: Optional[float] = None,
+        previous: Optional["DailySeries"] = None,
+        from_day: Optional[int] = None
+    ) -> "DailySeries":
+        """
+        시계열에서 일별 집계 생성
+
+        previous와 from_day가 있으면 from_day 이전 날짜의 집계는 previous에서 복사하고
+        from_day부터의 샘플만 다시 집계합니다 (새 데이터는 대부분 마지막 날짜에 추가되므로).
+        """
+        daily = cls(threshold=threshold)
+        start = 0
+        if previous is not None and from_day is not None:
+            kept = bisect.bisect_left(previous.days, from_day)
+            for name in _COLUMN_TYPES:
+                column = getattr(previous, name)
+                setattr(daily, name, column[:kept + 1] if name in _PREFIX_COLUMNS else column[:kept])
+            start = bisect.bisect_left(series.days, from_day)
+
+        days, values = series.days, series.values
+        for i in range(start, len(days)):
+            daily._add_sample(days[i], values[i])
+        return daily
+
+    def _add_sample(self, day: int, value: float) -> None:
+        below = self.threshold is not None and value < self.threshold
+        if not self.days or self.days[-1] != day:
+            self.days.append(day)
+            self.day_max.append(value)
+            self.day_min.append(value)
+            for name in _PREFIX_COLUMNS:
+                column = getattr(self, name)
+                column.append(column[-1])
+        else:
+            self.day_max[-1] = max(self.day_max[-1], value)
+            self.day_min[-1] = min(self.day_min[-1], value)
+
+        self.count[-1] += 1
+        self.total[-1] += value
+        self.total_sq[-1] += value * value
+        if below:
+            self.below_count[-1] += 1
+            self.below_total[-1] += value
+
+    def span(self, start_day: int, end_day: int) -> Tuple[int, int]:
+        """start_day 이상 end_day 미만 날짜의 인덱스 구간"""
+        return bisect.bisect_left(self.days, start_day), bisect.bisect_left(self.days, end_day)
+
+    def stats(self, start_day: int, end_day: int) -> Optional[WindowStats]:
+        """날짜 구간 합계 (데이터가 없으면 None)"""
+        i, j = self.span(start_day, end_day)
+        if i >= j:
+            return None
+        return WindowStats(
+            start=i,
+            end=j,
+            count=self.count[j] - self.count[i],
+            total=self.total[j] - self.total[i],
+            total_sq=self.total_sq[j] - self.total_sq[i],
+            below_count=self.below_count[j] - self.below_count[i],
+            below_total=self.below_total[j] - self.below_total[i],
+        )
+
+    def day_total(self, i: int) -> float:
+        """i번째 날의 합계"""
+        return self.total[i + 1] - self.total[i]
+
+    def last_below_day(self, window: WindowStats) -> Optional[int]:
+        """구간에서 기준값 미만 샘플이 있는 마지막 날의 인덱스 (누적 개수가 마지막으로 늘어난 곳)"""
+        if window.below_count == 0:
+            return None
+        return bisect.bisect_left(self.below_count, self.below_count[window.end], window.start, window.end + 1) - 1
+
+    def max_index(self, window: WindowStats) -> int:
+        """구간에서 일별 최대값이 가장 큰 날의 인덱스 (O(1))"""
+        if self._max_table is None:
+            self._max_table = _sparse_table(self.day_max, max)
+        return _range_query(self._max_table, self.day_max, window.start, window.end, max)
+
+    def min_index(self, window: WindowStats) -> int:
+        """구간에서 일별 최소값이 가장 작은 날의 인덱스 (O(1))"""
+        if self._min_table is None:
+            self._min_table = _sparse_table(self.day_min, min)
+        return _range_query(self._min_table, self.day_min, window.start, window.end, min)
+
+
+def _sparse_table(values: array, pick) -> list:
+    """table[k][i] = values[i:i + 2^k] 중 pick(최대/최소)인 인덱스"""
+    table = [array("i", range(len(values)))]
+    width = 1
+    while width * 2 <= len(values):
+        previous = table[-1]
+        table.append(array("i", (
+            pick(previous[i], previous[i + width], key=values.__getitem__)
+            for i in range(len(values) - width * 2 + 1)
+        )))
+        width *= 2
+    return table
+
+
+def _range_query(table: list, values: array, start: int, end: int, pick) -> int:
+    level = (end - start).bit_length() - 1
+    return pick(table[level][start], table[level][end - (1 << level)], key=values.__getitem__)
+
+
+class HealthDaily(BaseModel):
+    """
+    기기별 건강 데이터 일별 집계 (분석 기간 요약용)
+
+    - steps: 날짜별 걸음 수 (하루 1건)
+    - heart_rate: 측정값 합계, 안정 심박수(RESTING_HEART_RATE_THRESHOLD 미만) 합계, 일별 최대/최소
+    - sleep: 수면 기록 합계, 수면 부족(INSUFFICIENT_SLEEP_HOURS 미만) 기록 수
+    """
+
+    steps: DailySeries = Field(default_factory=DailySeries)
+    heart_rate: DailySeries = Field(default_factory=lambda: DailySeries(threshold=RESTING_HEART_RATE_THRESHOLD))
+    sleep: DailySeries = Field(default_factory=lambda: DailySeries(threshold=INSUFFICIENT_SLEEP_HOURS))
+
+    def __len__(self) -> int:
+        return len(self.steps) + len(self.heart_rate) + len(self.sleep)
+
+    def sample_counts(self) -> Dict[str, int]:
+        """항목별 전체 샘플 수"""
+        return {metric: getattr(self, metric).count[-1] for metric in ("steps", "heart_rate", "sleep")}
+
+    @property
+    def latest_day(self) -> Optional[int]:
+        """데이터가 있는 마지막 날짜 번호"""
+        last_days = [daily.days[-1] for daily in (self.steps, self.heart_rate, self.sleep) if daily.days]
+        return max(last_days) if last_days else None
+
+    @classmethod
+    def from_series(
+        cls,
+        series: HealthSeries,
+        previous: Optional["HealthDaily"] = None,
+        from_day: Optional[int] = None
+    ) -> "HealthDaily":
+        """
+        시계열에서 일별 집계 생성 (previous, from_day: DailySeries.from_series 참고)
+
+        새 객체를 만들어 반환하므로 이전 집계를 읽는 중인 요청에 영향을 주지 않습니다.
+        """
+        def build(metric: str, threshold: Optional[float]) -> DailySeries:
+            kept = getattr(previous, metric) if previous is not None else None
+            return DailySeries.from_series(getattr(series, metric), threshold, kept, from_day)
+
+        return cls(
+            steps=build("steps", None),
+            heart_rate=build("heart_rate", RESTING_HEART_RATE_THRESHOLD),
+            sleep=build("sleep", INSUFFICIENT_SLEEP_HOURS),
+        )
+
+    def resolve(self, time_range: Optional[str], today: int) -> Optional[Tuple[int, int]]:
+        """분석 기간 -> (시작 날짜 번호, 끝 날짜 번호 + 1) (데이터가 전혀 없으면 None)"""
+        if self.latest_day is None:
+            return None
+        return resolve_time_range(time_range, today)
@@ -28,6 +28,7 @@ class HealthDataRequest(BaseModel):
     user_id: str = Field(..., description="사용자 ID")
     device_id: str = Field(..., description="기기 ID")
     timestamp: str = Field(..., description="데이터 수집 시각 (ISO 8601)")
+    timezone: Optional[str] = Field(None, description="기기 시간대 (IANA 이름, 없으면 등록된 기기 시간대)")
     steps: Optional[StepsData] = Field(None, description="걸음 수 데이터")
     heart_rate: Optional[HeartRateData] = Field(None, description="심박수 데이터")
     sleep: Optional[SleepData] = Field(None, description="수면 데이터")
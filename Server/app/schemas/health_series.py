@@ -0,0 +1,217 @@
+import bisect
+from array import array
+from datetime import date, datetime, time as dt_time, tzinfo
+from typing import Iterable, Tuple
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator, model_validator
+from app.schemas.fcm_data import RequestedHealthData
+
+# 날짜 번호 = 1970-01-01부터 지난 일 수
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def date_to_day(value: str) -> int:
+    """날짜 (YYYY-MM-DD) -> 날짜 번호"""
+    return date.fromisoformat(value[:10]).toordinal() - _EPOCH_ORDINAL
+
+
+def day_to_date(day: int) -> str:
+    """날짜 번호 -> 날짜 (YYYY-MM-DD)"""
+    return date.fromordinal(day + _EPOCH_ORDINAL).isoformat()
+
+
+def parse_timestamp(timestamp: str, tz: tzinfo) -> datetime:
+    """
+    ISO 8601 시각 파싱
+
+    시간대 표기(Z, +09:00)가 있으면 그대로 사용하고, 없으면 기기 시간대(tz)의 현지 시각으로 봅니다.
+    """
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        # 나노초 등 fromisoformat이 읽지 못하는 소수점 자리는 초 단위까지만 사용
+        parsed = datetime.fromisoformat(timestamp[:19])
+        offset = timestamp[19:].lstrip("0123456789.")
+        if offset:
+            parsed = datetime.fromisoformat(timestamp[:19] + offset.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=tz)
+
+
+def timestamp_to_epoch(timestamp: str, tz: tzinfo) -> int:
+    """ISO 8601 시각 -> UTC epoch 초"""
+    return int(parse_timestamp(timestamp, tz).timestamp())
+
+
+def local_day(epoch: int, tz: tzinfo) -> int:
+    """UTC epoch 초 -> 기기 시간대 기준 날짜 번호"""
+    return datetime.fromtimestamp(epoch, tz).toordinal() - _EPOCH_ORDINAL
+
+
+def day_start_epoch(day: int, tz: tzinfo) -> int:
+    """날짜 번호 -> 기기 시간대 기준 그날 0시의 UTC epoch 초"""
+    return int(datetime.combine(date.fromordinal(day + _EPOCH_ORDINAL), dt_time(), tzinfo=tz).timestamp())
+
+
+class MetricSeries(BaseModel):
+    """
+    항목 하나의 시계열 (날짜 번호 / UTC epoch 초 / 값 열, (날짜, 시각) 순 정렬)
+
+    샘플마다 Pydantic 객체를 두지 않고 array에 저장합니다.
+    날짜 번호는 수신 시 기기 시간대로 한 번만 계산해 두므로, 날짜 구간 조회는 문자열 처리 없이
+    날짜 열의 이분 탐색(O(log n))입니다. 같은 날짜/시각의 샘플은 나중에 추가한 값으로 바뀝니다.
+    체크포인트 저장 시에는 열을 bytes로 직렬화합니다.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    days: array = Field(default_factory=lambda: array("i"))
+    times: array = Field(default_factory=lambda: array("q"))
+    values: array = Field(default_factory=lambda: array("d"))
+
+    @field_validator("days", mode="before")
+    @classmethod
+    def _load_days(cls, column):
+        return load_array("i", column)
+
+    @field_validator("times", mode="before")
+    @classmethod
+    def _load_times(cls, column):
+        return load_array("q", column)
+
+    @field_validator("values", mode="before")
+    @classmethod
+    def _load_values(cls, column):
+        return load_array("d", column)
+
+    @model_validator(mode="after")
+    def _check_lengths(self):
+        if not len(self.days) == len(self.times) == len(self.values):
+            raise ValueError(
+                f"Series columns differ in length: days={len(self.days)}, times={len(self.times)}, values={len(self.values)}"
+            )
+        return self
+
+    @field_serializer("days", "times", "values")
+    def _dump_column(self, column: array, info):
+        return column.tolist() if info.mode == "json" else column.tobytes()
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(column) * column.itemsize for column in (self.days, self.times, self.values))
+
+    def add(self, day: int, time: int, value: float) -> None:
+        """샘플 추가 (대부분 마지막 샘플보다 뒤이므로 append)"""
+        days, times = self.days, self.times
+        if not days or days[-1] < day or (days[-1] == day and times[-1] < time):
+            days.append(day)
+            times.append(time)
+            self.values.append(value)
+            return
+
+        lo = bisect.bisect_left(days, day)
+        hi = bisect.bisect_right(days, day, lo)
+        i = bisect.bisect_left(times, time, lo, hi)
+        if i < hi and times[i] == time:
+            self.values[i] = value
+        else:
+            days.insert(i, day)
+            times.insert(i, time)
+            self.values.insert(i, value)
+
+    def extend(self, samples: Iterable[Tuple[int, int, float]]) -> None:
+        for day, time, value in samples:
+            self.add(day, time, value)
+
+    def samples(self) -> Iterable[Tuple[int, int, float]]:
+        """(날짜 번호, 시각, 값) 순회"""
+        return zip(self.days, self.times, self.values)
+
+
+def load_array(typecode: str, column) -> array:
+    """array / bytes (체크포인트) / 목록 (JSON) -> array"""
+    if isinstance(column, array):
+        return column
+    if isinstance(column, (bytes, bytearray)):
+        loaded = array(typecode)
+        loaded.frombytes(column)
+        return loaded
+    return array(typecode, column)
+
+
+def _daily_sample(day: int, value: float, tz: tzinfo) -> Tuple[int, int, float]:
+    return day, day_start_epoch(day, tz), value
+
+
+def _instant_sample(timestamp: str, value: float, tz: tzinfo) -> Tuple[int, int, float]:
+    epoch = timestamp_to_epoch(timestamp, tz)
+    return local_day(epoch, tz), epoch, value
+
+
+def _sleep_sample(sleep, tz: tzinfo) -> Tuple[int, int, float]:
+    """수면 기록은 앱이 정한 날짜(date)에 묶고, 같은 날짜의 여러 건은 시작 시각으로 구분"""
+    day = date_to_day(sleep.date)
+    time = timestamp_to_epoch(sleep.start_time, tz) if sleep.start_time else day_start_epoch(day, tz)
+    return day, time, sleep.hours
+
+
+# 항목별 (날짜 번호, UTC epoch 초, 값) 추출 방법 (일 단위 항목은 기기 시간대 기준 그날 0시)
+_SAMPLE_READERS = {
+    "steps": lambda s, tz: _daily_sample(date_to_day(s.date), s.count, tz),
+    "heart_rate": lambda s, tz: _instant_sample(s.timestamp, s.bpm, tz),
+    "sleep": _sleep_sample,
+    "weight": lambda s, tz: _daily_sample(date_to_day(s.date), s.kg, tz),
+}
+
+METRICS = tuple(_SAMPLE_READERS)
+
+
+class HealthSeries(BaseModel):
+    """
+    기기별 건강 데이터 시계열 (분석기가 직접 읽는 형태)
+
+    - steps: 날짜별 걸음 수
+    - heart_rate: 측정 시각별 심박수
+    - sleep: 수면 기록별 수면 시간 (날짜 + 시작 시각 기준)
+    - weight: 날짜별 체중
+
+    수신 시 기기 시간대로 시각 파싱과 날짜 구분을 끝낸 상태이므로 이후에는 정수 비교만 합니다.
+    """
+
+    steps: MetricSeries = Field(default_factory=MetricSeries)
+    heart_rate: MetricSeries = Field(default_factory=MetricSeries)
+    sleep: MetricSeries = Field(default_factory=MetricSeries)
+    weight: MetricSeries = Field(default_factory=MetricSeries)
+
+    def __len__(self) -> int:
+        return len(self.steps) + len(self.heart_rate) + len(self.sleep) + len(self.weight)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, metric).nbytes for metric in METRICS)
+
+    @staticmethod
+    def read_samples(data: RequestedHealthData, metric: str, tz: tzinfo) -> list:
+        """응답 1건의 항목 샘플을 (날짜, 시각) 순 (날짜 번호, 시각, 값) 목록으로 변환"""
+        read = _SAMPLE_READERS[metric]
+        return sorted((read(sample, tz) for sample in getattr(data, metric) or []), key=lambda sample: sample[:2])
+
+    @classmethod
+    def from_health_data(cls, data: RequestedHealthData, tz: tzinfo) -> "HealthSeries":
+        """
+        응답 1건을 시계열로 변환 (데이터 수신 시 1회)
+
+        Args:
+            data: 받은 건강 데이터
+            tz: 기기 시간대 (시간대 표기가 없는 시각의 해석과 날짜 구분에 사용)
+        """
+        series = cls()
+        for metric in METRICS:
+            getattr(series, metric).extend(cls.read_samples(data, metric, tz))
+        return series
+
+    def add_series(self, other: "HealthSeries") -> None:
+        """다른 시계열의 샘플 추가 (같은 날짜/시각은 other의 값으로 바뀜)"""
+        for metric in METRICS:
+            getattr(self, metric).extend(getattr(other, metric).samples())
@@ -0,0 +1,71 @@
+import logging
+from typing import Optional, Dict, Any
+from app.schemas.agent_data import HealthAnalysis
+from app.services.metrics_service import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+LATEST_KEY = "__latest__"
+
+# 기기 ID -> {"data_version", "analyses": {분석 기간@기준 날짜: {"health_analysis", "formatted"}}}
+_analysis_cache: Dict[str, Dict[str, Any]] = {}
+
+
+def get_cached_analysis(device_id: Optional[str], data_version: int, time_range: str = "") -> Optional[Dict[str, Any]]:
+    """
+    캐시된 건강 분석 결과 조회
+
+    Args:
+        device_id: 기기 ID (None이면 전체 최신 데이터 기준)
+        data_version: 현재 저장된 데이터 버전
+        time_range: 분석 기간 (today 등 상대 기간은 기준 날짜 포함)
+
+    Returns:
+        {"health_analysis", "formatted"} 또는 None (캐시 없음 / 데이터 변경됨)
+    """
+    entry = _analysis_cache.get(device_id or LATEST_KEY)
+    cached = entry["analyses"].get(time_range) if entry and entry["data_version"] == data_version else None
+    record_cache_lookup("analysis", hit=cached is not None)
+    return cached
+
+
+def save_cached_analysis(
+    device_id: Optional[str],
+    data_version: int,
+    health_analysis: HealthAnalysis,
+    formatted: str,
+    time_range: str = ""
+) -> None:
+    """
+    건강 분석 결과 캐시 저장
+
+    Args:
+        device_id: 기기 ID (None이면 전체 최신 데이터 기준)
+        data_version: 분석에 사용한 데이터 버전
+        health_analysis: 분석 결과
+        formatted: LLM 전달용으로 포맷팅된 분석 텍스트
+        time_range: 분석 기간 (today 등 상대 기간은 기준 날짜 포함)
+    """
+    key = device_id or LATEST_KEY
+    entry = _analysis_cache.get(key)
+    if not entry or entry["data_version"] != data_version:
+        entry = _analysis_cache[key] = {"data_version": data_version, "analyses": {}}
+    entry["analyses"][time_range] = {
+        "health_analysis": health_analysis,
+        "formatted": formatted,
+    }
+
+
+def invalidate_analysis_cache(device_id: Optional[str] = None) -> None:
+    """
+    새 데이터 저장 시 캐시 무효화
+
+    전체 최신 데이터 기준 캐시도 함께 무효화합니다.
+
+    Args:
+        device_id: 기기 ID
+    """
+    if device_id:
+        _analysis_cache.pop(device_id, None)
+    _analysis_cache.pop(LATEST_KEY, None)
+    logger.debug(f"Analysis cache invalidated (device_id: {device_id or 'latest'})")
@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.config import settings
+from app.services.metrics_service import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# 실행 중인 채팅 (동일 요청은 같은 실행 결과를 공유)
+_in_flight: Dict[str, asyncio.Future] = {}
+
+# Idempotency-Key -> 완료된 응답 (TTL이 모두 같으므로 삽입 순서 = 만료 순서)
+_idempotent_responses: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+class IdempotencyKeyMismatchError(Exception):
+    """같은 Idempotency-Key가 다른 요청 본문으로 재사용된 경우"""
+
+
+def make_chat_key(
+    device_id: Optional[str],
+    message: str,
+    data_version: int,
+    conversation_id: Optional[str] = None
+) -> str:
+    """
+    동일 채팅 요청 판별 키 생성
+    
+    Args:
+        device_id: 기기 ID
+        message: 사용자 메시지
+        data_version: 현재 데이터 버전 (새 데이터가 들어오면 다른 요청으로 취급)
+        conversation_id: 대화 ID (대화마다 상태가 다르므로 다른 대화의 요청과 합치지 않음)
+    """
+    message_hash = hashlib.sha256(message.encode("utf-8")).hexdigest()
+    return f"{conversation_id or ''}:{device_id or 'latest'}:{data_version}:{message_hash}"
+
+
+def make_request_fingerprint(device_id: Optional[str], message: str, conversation_id: Optional[str] = None) -> str:
+    """Idempotency-Key 재사용 검증용 요청 본문 식별값"""
+    return hashlib.sha256(f"{device_id or ''}\n{conversation_id or ''}\n{message}".encode("utf-8")).hexdigest()
+
+
+def make_idempotency_key(idempotency_key: str, fingerprint: str) -> str:
+    """
+    Idempotency-Key 요청의 실행 공유 키
+    
+    요청 본문 식별값을 포함하므로 같은 키라도 본문이 다르면 실행을 공유하지 않습니다.
+    """
+    return f"idempotency:{idempotency_key}:{fingerprint}"
+
+
+def run_single_flight(key: str, factory: Callable[[], Awaitable[Any]]) -> Awaitable[Any]:
+    """
+    동일 키 요청이 실행 중이면 그 결과를 기다리고, 없으면 새로 실행
+    
+    호출 즉시 실행 중 목록에 등록되므로, 반환값을 기다리기 전에 들어온 동일 요청도 같은 실행을 공유합니다.
+    한 요청자의 연결이 끊겨도 공유 실행은 취소되지 않습니다.
+    
+    Args:
+        key: 요청 키
+        factory: 실행할 코루틴을 만드는 함수
+    
+    Returns:
+        실행 결과를 기다리는 awaitable (실행 중 발생한 예외는 모든 요청자에게 전달)
+    """
+    task = _in_flight.get(key)
+    record_cache_lookup("single_flight", hit=task is not None)
+    
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    else:
+        logger.info(f"Joined in-flight chat: {key}")
+    
+    return asyncio.shield(task)
+
+
+def _prune_expired(now: float) -> None:
+    while _idempotent_responses:
+        key, entry = next(iter(_idempotent_responses.items()))
+        if entry["expires_at"] > now:
+            break
+        _idempotent_responses.pop(key)
+
+
+def get_idempotent_response(idempotency_key: str, fingerprint: str) -> Optional[Any]:
+    """
+    저장된 응답 조회
+    
+    Args:
+        idempotency_key: Idempotency-Key 헤더 값
+        fingerprint: 요청 본문 식별값
+    
+    Returns:
+        저장된 응답 또는 None
+    
+    Raises:
+        IdempotencyKeyMismatchError: 같은 키가 다른 요청에 사용된 경우 (저장된 응답 또는 처리 중인 요청)
+    """
+    _prune_expired(time.monotonic())
+    
+    entry = _idempotent_responses.get(idempotency_key)
+    record_cache_lookup("idempotency", hit=entry is not None)
+    if not entry:
+        # 식별값(hex)에는 ":"가 없으므로 마지막 ":" 앞이 같으면 같은 Idempotency-Key로 처리 중인 요청
+        flight_key = make_idempotency_key(idempotency_key, fingerprint)
+        key_prefix = flight_key.rpartition(":")[0]
+        if any(key != flight_key and key.rpartition(":")[0] == key_prefix for key in _in_flight):
+            raise IdempotencyKeyMismatchError(f"Idempotency-Key in use by a different request: {idempotency_key}")
+        return None
+    
+    if entry["fingerprint"] != fingerprint:
+        raise IdempotencyKeyMismatchError(f"Idempotency-Key reused with a different request: {idempotency_key}")
+    
+    logger.info(f"Replaying stored response for Idempotency-Key: {idempotency_key}")
+    return entry["response"]
+
+
+def save_idempotent_response(idempotency_key: str, fingerprint: str, response: Any) -> None:
+    """
+    완료된 응답 저장 (idempotency_ttl_seconds 동안 재사용)
+    
+    Args:
+        idempotency_key: Idempotency-Key 헤더 값
+        fingerprint: 요청 본문 식별값
+        response: 완료된 응답
+    """
+    now = time.monotonic()
+    _prune_expired(now)
+    
+    _idempotent_responses.pop(idempotency_key, None)
+    _idempotent_responses[idempotency_key] = {
+        "fingerprint": fingerprint,
+        "response": response,
+        "expires_at": now + settings.idempotency_ttl_seconds,
+    }
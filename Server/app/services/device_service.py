@@ -1,18 +1,26 @@
 import logging
+import time
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from app.config import settings
+from app.schemas.health_series import local_day
 from app.services.fcm_service import send_data_request_notification, initialize_fcm
+from app.services.analysis_cache_service import invalidate_analysis_cache
+from app.services.report_precompute_service import schedule_precompute
+from app.services.storage_service import get_storage, GLOBAL_VERSION_KEY
 
 logger = logging.getLogger(__name__)
 
 initialize_fcm()
 
-_device_tokens: dict[str, dict] = {}
-_data_requests: dict[str, dict] = {}
-_data_responses: dict[str, dict] = {}
 
-
-def register_device(device_id: str, fcm_token: str, user_id: Optional[str] = None) -> bool:
+def register_device(
+    device_id: str,
+    fcm_token: str,
+    user_id: Optional[str] = None,
+    timezone: Optional[str] = None
+) -> bool:
     """
     디바이스 FCM 토큰 등록
     
@@ -20,18 +28,22 @@ def register_device(device_id: str, fcm_token: str, user_id: Optional[str] = Non
         device_id: 기기 ID
         fcm_token: FCM 토큰
         user_id: 사용자 ID (선택)
+        timezone: 기기 시간대 (IANA 이름, 선택. 없으면 이전에 등록한 값 유지)
     
     Returns:
         등록 성공 여부
     """
     try:
-        _device_tokens[device_id] = {
+        storage = get_storage()
+        existing = storage.get_device(device_id) or {}
+        storage.save_device(device_id, {
             "fcm_token": fcm_token,
             "user_id": user_id,
+            "timezone": timezone or existing.get("timezone"),
             "last_active": datetime.utcnow().isoformat(),
-            "created_at": _device_tokens.get(device_id, {}).get("created_at") or datetime.utcnow().isoformat(),
+            "created_at": existing.get("created_at") or datetime.utcnow().isoformat(),
             "updated_at": datetime.utcnow().isoformat()
-        }
+        })
         logger.info(f"Device registered: {device_id}")
         return True
     except Exception as e:
@@ -49,12 +61,53 @@ def get_device_token(device_id: str) -> Optional[str]:
     Returns:
         FCM 토큰 또는 None
     """
-    device = _device_tokens.get(device_id)
+    device = get_storage().get_device(device_id)
     if device:
         return device.get("fcm_token")
     return None
 
 
+def resolve_timezone(name: Optional[str]) -> tzinfo:
+    """
+    시간대 이름 -> tzinfo
+    
+    이름이 없거나 알 수 없는 이름이면 default_timezone을 사용합니다.
+    """
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"Unknown timezone, using default {settings.default_timezone}: {name}")
+    return ZoneInfo(settings.default_timezone)
+
+
+def get_device_timezone(device_id: Optional[str]) -> tzinfo:
+    """
+    기기 시간대 조회 (등록 시 보낸 값, 없으면 default_timezone)
+    
+    Args:
+        device_id: 기기 ID
+    
+    Returns:
+        기기 시간대
+    """
+    device = get_storage().get_device(device_id) if device_id else None
+    return resolve_timezone((device or {}).get("timezone"))
+
+
+def get_device_today(device_id: Optional[str]) -> int:
+    """
+    기기 시간대 기준 오늘 날짜 번호 (분석 기간 today/yesterday/last_N_days의 기준)
+    
+    Args:
+        device_id: 기기 ID (None이면 default_timezone)
+    
+    Returns:
+        날짜 번호
+    """
+    return local_day(int(time.time()), get_device_timezone(device_id))
+
+
 def create_data_request(
     device_id: str,
     data_types: list[str],
@@ -93,7 +146,8 @@ def create_data_request(
             "error_message": None
         }
         
-        _data_requests[request_id] = request_data
+        # 앱이 FCM을 받고 바로 응답해도 요청을 찾을 수 있도록 전송 전에 저장
+        save_data_request(request_data)
         
         success = send_data_request_notification(
             fcm_token=fcm_token,
@@ -104,11 +158,13 @@ def create_data_request(
         )
         
         if success:
-            request_data["status"] = "sent"
+            get_storage().update_data_request(request_id, {"status": "sent"})
             logger.info(f"Data request created and sent: {request_id}")
         else:
-            request_data["status"] = "sent"
-            request_data["error_message"] = "FCM send failed (but request created)"
+            get_storage().update_data_request(request_id, {
+                "status": "sent",
+                "error_message": "FCM send failed (but request created)"
+            })
             logger.warning(f"FCM send failed but request created: {request_id}")
         
         return request_id
@@ -128,7 +184,20 @@ def get_data_request(request_id: str) -> Optional[dict]:
     Returns:
         요청 데이터 또는 None
     """
-    return _data_requests.get(request_id)
+    return get_storage().get_data_request(request_id)
+
+
+def save_data_request(request_data: dict) -> None:
+    """
+    데이터 요청 기록 저장
+    
+    FCM 요청 없이 직접 전송된 데이터도 save_data_response가 device_id를 찾을 수 있도록
+    요청 기록을 먼저 저장할 때 사용합니다.
+    
+    Args:
+        request_data: request_id, device_id를 포함한 요청 데이터
+    """
+    get_storage().save_data_request(request_data)
 
 
 def update_data_request_status(
@@ -148,16 +217,15 @@ def update_data_request_status(
         업데이트 성공 여부
     """
     try:
-        request = _data_requests.get(request_id)
-        if not request:
-            logger.error(f"Data request not found: {request_id}")
-            return False
-        
-        request["status"] = status
+        fields = {"status": status}
         if status == "completed":
-            request["completed_at"] = datetime.utcnow().isoformat()
+            fields["completed_at"] = datetime.utcnow().isoformat()
         if error_message:
-            request["error_message"] = error_message
+            fields["error_message"] = error_message
+        
+        if not get_storage().update_data_request(request_id, fields):
+            logger.error(f"Data request not found: {request_id}")
+            return False
         
         logger.info(f"Data request status updated: {request_id} -> {status}")
         return True
@@ -166,23 +234,32 @@ def update_data_request_status(
         return False
 
 
-def save_data_response(request_id: str, response_data: dict) -> bool:
+def save_data_response(request_id: str, response_data: dict, series: dict) -> bool:
     """
     받은 데이터 응답 저장
     
     Args:
         request_id: 요청 ID
         response_data: 받은 데이터
+        series: 수신 시 기기 시간대로 변환한 시계열 (HealthSeries.model_dump(mode="json"))
     
     Returns:
         저장 성공 여부
     """
     try:
-        _data_responses[request_id] = {
+        storage = get_storage()
+        device_id = (storage.get_data_request(request_id) or {}).get("device_id")
+        response = {
             "request_id": request_id,
             "data": response_data,
+            "series": series,
             "received_at": datetime.utcnow().isoformat()
         }
+        storage.save_data_response(response, device_id)
+        
+        invalidate_analysis_cache(device_id)
+        schedule_precompute(device_id)
+        
         logger.info(f"Data response saved for request: {request_id}")
         return True
     except Exception as e:
@@ -200,5 +277,71 @@ def get_data_response(request_id: str) -> Optional[dict]:
     Returns:
         저장된 데이터 응답 또는 None
     """
-    return _data_responses.get(request_id)
+    return get_storage().get_data_response(request_id)
+
+
+def get_latest_data_response(device_id: Optional[str] = None) -> Optional[dict]:
+    """
+    가장 최근에 받은 데이터 응답 조회
+    
+    Args:
+        device_id: 기기 ID (None이면 기기 구분 없이 가장 최근)
+    
+    Returns:
+        저장된 데이터 응답 또는 None
+    """
+    return get_storage().get_latest_data_response(device_id)
+
+
+def get_data_responses(
+    device_id: str,
+    received_from: Optional[str] = None,
+    received_to: Optional[str] = None
+) -> list[dict]:
+    """
+    기기의 데이터 응답을 받은 시각 순으로 조회
+    
+    Args:
+        device_id: 기기 ID
+        received_from: 이 시각 이후 (ISO 형식, 포함)
+        received_to: 이 시각 이전 (ISO 형식, 미포함)
+    
+    Returns:
+        received_at 오름차순 데이터 응답 목록
+    """
+    return get_storage().get_data_responses(device_id, received_from, received_to)
 
+
+def get_data_version(device_id: Optional[str] = None) -> int:
+    """
+    저장된 데이터 버전 조회
+    
+    save_data_response가 호출될 때마다 증가하므로, 분석 결과 캐시의 유효성 확인에 사용합니다.
+    저장소에 함께 저장되므로 SQLite 저장소에서는 워커 간에도 같은 값을 봅니다.
+    
+    Args:
+        device_id: 기기 ID (None이면 전체 데이터 기준)
+    
+    Returns:
+        데이터 버전
+    """
+    return get_storage().get_data_version(device_id or GLOBAL_VERSION_KEY)
+
+
+def make_data_source_key(device_id: Optional[str], data_version: Optional[int]) -> Optional[str]:
+    """
+    분석에 사용한 데이터 식별 키
+    
+    대화 체크포인트에 저장된 이전 턴의 분석 결과를 재사용해도 되는지 확인하는 데 사용합니다.
+    저장소가 초기화된 뒤 다시 매겨진 같은 번호의 버전과 구분되도록 저장소 식별값을 포함합니다.
+    
+    Args:
+        device_id: 기기 ID
+        data_version: 데이터 버전
+    
+    Returns:
+        식별 키 (버전이 없으면 None)
+    """
+    if data_version is None:
+        return None
+    return f"{get_storage().epoch}:{device_id or 'latest'}:{data_version}"
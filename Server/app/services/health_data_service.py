@@ -1,90 +1,158 @@
+import heapq
 import logging
-from typing import Optional
-from app.schemas.fcm_data import RequestedHealthData
+import threading
+from typing import Any, Dict, List, Optional
+from app.schemas.health_series import HealthSeries, METRICS
+from app.schemas.health_daily import HealthDaily
 from app.services import device_service
 
 logger = logging.getLogger(__name__)
 
+# 기기 ID -> 누적 병합 결과 (열 기반 시계열과 분석 기간 요약용 일별 집계)
+# {"data_version", "last_received_at", "request_ids", "series": HealthSeries, "daily": HealthDaily}
+_merged_views: Dict[str, Dict[str, Any]] = {}
 
-def get_latest_health_data_by_device(device_id: str) -> Optional[RequestedHealthData]:
+# 기기 구분 없는 최근 응답 1건의 일별 집계 {"data_version", "daily": HealthDaily}
+_latest_daily: Dict[str, Any] = {}
+
+# 병합 결과 갱신 잠금 (저장소 조회를 스레드에서 실행하므로 같은 응답이 두 번 병합되지 않도록)
+_merge_lock = threading.Lock()
+
+
+def _response_series(response: dict) -> HealthSeries:
+    """응답 1건의 시계열 (수신 시 기기 시간대로 변환해 저장한 값)"""
+    return HealthSeries.model_validate(response["series"])
+
+
+def _merge_responses(responses: List[dict]) -> HealthSeries:
     """
-    특정 device_id의 최근 건강 데이터를 조회합니다.
-    현재는 메모리 기반이므로 모든 응답을 확인합니다.
+    응답들의 항목별 샘플을 k-way 병합
     
-    Args:
-        device_id: 기기 ID
+    각 응답의 시계열은 (날짜, 시각) 순으로 정렬되어 있으므로 heapq.merge로 합칩니다.
+    같은 날짜/시각은 응답 순서대로 나오므로 나중에 받은 응답의 값이 남습니다.
+    """
+    parsed = [_response_series(response) for response in responses]
+    series = HealthSeries()
+    
+    for metric in METRICS:
+        # (날짜, 시각, 응답 순서, 값)
+        sources = [
+            [(day, time, order, value) for day, time, value in getattr(response_series, metric).samples()]
+            for order, response_series in enumerate(parsed)
+        ]
+        getattr(series, metric).extend(
+            (day, time, value) for day, time, _, value in heapq.merge(*sources)
+        )
+    
+    return series
+
+
+def _get_merged_view(device_id: str) -> Optional[Dict[str, Any]]:
+    """
+    기기의 누적 병합 결과를 최신 데이터 버전으로 갱신하여 반환
+    
+    마지막 병합 이후 받은 응답만 추가하고, 응답이 다시 저장되는 등 버전 차이를
+    새 응답 수로 설명할 수 없을 때만 처음부터 다시 병합합니다.
+    일별 집계도 새 응답의 가장 이른 날짜부터만 다시 계산합니다.
+    버전이 같으면 잠금 없이 반환하고, 갱신은 한 번에 한 스레드만 합니다.
+    """
+    view = _merged_views.get(device_id)
+    if view and view["data_version"] == device_service.get_data_version(device_id):
+        return view
+    
+    with _merge_lock:
+        return _refresh_merged_view(device_id)
+
+
+def _refresh_merged_view(device_id: str) -> Optional[Dict[str, Any]]:
+    data_version = device_service.get_data_version(device_id)
+    view = _merged_views.get(device_id)
+    
+    if view and view["data_version"] == data_version:
+        return view
+    
+    if view:
+        new_responses = [
+            response for response in device_service.get_data_responses(device_id, received_from=view["last_received_at"])
+            if response["request_id"] not in view["request_ids"]
+        ]
+        if view["data_version"] + len(new_responses) == data_version:
+            first_days = []
+            for response in new_responses:
+                response_series = _response_series(response)
+                view["series"].add_series(response_series)
+                view["request_ids"].add(response["request_id"])
+                view["last_received_at"] = response["received_at"]
+                first_days.extend(
+                    getattr(response_series, metric).days[0] for metric in METRICS if len(getattr(response_series, metric))
+                )
+            if first_days:
+                view["daily"] = HealthDaily.from_series(view["series"], view["daily"], min(first_days))
+            view["data_version"] = data_version
+            return view
+        logger.info(f"Merged health data rebuilt (device_id: {device_id}, version: {view['data_version']} -> {data_version})")
+    
+    responses = [response for response in device_service.get_data_responses(device_id) if response.get("data")]
+    if not responses:
+        return None
+    
+    series = _merge_responses(responses)
+    view = {
+        "data_version": data_version,
+        "last_received_at": responses[-1]["received_at"],
+        "request_ids": {response["request_id"] for response in responses},
+        "series": series,
+        "daily": HealthDaily.from_series(series),
+    }
+    _merged_views[device_id] = view
+    return view
+
+
+def get_latest_health_series() -> Optional[HealthSeries]:
+    """
+    가장 최근 응답 1건의 건강 데이터 시계열을 조회합니다 (단일 사용자 시스템용).
+    device_id 구분 없이 가장 최근 응답을 사용합니다.
     
     Returns:
-        최근 건강 데이터 또는 None
+        시계열 또는 None
     """
     try:
-        from app.services.device_service import _data_responses
-        
-        latest_response = None
-        latest_timestamp = None
+        latest_response = device_service.get_latest_data_response()
         
-        for request_id, response_data in _data_responses.items():
-            if response_data.get("data"):
-                request = device_service.get_data_request(request_id)
-                if request and request.get("device_id") == device_id:
-                    received_at = response_data.get("received_at")
-                    if not latest_timestamp or (received_at and received_at > latest_timestamp):
-                        latest_timestamp = received_at
-                        latest_response = response_data
-        
-        if latest_response:
-            data = latest_response.get("data")
-            if data:
-                try:
-                    return RequestedHealthData(**data)
-                except Exception as e:
-                    logger.error(f"Failed to parse health data: {e}", exc_info=True)
-                    return None
+        if not latest_response or not latest_response.get("data"):
+            logger.warning("No health data responses found")
+            return None
         
-        logger.warning(f"No health data found for device: {device_id}")
-        return None
+        return _response_series(latest_response)
     except Exception as e:
-        logger.error(f"Failed to get health data by device: {e}", exc_info=True)
+        logger.error(f"Failed to get latest health series: {e}", exc_info=True)
         return None
 
 
-def get_latest_health_data() -> Optional[RequestedHealthData]:
+def get_health_daily(device_id: Optional[str] = None) -> Optional[HealthDaily]:
     """
-    가장 최근 건강 데이터를 조회합니다 (단일 사용자 시스템용).
-    device_id 구분 없이 가장 최근 데이터를 반환합니다.
+    건강 데이터 일별 집계를 조회합니다 (분석 기간 요약용).
+    
+    데이터 버전마다 한 번만 갱신되고, 갱신 시 새 객체로 바뀌므로 반환값을 그대로 읽어도 됩니다.
+    그래프 상태(체크포인트)에 두지 않으므로 노드는 필요할 때마다 이 함수로 다시 조회합니다.
+    
+    Args:
+        device_id: 기기 ID (None이면 가장 최근 응답 1건 기준)
     
     Returns:
-        최근 건강 데이터 또는 None
+        일별 집계 또는 None
     """
     try:
-        from app.services.device_service import _data_responses
-        
-        if not _data_responses:
-            logger.warning("No health data responses found")
-            return None
+        if not device_id:
+            data_version = device_service.get_data_version()
+            with _merge_lock:
+                if _latest_daily.get("data_version") != data_version:
+                    series = get_latest_health_series()
+                    _latest_daily.update(data_version=data_version, daily=HealthDaily.from_series(series) if series else None)
+                return _latest_daily["daily"]
         
-        latest_response = None
-        latest_timestamp = None
-        
-        for request_id, response_data in _data_responses.items():
-            if response_data.get("data"):
-                received_at = response_data.get("received_at")
-                if not latest_timestamp or (received_at and received_at > latest_timestamp):
-                    latest_timestamp = received_at
-                    latest_response = response_data
-        
-        if latest_response:
-            data = latest_response.get("data")
-            if data:
-                try:
-                    return RequestedHealthData(**data)
-                except Exception as e:
-                    logger.error(f"Failed to parse health data: {e}", exc_info=True)
-                    return None
-        
-        logger.warning("No valid health data found")
-        return None
+        view = _get_merged_view(device_id)
+        return view["daily"] if view else None
     except Exception as e:
-        logger.error(f"Failed to get latest health data: {e}", exc_info=True)
+        logger.error(f"Failed to get health daily aggregates: {e}", exc_info=True)
         return None
-
@@ -0,0 +1,185 @@
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# LLM 호출은 수 초 단위, 노드/HTTP는 수 ms ~ 수십 초 단위
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+_TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+NODE_DURATION = Histogram(
+    "health_agent_node_duration_seconds",
+    "그래프 노드별 실행 시간",
+    ["node"],
+    buckets=_LATENCY_BUCKETS,
+)
+
+LLM_CALL_DURATION = Histogram(
+    "health_agent_llm_call_duration_seconds",
+    "LLM 호출 1회 소요 시간",
+    ["node", "model"],
+    buckets=_LATENCY_BUCKETS,
+)
+
+LLM_PROMPT_TOKENS = Histogram(
+    "health_agent_llm_prompt_tokens",
+    "LLM 호출 1회 입력 토큰 수",
+    ["node", "model"],
+    buckets=_TOKEN_BUCKETS,
+)
+
+LLM_COMPLETION_TOKENS = Histogram(
+    "health_agent_llm_completion_tokens",
+    "LLM 호출 1회 출력 토큰 수",
+    ["node", "model"],
+    buckets=_TOKEN_BUCKETS,
+)
+
+GRAPH_DURATION = Histogram(
+    "health_agent_graph_duration_seconds",
+    "그래프 전체 실행 시간 (요청 1건)",
+    ["status"],
+    buckets=_LATENCY_BUCKETS,
+)
+
+CACHE_LOOKUPS = Counter(
+    "health_agent_cache_lookups_total",
+    "캐시 조회 횟수",
+    ["cache", "result"],
+)
+
+LLM_QUEUE_WAITING = Gauge(
+    "health_agent_llm_queue_waiting",
+    "LLM 호출 실행 권한을 기다리는 요청 수",
+)
+
+LLM_OVERLOAD_REJECTIONS = Counter(
+    "health_agent_llm_overload_rejections_total",
+    "LLM 호출 대기열 초과로 거절된 횟수",
+    ["reason"],
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP 요청 처리 시간 (스트리밍 응답은 응답 시작까지)",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """
+    캐시 조회 결과 기록
+    
+    Args:
+        cache: 캐시 이름 (llm, analysis, idempotency, single_flight, precomputed_report)
+        hit: 적중 여부 (single_flight는 실행 중인 요청에 합류한 경우)
+    """
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def observe_http_request(method: str, route: str, status: int, duration: float) -> None:
+    """HTTP 요청 처리 시간 기록"""
+    HTTP_REQUEST_DURATION.labels(method=method, route=route, status=str(status)).observe(duration)
+
+
+def _token_usage(response: LLMResult) -> Tuple[Optional[int], Optional[int]]:
+    """LLM 응답에서 (입력 토큰, 출력 토큰) 추출"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens"), usage.get("output_tokens")
+    
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens"), token_usage.get("completion_tokens")
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    LangGraph 실행 중 노드/LLM 소요 시간과 토큰 수를 수집하는 콜백 핸들러
+
+    그래프 실행 config의 callbacks로 전달합니다.
+    - 최상위 실행(부모 없음): 그래프 전체 실행 시간
+    - 이름이 langgraph_node와 같은 실행: 노드 실행 시간
+    - 채팅 모델 실행: LLM 호출 시간, 토큰 수 (langgraph_node로 노드 구분)
+    """
+
+    # 기록만 하므로 스레드 풀을 거치지 않고 이벤트 루프에서 바로 실행
+    run_inline = True
+
+    def __init__(self):
+        self._chain_runs: Dict[UUID, Tuple[str, str, float]] = {}
+        self._llm_runs: Dict[UUID, Tuple[str, str, float]] = {}
+
+    def on_chain_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        
+        if parent_run_id is None:
+            self._chain_runs[run_id] = ("graph", "", time.perf_counter())
+        elif node and kwargs.get("name") == node:
+            self._chain_runs[run_id] = ("node", node, time.perf_counter())
+
+    def _finish_chain(self, run_id: UUID, status: str) -> None:
+        run = self._chain_runs.pop(run_id, None)
+        if not run:
+            return
+        
+        kind, node, started_at = run
+        duration = time.perf_counter() - started_at
+        if kind == "graph":
+            GRAPH_DURATION.labels(status=status).observe(duration)
+        else:
+            NODE_DURATION.labels(node=node).observe(duration)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_chain(run_id, "success")
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish_chain(run_id, "error")
+
+    def on_chat_model_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        messages: Any,
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        metadata = metadata or {}
+        node = metadata.get("langgraph_node", "unknown")
+        model = metadata.get("ls_model_name", "unknown")
+        self._llm_runs[run_id] = (node, model, time.perf_counter())
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._llm_runs.pop(run_id, None)
+        if not run:
+            return
+        
+        node, model, started_at = run
+        LLM_CALL_DURATION.labels(node=node, model=model).observe(time.perf_counter() - started_at)
+        
+        prompt_tokens, completion_tokens = _token_usage(response)
+        if prompt_tokens is not None:
+            LLM_PROMPT_TOKENS.labels(node=node, model=model).observe(prompt_tokens)
+        if completion_tokens is not None:
+            LLM_COMPLETION_TOKENS.labels(node=node, model=model).observe(completion_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._llm_runs.pop(run_id, None)
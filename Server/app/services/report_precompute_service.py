@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from app.config import settings
+from app.schemas.chat_data import ChatResponse
+from app.services.metrics_service import record_cache_lookup
+from app.services.storage_service import get_storage
+
+logger = logging.getLogger(__name__)
+
+# 미리 생성에 사용하는 그래프와 작업을 실행할 이벤트 루프 (start()에서 설정)
+_health_graph = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# 기기 ID -> 이 워커에서 대기 중이거나 실행 중인 미리 생성 작업
+# (미리 생성한 리포트는 저장소에 두므로 SQLite 저장소를 쓰면 다른 워커도 그대로 사용)
+_pending: Dict[str, asyncio.Task] = {}
+
+
+def start(health_graph) -> None:
+    """미리 생성 작업에 사용할 그래프와 이벤트 루프 등록 (서버 시작 시 이벤트 루프에서 호출)"""
+    global _health_graph, _loop
+    _health_graph = health_graph
+    _loop = asyncio.get_running_loop()
+
+
+async def stop() -> None:
+    """대기 중인 미리 생성 작업 취소 (서버 종료 시 호출)"""
+    global _health_graph, _loop
+    _health_graph = None
+    _loop = None
+
+    tasks = list(_pending.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _pending.clear()
+
+
+def schedule_precompute(device_id: Optional[str]) -> None:
+    """
+    기기의 기본 리포트 미리 생성 예약
+
+    이미 예약되었거나 실행 중인 작업은 취소하고 precompute_debounce_seconds 뒤에 다시 시작하므로,
+    데이터가 연달아 들어와도 마지막 데이터 기준으로 한 번만 생성합니다.
+    저장소 쓰기를 스레드에서 실행하는 API처럼 다른 스레드에서 호출되면 서버 이벤트 루프로 넘겨 예약하고,
+    서버가 실행 중이 아니면(동기 스크립트 등) 예약하지 않습니다.
+
+    Args:
+        device_id: 새 데이터가 저장된 기기 ID
+    """
+    loop = _loop
+    if not settings.precompute_enabled or _health_graph is None or loop is None or not device_id:
+        return
+
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+
+    if running is loop:
+        _schedule(device_id)
+    elif not loop.is_closed():
+        loop.call_soon_threadsafe(_schedule, device_id)
+
+
+def _schedule(device_id: str) -> None:
+    if _health_graph is None:
+        return
+
+    loop = asyncio.get_running_loop()
+    previous = _pending.get(device_id)
+    if previous and not previous.done():
+        previous.cancel()
+
+    task = loop.create_task(_debounced_precompute(device_id))
+    _pending[device_id] = task
+    task.add_done_callback(lambda done: _pending.pop(device_id, None) if _pending.get(device_id) is done else None)
+
+
+async def _debounced_precompute(device_id: str) -> None:
+    await asyncio.sleep(settings.precompute_debounce_seconds)
+    await precompute_report(device_id)
+
+
+async def precompute_report(device_id: str) -> bool:
+    """
+    기본 메시지로 그래프를 실행하여 건강 분석, 분석 요약, 리포트 블록을 저장
+
+    Args:
+        device_id: 기기 ID
+
+    Returns:
+        저장 성공 여부
+    """
+    from app.agents.health_state import build_input_state
+    from app.agents.nodes.intent_router import HEALTH_ANALYSIS
+    from app.services.device_service import get_data_version, get_device_today
+
+    health_graph = _health_graph
+    if health_graph is None:
+        return False
+
+    try:
+        # 실행 중 새 데이터가 들어오면 저장된 버전이 현재 버전과 달라 사용되지 않음 (새 작업이 다시 생성)
+        data_version = await asyncio.to_thread(get_data_version, device_id)
+        today = await asyncio.to_thread(get_device_today, device_id)
+        started_at = time.perf_counter()
+
+        result = await health_graph.ainvoke(build_input_state(settings.precompute_message, device_id))
+
+        if result.get("intent") != HEALTH_ANALYSIS or not result.get("blocks"):
+            logger.warning(f"Report precompute produced no report (device_id: {device_id}, intent: {result.get('intent')})")
+            return False
+
+        report = {
+            "data_version": data_version,
+            "today": today,
+            "blocks": ChatResponse(blocks=result["blocks"]).model_dump(mode="json")["blocks"],
+            "health_analysis": result.get("health_analysis"),
+            "analysis_result": result.get("analysis_result"),
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        await asyncio.to_thread(get_storage().save_precomputed_report, device_id, report)
+
+        logger.info(f"Report precomputed (device_id: {device_id}, version: {data_version}, {time.perf_counter() - started_at:.2f}s)")
+        return True
+    except asyncio.CancelledError:
+        logger.info(f"Report precompute superseded by newer data: {device_id}")
+        raise
+    except Exception as e:
+        logger.error(f"Failed to precompute report: {e}", exc_info=True)
+        return False
+
+
+def get_latest_report(device_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    현재 데이터 버전으로 오늘(기기 시간대 기준) 미리 생성된 리포트 조회
+
+    기본 리포트는 오늘 기준 분석이므로 날짜가 바뀌면 데이터가 그대로여도 사용하지 않습니다.
+
+    Args:
+        device_id: 기기 ID
+
+    Returns:
+        data_version, today, blocks, health_analysis, analysis_result, created_at 또는 None
+    """
+    from app.services.device_service import get_data_version, get_device_today
+
+    if not settings.precompute_enabled or not device_id:
+        return None
+
+    report = get_storage().get_precomputed_report(device_id)
+    hit = (
+        report is not None
+        and report["data_version"] == get_data_version(device_id)
+        and report["today"] == get_device_today(device_id)
+    )
+    record_cache_lookup("precomputed_report", hit=hit)
+    return report if hit else None
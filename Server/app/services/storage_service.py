@@ -0,0 +1,512 @@
+import bisect
+import json
+import logging
+import queue
+import sqlite3
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_VERSION_KEY = "__all__"
+
+
+class HealthStorage(ABC):
+    """
+    기기 / 데이터 요청 / 데이터 응답 / 사용자 세션 / 미리 생성한 리포트 저장소 인터페이스
+
+    device_service, user_session_service, report_precompute_service가 이 인터페이스로만 저장소에 접근합니다.
+    레코드는 기존 메모리 저장 방식과 같은 dict 형태로 주고받습니다.
+    응답 조회(get_latest_data_response, get_data_responses)는 데이터가 있는 응답만 대상으로 합니다.
+    """
+
+    # 데이터 버전 번호가 유효한 범위의 식별값 (저장소가 바뀌면 같은 버전 번호도 다른 데이터를 가리킴)
+    epoch: str
+
+    @abstractmethod
+    def get_device(self, device_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def save_device(self, device_id: str, device: dict) -> None:
+        ...
+
+    @abstractmethod
+    def get_data_request(self, request_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def save_data_request(self, request: dict) -> None:
+        ...
+
+    @abstractmethod
+    def update_data_request(self, request_id: str, fields: dict) -> bool:
+        """요청 레코드 일부 필드 갱신 (요청이 없으면 False)"""
+
+    @abstractmethod
+    def save_data_response(self, response: dict, device_id: Optional[str]) -> None:
+        """응답 저장과 데이터 버전 증가 (기기별, 전체)를 한 번에 반영"""
+
+    @abstractmethod
+    def get_data_response(self, request_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def get_latest_data_response(self, device_id: Optional[str] = None) -> Optional[dict]:
+        """received_at 기준 가장 최근 응답 (device_id가 None이면 전체 기기, 데이터가 있는 응답만)"""
+
+    @abstractmethod
+    def get_data_responses(
+        self,
+        device_id: str,
+        received_from: Optional[str] = None,
+        received_to: Optional[str] = None
+    ) -> List[dict]:
+        """기기의 응답을 received_at 오름차순으로 조회 (received_from 이상, received_to 미만, 데이터가 있는 응답만)"""
+
+    @abstractmethod
+    def get_data_version(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def save_session(self, session_id: str, session: dict) -> None:
+        ...
+
+    @abstractmethod
+    def find_session(self, device_id: Optional[str] = None, user_name: Optional[str] = None) -> Optional[dict]:
+        """
+        조건에 맞는 세션 조회
+
+        - device_id: 가장 먼저 저장된 세션
+        - user_name: 가장 최근에 저장된 세션
+        - 둘 다 None: 세션 ID가 가장 큰 세션
+        """
+
+    @abstractmethod
+    def get_precomputed_report(self, device_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def save_precomputed_report(self, device_id: str, report: dict) -> None:
+        """기기의 미리 생성한 기본 리포트 저장 (기기당 최신 1건)"""
+
+    def close(self) -> None:
+        pass
+
+
+def _received_at(response: dict) -> str:
+    return response["received_at"]
+
+
+class InMemoryStorage(HealthStorage):
+    """
+    프로세스 메모리 저장소 (재시작 시 초기화, 워커 간 공유되지 않음)
+
+    응답 저장 시 기기별 received_at 순 목록과 전체 최신 응답을 함께 갱신하므로,
+    최신 응답은 O(1), 기간 조회는 O(log n)으로 전체 응답을 훑지 않습니다.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex
+        self._devices: Dict[str, dict] = {}
+        self._data_requests: Dict[str, dict] = {}
+        self._data_responses: Dict[str, dict] = {}
+        self._data_versions: Dict[str, int] = {}
+        self._sessions: Dict[str, dict] = {}
+        self._precomputed_reports: Dict[str, dict] = {}
+        # 기기 ID -> received_at 오름차순 응답 목록 (데이터가 있는 응답만)
+        self._responses_by_device: Dict[str, List[dict]] = {}
+        self._latest_response: Optional[dict] = None
+
+    def get_device(self, device_id: str) -> Optional[dict]:
+        return self._devices.get(device_id)
+
+    def save_device(self, device_id: str, device: dict) -> None:
+        self._devices[device_id] = device
+
+    def get_data_request(self, request_id: str) -> Optional[dict]:
+        return self._data_requests.get(request_id)
+
+    def save_data_request(self, request: dict) -> None:
+        self._data_requests[request["request_id"]] = request
+
+    def update_data_request(self, request_id: str, fields: dict) -> bool:
+        request = self._data_requests.get(request_id)
+        if not request:
+            return False
+        request.update(fields)
+        return True
+
+    def save_data_response(self, response: dict, device_id: Optional[str]) -> None:
+        response = {**response, "device_id": device_id}
+        previous = self._data_responses.get(response["request_id"])
+        self._data_responses[response["request_id"]] = response
+
+        if previous is not None:
+            self._unindex_response(previous)
+        if response.get("data"):
+            self._index_response(response)
+
+        for key in (GLOBAL_VERSION_KEY, device_id):
+            if key:
+                self._data_versions[key] = self._data_versions.get(key, 0) + 1
+
+    def _index_response(self, response: dict) -> None:
+        if response["device_id"]:
+            responses = self._responses_by_device.setdefault(response["device_id"], [])
+            # received_at은 저장 시각이므로 대부분 끝에 추가됨
+            if not responses or responses[-1]["received_at"] <= response["received_at"]:
+                responses.append(response)
+            else:
+                bisect.insort_right(responses, response, key=_received_at)
+
+        if self._latest_response is None or self._latest_response["received_at"] <= response["received_at"]:
+            self._latest_response = response
+
+    def _unindex_response(self, response: dict) -> None:
+        """같은 request_id로 다시 저장된 응답의 이전 항목 제거 (드문 경우라 선형 탐색)"""
+        responses = self._responses_by_device.get(response["device_id"]) or []
+        for i, indexed in enumerate(responses):
+            if indexed is response:
+                del responses[i]
+                break
+
+        if self._latest_response is response:
+            indexed = [r for r in self._data_responses.values() if r is not response and r.get("data")]
+            self._latest_response = max(indexed, key=_received_at, default=None)
+
+    def get_data_response(self, request_id: str) -> Optional[dict]:
+        return self._data_responses.get(request_id)
+
+    def get_latest_data_response(self, device_id: Optional[str] = None) -> Optional[dict]:
+        if device_id is None:
+            return self._latest_response
+        responses = self._responses_by_device.get(device_id)
+        return responses[-1] if responses else None
+
+    def get_data_responses(
+        self,
+        device_id: str,
+        received_from: Optional[str] = None,
+        received_to: Optional[str] = None
+    ) -> List[dict]:
+        responses = self._responses_by_device.get(device_id) or []
+        start = bisect.bisect_left(responses, received_from, key=_received_at) if received_from else 0
+        end = bisect.bisect_left(responses, received_to, key=_received_at) if received_to else len(responses)
+        return responses[start:end]
+
+    def get_data_version(self, key: str) -> int:
+        return self._data_versions.get(key, 0)
+
+    def get_session(self, session_id: str) -> Optional[dict]:
+        return self._sessions.get(session_id)
+
+    def save_session(self, session_id: str, session: dict) -> None:
+        self._sessions[session_id] = session
+
+    def find_session(self, device_id: Optional[str] = None, user_name: Optional[str] = None) -> Optional[dict]:
+        if device_id is not None:
+            return next((s for s in self._sessions.values() if s.get("device_id") == device_id), None)
+        if user_name is not None:
+            return next((s for s in reversed(self._sessions.values()) if s.get("user_name") == user_name), None)
+        if not self._sessions:
+            return None
+        return self._sessions[max(self._sessions)]
+
+    def get_precomputed_report(self, device_id: str) -> Optional[dict]:
+        return self._precomputed_reports.get(device_id)
+
+    def save_precomputed_report(self, device_id: str, report: dict) -> None:
+        self._precomputed_reports[device_id] = report
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS storage_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS devices (
+    device_id TEXT PRIMARY KEY,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS data_requests (
+    request_id TEXT PRIMARY KEY,
+    device_id TEXT,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS data_responses (
+    request_id TEXT PRIMARY KEY,
+    device_id TEXT,
+    received_at TEXT NOT NULL,
+    data TEXT NOT NULL,
+    series TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_data_requests_device ON data_requests (device_id);
+CREATE INDEX IF NOT EXISTS idx_data_responses_device_received ON data_responses (device_id, received_at);
+CREATE INDEX IF NOT EXISTS idx_data_responses_received ON data_responses (received_at);
+CREATE TABLE IF NOT EXISTS data_versions (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_sessions (
+    session_id TEXT PRIMARY KEY,
+    device_id TEXT,
+    user_name TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_device ON user_sessions (device_id);
+CREATE INDEX IF NOT EXISTS idx_user_sessions_user_name ON user_sessions (user_name);
+CREATE TABLE IF NOT EXISTS precomputed_reports (
+    device_id TEXT PRIMARY KEY,
+    record TEXT NOT NULL
+);
+"""
+
+
+# 데이터가 있는 응답 (InMemoryStorage가 색인하는 response.get("data")가 참인 응답과 같은 조건)
+_HAS_DATA = "data NOT IN ('{}', 'null')"
+
+
+def _dumps(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False)
+
+
+def _loads(row) -> Optional[dict]:
+    return json.loads(row[0]) if row else None
+
+
+class SQLiteStorage(HealthStorage):
+    """
+    SQLite(WAL) 저장소
+
+    여러 uvicorn 워커가 같은 파일을 공유하고, 재시작/배포 후에도 데이터가 유지됩니다.
+    - 연결 풀: 연결마다 sqlite3 문장 캐시(cached_statements)로 준비된 쿼리를 재사용
+    - 응답 저장: 응답 행과 데이터 버전 증가를 한 트랜잭션으로 묶어 한 번에 커밋
+      (응답 확인 후 유실되지 않도록 여러 요청의 쓰기를 모아 두었다가 나중에 커밋하지는 않음)
+    - 데이터 버전도 파일에 저장되므로 워커 간 분석 캐시 유효성 확인에 그대로 사용
+    """
+
+    def __init__(self, database_path: str, pool_size: int = 4, busy_timeout_seconds: float = 5.0):
+        self.database_path = database_path
+        self.busy_timeout_seconds = busy_timeout_seconds
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._connections = []
+
+        for _ in range(max(pool_size, 1)):
+            conn = self._connect()
+            self._connections.append(conn)
+            self._pool.put(conn)
+
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+            conn.execute(
+                "INSERT OR IGNORE INTO storage_meta (key, value) VALUES ('epoch', ?)", (uuid.uuid4().hex,)
+            )
+            conn.commit()
+            self.epoch = conn.execute("SELECT value FROM storage_meta WHERE key = 'epoch'").fetchone()[0]
+
+        logger.info(f"SQLite storage opened: {database_path} (pool: {len(self._connections)})")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.database_path,
+            timeout=self.busy_timeout_seconds,
+            check_same_thread=False,
+            cached_statements=128
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL에서는 NORMAL도 커밋된 데이터가 프로세스 종료 후 유지됨 (전원 장애 시 마지막 트랜잭션만 유실 가능)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _fetchone(self, sql: str, params: tuple):
+        with self._connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def _write(self, *statements) -> None:
+        """(sql, params) 목록을 한 트랜잭션으로 실행"""
+        with self._connection() as conn:
+            with conn:
+                for sql, params in statements:
+                    conn.execute(sql, params)
+
+    def get_device(self, device_id: str) -> Optional[dict]:
+        return _loads(self._fetchone("SELECT record FROM devices WHERE device_id = ?", (device_id,)))
+
+    def save_device(self, device_id: str, device: dict) -> None:
+        self._write((
+            "INSERT INTO devices (device_id, record) VALUES (?, ?) "
+            "ON CONFLICT(device_id) DO UPDATE SET record = excluded.record",
+            (device_id, _dumps(device))
+        ))
+
+    def get_data_request(self, request_id: str) -> Optional[dict]:
+        return _loads(self._fetchone("SELECT record FROM data_requests WHERE request_id = ?", (request_id,)))
+
+    def save_data_request(self, request: dict) -> None:
+        self._write((
+            "INSERT INTO data_requests (request_id, device_id, record) VALUES (?, ?, ?) "
+            "ON CONFLICT(request_id) DO UPDATE SET device_id = excluded.device_id, record = excluded.record",
+            (request["request_id"], request.get("device_id"), _dumps(request))
+        ))
+
+    def update_data_request(self, request_id: str, fields: dict) -> bool:
+        with self._connection() as conn:
+            with conn:
+                row = conn.execute("SELECT record FROM data_requests WHERE request_id = ?", (request_id,)).fetchone()
+                if not row:
+                    return False
+                request = {**json.loads(row[0]), **fields}
+                conn.execute("UPDATE data_requests SET record = ? WHERE request_id = ?", (_dumps(request), request_id))
+        return True
+
+    def save_data_response(self, response: dict, device_id: Optional[str]) -> None:
+        bump_version = (
+            "INSERT INTO data_versions (key, version) VALUES (?, 1) "
+            "ON CONFLICT(key) DO UPDATE SET version = version + 1"
+        )
+        statements = [
+            (
+                "INSERT INTO data_responses (request_id, device_id, received_at, data, series) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(request_id) DO UPDATE SET device_id = excluded.device_id, "
+                "received_at = excluded.received_at, data = excluded.data, series = excluded.series",
+                (
+                    response["request_id"], device_id, response["received_at"], _dumps(response["data"]),
+                    _dumps(response["series"])
+                )
+            ),
+            (bump_version, (GLOBAL_VERSION_KEY,)),
+        ]
+        if device_id:
+            statements.append((bump_version, (device_id,)))
+        self._write(*statements)
+
+    @staticmethod
+    def _response_from_row(row) -> Optional[dict]:
+        if not row:
+            return None
+        request_id, device_id, received_at, data, series = row
+        return {
+            "request_id": request_id,
+            "data": json.loads(data),
+            "series": json.loads(series),
+            "received_at": received_at,
+            "device_id": device_id
+        }
+
+    def get_data_response(self, request_id: str) -> Optional[dict]:
+        return self._response_from_row(self._fetchone(
+            "SELECT request_id, device_id, received_at, data, series FROM data_responses WHERE request_id = ?",
+            (request_id,)
+        ))
+
+    def get_latest_data_response(self, device_id: Optional[str] = None) -> Optional[dict]:
+        if device_id is None:
+            row = self._fetchone(
+                "SELECT request_id, device_id, received_at, data, series FROM data_responses "
+                f"WHERE {_HAS_DATA} ORDER BY received_at DESC LIMIT 1",
+                ()
+            )
+        else:
+            row = self._fetchone(
+                "SELECT request_id, device_id, received_at, data, series FROM data_responses "
+                f"WHERE device_id = ? AND {_HAS_DATA} ORDER BY received_at DESC LIMIT 1",
+                (device_id,)
+            )
+        return self._response_from_row(row)
+
+    def get_data_responses(
+        self,
+        device_id: str,
+        received_from: Optional[str] = None,
+        received_to: Optional[str] = None
+    ) -> List[dict]:
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT request_id, device_id, received_at, data, series FROM data_responses "
+                f"WHERE device_id = ? AND received_at >= ? AND received_at < ? AND {_HAS_DATA} ORDER BY received_at",
+                (device_id, received_from or "", received_to or "\uffff")
+            ).fetchall()
+        return [self._response_from_row(row) for row in rows]
+
+    def get_data_version(self, key: str) -> int:
+        row = self._fetchone("SELECT version FROM data_versions WHERE key = ?", (key,))
+        return row[0] if row else 0
+
+    def get_session(self, session_id: str) -> Optional[dict]:
+        return _loads(self._fetchone("SELECT record FROM user_sessions WHERE session_id = ?", (session_id,)))
+
+    def save_session(self, session_id: str, session: dict) -> None:
+        self._write((
+            "INSERT INTO user_sessions (session_id, device_id, user_name, record) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET device_id = excluded.device_id, "
+            "user_name = excluded.user_name, record = excluded.record",
+            (session_id, session.get("device_id"), session.get("user_name"), _dumps(session))
+        ))
+
+    def find_session(self, device_id: Optional[str] = None, user_name: Optional[str] = None) -> Optional[dict]:
+        if device_id is not None:
+            row = self._fetchone("SELECT record FROM user_sessions WHERE device_id = ? ORDER BY rowid LIMIT 1", (device_id,))
+        elif user_name is not None:
+            row = self._fetchone("SELECT record FROM user_sessions WHERE user_name = ? ORDER BY rowid DESC LIMIT 1", (user_name,))
+        else:
+            row = self._fetchone("SELECT record FROM user_sessions ORDER BY session_id DESC LIMIT 1", ())
+        return _loads(row)
+
+    def get_precomputed_report(self, device_id: str) -> Optional[dict]:
+        return _loads(self._fetchone("SELECT record FROM precomputed_reports WHERE device_id = ?", (device_id,)))
+
+    def save_precomputed_report(self, device_id: str, report: dict) -> None:
+        self._write((
+            "INSERT INTO precomputed_reports (device_id, record) VALUES (?, ?) "
+            "ON CONFLICT(device_id) DO UPDATE SET record = excluded.record",
+            (device_id, _dumps(report))
+        ))
+
+    def close(self) -> None:
+        for conn in self._connections:
+            conn.close()
+        self._connections.clear()
+
+
+_storage: Optional[HealthStorage] = None
+
+
+def get_storage() -> HealthStorage:
+    """설정(storage_backend)에 따른 저장소 (처음 사용할 때 생성)"""
+    global _storage
+    if _storage is None:
+        if settings.storage_backend == "sqlite":
+            _storage = SQLiteStorage(
+                settings.storage_path,
+                pool_size=settings.storage_pool_size,
+                busy_timeout_seconds=settings.storage_busy_timeout_seconds
+            )
+        else:
+            _storage = InMemoryStorage()
+            logger.info("In-memory storage initialized (data is lost on restart)")
+    return _storage
+
+
+def close_storage() -> None:
+    """저장소 연결 종료 (서버 종료 시 호출)"""
+    global _storage
+    if _storage is not None:
+        _storage.close()
+        _storage = None
@@ -1,11 +1,10 @@
 import logging
 from typing import Optional, Dict, Any
 from app.schemas.user_data import PlanRequest
+from app.services.storage_service import get_storage
 
 logger = logging.getLogger(__name__)
 
-_user_sessions: Dict[str, Dict[str, Any]] = {}
-
 
 def save_user_session(session_id: str, plan_request: PlanRequest) -> bool:
     """
@@ -19,13 +18,13 @@ def save_user_session(session_id: str, plan_request: PlanRequest) -> bool:
         저장 성공 여부
     """
     try:
-        _user_sessions[session_id] = {
+        get_storage().save_session(session_id, {
             "user_name": plan_request.user_name,
             "basic_info": plan_request.basicInfo.model_dump(),
             "lifestyle": plan_request.lifestyle.model_dump(),
             "followup": plan_request.followup.model_dump(),
             "device_id": plan_request.device_id,
-        }
+        })
         logger.info(f"User session saved: {session_id}")
         return True
     except Exception as e:
@@ -43,7 +42,7 @@ def get_user_session(session_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         세션 정보 또는 None
     """
-    return _user_sessions.get(session_id)
+    return get_storage().get_session(session_id)
 
 
 def get_user_session_by_device(device_id: str) -> Optional[Dict[str, Any]]:
@@ -56,10 +55,7 @@ def get_user_session_by_device(device_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         세션 정보 또는 None
     """
-    for session_id, session_data in _user_sessions.items():
-        if session_data.get("device_id") == device_id:
-            return session_data
-    return None
+    return get_storage().find_session(device_id=device_id)
 
 
 def get_user_session_by_name(user_name: str) -> Optional[Dict[str, Any]]:
@@ -72,14 +68,7 @@ def get_user_session_by_name(user_name: str) -> Optional[Dict[str, Any]]:
     Returns:
         가장 최근 세션 정보 또는 None
     """
-    matching_sessions = []
-    for session_id, session_data in _user_sessions.items():
-        if session_data.get("user_name") == user_name:
-            matching_sessions.append((session_id, session_data))
-    
-    if matching_sessions:
-        return matching_sessions[-1][1]
-    return None
+    return get_storage().find_session(user_name=user_name)
 
 
 def get_latest_user_session() -> Optional[Dict[str, Any]]:
@@ -89,11 +78,7 @@ def get_latest_user_session() -> Optional[Dict[str, Any]]:
     Returns:
         가장 최근 세션 정보 또는 None
     """
-    if not _user_sessions:
-        return None
-    
-    latest_session = max(_user_sessions.items(), key=lambda x: x[0])
-    return latest_session[1]
+    return get_storage().find_session()
 
 
 def generate_session_id(user_name: str, device_id: Optional[str] = None) -> str:
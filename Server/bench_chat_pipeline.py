@@ -0,0 +1,167 @@
+"""
+채팅 파이프라인 오프라인 벤치마크
+
+OpenAI API 없이 StubChatModel로 HealthGraph를 구성하고 ASGI 앱의 /agent/chat을 직접 호출하여
+데이터 크기별 지연 시간(p50/p95)과 처리량을 측정합니다.
+
+- 모의 LLM 지연 0초: 그래프, 데이터 포매터, 스키마 검증 등 서버 자체 오버헤드
+- 모의 LLM 지연 > 0초: LLM 지연을 포함한 전체 지연 (호출 제한기 대기 포함)
+
+사용법 (Server 디렉토리에서):
+    python bench_chat_pipeline.py
+    python bench_chat_pipeline.py --days 1 7 30 90 --requests 100 --concurrency 8 --llm-latency 0 0.2
+"""
+import os
+
+# 앱을 import하기 전에 설정 (API 키/네트워크 없이 실행, 응답 캐시와 체크포인트로 결과가 왜곡되지 않게 함)
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["CHECKPOINT_ENABLED"] = "false"
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "100000000")
+os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "100000000000")
+
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import httpx
+
+from app.config import settings
+from app.main import app
+
+# 분석 기간(today, last_N_days)이 기기 시간대 기준 오늘이므로 합성 데이터도 오늘까지 생성
+END_DATE = datetime.now(ZoneInfo(settings.default_timezone)).date()
+HEART_RATE_INTERVAL_MINUTES = 5
+
+
+def make_health_data(days: int, seed: int = 0) -> dict:
+    """END_DATE까지 days일 분량의 합성 건강 데이터 (심박수는 5분 간격)"""
+    rng = random.Random(seed + days)
+    steps, heart_rate, sleep = [], [], []
+
+    for offset in range(days - 1, -1, -1):
+        day = END_DATE - timedelta(days=offset)
+        steps.append({"date": day.isoformat(), "count": rng.randint(2000, 14000)})
+
+        day_start = datetime(day.year, day.month, day.day)
+        for minute in range(0, 24 * 60, HEART_RATE_INTERVAL_MINUTES):
+            timestamp = day_start + timedelta(minutes=minute)
+            heart_rate.append({"timestamp": timestamp.isoformat() + "Z", "bpm": rng.randint(55, 120)})
+
+        hours = round(rng.uniform(4.5, 9.0), 1)
+        sleep_start = day_start - timedelta(hours=1)
+        sleep.append({
+            "date": day.isoformat(),
+            "start_time": sleep_start.isoformat() + "Z",
+            "end_time": (sleep_start + timedelta(hours=hours)).isoformat() + "Z",
+            "hours": hours,
+        })
+
+    return {"steps": steps, "heart_rate": heart_rate, "sleep": sleep}
+
+
+async def load_health_data(client: httpx.AsyncClient, device_id: str, days: int) -> int:
+    """안드로이드 앱과 같은 FCM 요청/응답 흐름으로 합성 데이터 저장, 데이터 포인트 수 반환"""
+    await client.post("/devices/register", json={"device_id": device_id, "fcm_token": "bench-token"})
+
+    response = await client.post("/health/data/request", json={
+        "device_id": device_id,
+        "data_types": ["steps", "heart_rate", "sleep"],
+        "start_date": (END_DATE - timedelta(days=days - 1)).isoformat(),
+        "end_date": END_DATE.isoformat(),
+    })
+    response.raise_for_status()
+    request_id = response.json()["request_id"]
+
+    data = make_health_data(days)
+    response = await client.post("/health/data/response", json={
+        "request_id": request_id,
+        "device_id": device_id,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "data": data,
+    })
+    response.raise_for_status()
+    return sum(len(points) for points in data.values())
+
+
+async def run_requests(client: httpx.AsyncClient, device_id: str, message: str, count: int, concurrency: int):
+    """
+    /agent/chat을 count번 호출 (동시 concurrency개)
+
+    동일 요청 합치기(single-flight)가 적용되지 않도록 요청마다 메시지를 다르게 보냅니다.
+
+    Returns:
+        (요청별 지연 시간 목록, 전체 소요 시간, 실패 수)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(index: int):
+        nonlocal failures
+        async with semaphore:
+            started_at = time.perf_counter()
+            response = await client.post("/agent/chat", json={"message": f"{message} #{index}", "device_id": device_id})
+            latencies.append(time.perf_counter() - started_at)
+            if response.status_code != 200:
+                failures += 1
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return latencies, time.perf_counter() - started_at, failures
+
+
+def percentile(values: list, p: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+async def main(args):
+    print(f"{'days':>5} {'points':>8} {'llm_latency':>11} {'requests':>8} {'p50_ms':>9} {'p95_ms':>9} {'max_ms':>9} {'req/s':>8} {'fail':>5}")
+
+    async with app.router.lifespan_context(app):
+        health_graph = app.state.health_graph
+        stub_llms = {id(llm): llm for llm in health_graph.llms.values()}.values()
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for days in args.days:
+                device_id = f"b{days:04d}-bench"
+                points = await load_health_data(client, device_id, days)
+
+                for llm_latency in args.llm_latency:
+                    for llm in stub_llms:
+                        llm.latency_seconds = llm_latency
+
+                    await run_requests(client, device_id, args.message, args.warmup, args.concurrency)
+                    latencies, elapsed, failures = await run_requests(
+                        client, device_id, args.message, args.requests, args.concurrency
+                    )
+
+                    print(
+                        f"{days:>5} {points:>8} {llm_latency:>11.3f} {args.requests:>8} "
+                        f"{percentile(latencies, 50) * 1000:>9.1f} {percentile(latencies, 95) * 1000:>9.1f} "
+                        f"{max(latencies) * 1000:>9.1f} {args.requests / elapsed:>8.1f} {failures:>5}"
+                    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="채팅 파이프라인 오프라인 벤치마크 (StubChatModel)")
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 7, 30, 90], help="합성 데이터 기간 (일)")
+    parser.add_argument("--llm-latency", type=float, nargs="+", default=[0.0, 0.2], help="모의 LLM 호출 지연 (초)")
+    parser.add_argument("--requests", type=int, default=50, help="측정 요청 수")
+    parser.add_argument("--warmup", type=int, default=3, help="측정 전 예열 요청 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수")
+    parser.add_argument("--message", default="내 건강 상태 분석해줘", help="채팅 메시지")
+    args = parser.parse_args()
+
+    # 앱 import 시 DEBUG 로깅이 설정되므로 결과 표만 보이도록 경고 이하 로그는 끔
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args))
@@ -0,0 +1,40 @@
+from zoneinfo import ZoneInfo
+from app.agents.utils.data_formatter import build_health_analysis, format_health_analysis_for_llm
+from app.schemas.fcm_data import RequestedHealthData
+from app.schemas.health_daily import HealthDaily, resolve_time_range
+from app.schemas.health_series import HealthSeries, date_to_day
+
+SEOUL = ZoneInfo("Asia/Seoul")
+
+
+def _health_daily(dates):
+    data = RequestedHealthData(steps=[{"date": date, "count": 8000} for date in dates])
+    return HealthDaily.from_series(HealthSeries.from_health_data(data, SEOUL))
+
+
+def test_relative_ranges_are_anchored_on_today():
+    """today/yesterday/last_N_days는 마지막 데이터 날짜가 아니라 오늘 기준"""
+    today = date_to_day("2025-12-20")
+    assert resolve_time_range("today", today) == (today, today + 1)
+    assert resolve_time_range("yesterday", today) == (today - 1, today)
+    assert resolve_time_range("last_7_days", today) == (today - 6, today + 1)
+
+
+def test_stale_data_is_not_reported_as_today():
+    """데이터가 오래되었으면 오늘 분석에 이전 날짜 데이터를 쓰지 않고 마지막 데이터 날짜를 알림"""
+    health_daily = _health_daily(["2025-12-08", "2025-12-10"])
+    
+    health_analysis = build_health_analysis(health_daily, date_to_day("2025-12-20"), "today")
+    assert health_analysis["period"]["end_date"] == "2025-12-20"
+    assert health_analysis["period"]["latest_data_date"] == "2025-12-10"
+    assert health_analysis["steps_summary"] is None
+    assert "마지막 데이터: 2025-12-10" in format_health_analysis_for_llm(health_analysis)
+    
+    health_analysis = build_health_analysis(health_daily, date_to_day("2025-12-10"), "last_7_days")
+    assert health_analysis["steps_summary"]["total"] == 16000
+
+
+if __name__ == "__main__":
+    test_relative_ranges_are_anchored_on_today()
+    test_stale_data_is_not_reported_as_today()
+    print("health analysis tests passed")
@@ -0,0 +1,48 @@
+from app.agents.nodes.intent_router import (
+    classify_intent,
+    classify_time_range,
+    HEALTH_ANALYSIS,
+    SPECIFIC_QUERY,
+    GENERAL_QUESTION,
+)
+
+
+def test_english_keywords_match_whole_words():
+    """영어 키워드가 다른 단어의 일부("great", "sweat", "treat")에 걸리지 않는지"""
+    assert classify_intent("analyze my progress, I feel great") == (HEALTH_ANALYSIS, [])
+    assert classify_intent("give me a report, I sweat a lot") == (HEALTH_ANALYSIS, [])
+    assert classify_intent("analyze this, it was a treat") == (HEALTH_ANALYSIS, [])
+    assert classify_intent("I feel great") is None
+
+
+def test_english_keywords():
+    """영어 키워드 (복수형, 조사가 붙은 경우 포함)"""
+    assert classify_intent("what should I eat today?") == (GENERAL_QUESTION, [])
+    assert classify_intent("recommend some meals") == (GENERAL_QUESTION, [])
+    assert classify_intent("how many steps did I take?") == (SPECIFIC_QUERY, ["steps"])
+    assert classify_intent("sleep이 부족한지 분석해줘") == (HEALTH_ANALYSIS, ["sleep"])
+
+
+def test_korean_keywords():
+    """한국어 키워드는 어간 부분 문자열로 비교"""
+    assert classify_intent("오늘 몇 걸음 걸었어?") == (SPECIFIC_QUERY, ["steps"])
+    assert classify_intent("다이어트 식단 추천해줘") == (GENERAL_QUESTION, [])
+    assert classify_intent("내 건강 상태 분석해줘") == (HEALTH_ANALYSIS, [])
+
+
+def test_time_range_keywords_match_whole_words():
+    """"weekly", "monthly", "weekend"가 기간 표현으로 걸리지 않는지"""
+    assert classify_time_range("show my weekly habits") is None
+    assert classify_time_range("monthly goals?") is None
+    assert classify_time_range("analyze my weekend") is None
+    assert classify_time_range("analyze this week") == "last_7_days"
+    assert classify_time_range("이번달 걸음 수") == "last_30_days"
+    assert classify_time_range("how did I sleep today?") == "today"
+
+
+if __name__ == "__main__":
+    test_english_keywords_match_whole_words()
+    test_english_keywords()
+    test_korean_keywords()
+    test_time_range_keywords_match_whole_words()
+    print("intent router tests passed")